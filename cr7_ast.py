@@ -0,0 +1,330 @@
+# ----------------------------
+# CR7 SCRIPT AST
+# ----------------------------
+# Every node uses __slots__ so large programs stay cheap to hold in memory.
+# `offset` is the source offset of the token that starts the node. Slots
+# outside `fields` (slot, target, fn, frame_size) are filled in by the
+# resolver in cr7_interpreter and are ignored by == and repr().
+
+
+class Node:
+    __slots__ = ("offset",)
+    fields = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.fields
+        )
+
+    def __repr__(self):
+        args = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.fields)
+        return f"{type(self).__name__}({args})"
+
+    def children(self):
+        for name in self.fields:
+            value = getattr(self, name)
+            if isinstance(value, Node):
+                yield value
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, Node):
+                        yield item
+
+
+class Program(Node):
+    __slots__ = ("imports", "functions")
+    fields = __slots__
+
+    def __init__(self, imports, functions, offset=None):
+        self.imports = imports
+        self.functions = functions
+        self.offset = offset
+
+
+class Import(Node):
+    __slots__ = ("module",)
+    fields = __slots__
+
+    def __init__(self, module, offset=None):
+        self.module = module
+        self.offset = offset
+
+
+class Function(Node):
+    __slots__ = ("name", "params", "body", "frame_size")
+    fields = ("name", "params", "body")
+
+    def __init__(self, name, params, body, offset=None):
+        self.name = name
+        self.params = params  # list of (type_name, name) pairs
+        self.body = body
+        self.frame_size = None
+        self.offset = offset
+
+
+# ----------------------------
+# STATEMENTS
+# ----------------------------
+class Declaration(Node):
+    __slots__ = ("type_name", "name", "value", "slot")
+    fields = ("type_name", "name", "value")
+
+    def __init__(self, type_name, name, value=None, offset=None):
+        self.type_name = type_name
+        self.name = name
+        self.value = value
+        self.slot = None
+        self.offset = offset
+
+
+class Assignment(Node):
+    __slots__ = ("name", "value", "slot")
+    fields = ("name", "value")
+
+    def __init__(self, name, value, offset=None):
+        self.name = name
+        self.value = value
+        self.slot = None
+        self.offset = offset
+
+
+class If(Node):
+    __slots__ = ("condition", "body", "orelse")
+    fields = __slots__
+
+    def __init__(self, condition, body, orelse=None, offset=None):
+        self.condition = condition
+        self.body = body
+        self.orelse = orelse  # None when there is no `bench` branch
+        self.offset = offset
+
+
+class While(Node):
+    __slots__ = ("condition", "body")
+    fields = __slots__
+
+    def __init__(self, condition, body, offset=None):
+        self.condition = condition
+        self.body = body
+        self.offset = offset
+
+
+class For(Node):
+    __slots__ = ("init", "condition", "update", "body")
+    fields = __slots__
+
+    def __init__(self, init, condition, update, body, offset=None):
+        self.init = init  # Declaration, Assignment or None
+        self.condition = condition  # None loops forever
+        self.update = update  # Assignment or None; `i++` is desugared to `i = i + 1`
+        self.body = body
+        self.offset = offset
+
+
+class Output(Node):
+    __slots__ = ("value",)
+    fields = __slots__
+
+    def __init__(self, value, offset=None):
+        self.value = value
+        self.offset = offset
+
+
+class Input(Node):
+    __slots__ = ("name", "slot")
+    fields = ("name",)
+
+    def __init__(self, name, offset=None):
+        self.name = name
+        self.slot = None
+        self.offset = offset
+
+
+class Return(Node):
+    __slots__ = ("value",)
+    fields = __slots__
+
+    def __init__(self, value, offset=None):
+        self.value = value
+        self.offset = offset
+
+
+# ----------------------------
+# EXPRESSIONS
+# ----------------------------
+class BinOp(Node):
+    __slots__ = ("op", "left", "right", "fn")
+    fields = ("op", "left", "right")
+
+    def __init__(self, op, left, right, offset=None):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.fn = None
+        self.offset = offset
+
+
+class UnaryOp(Node):
+    __slots__ = ("op", "operand", "fn")
+    fields = ("op", "operand")
+
+    def __init__(self, op, operand, offset=None):
+        self.op = op  # "-" or "!"
+        self.operand = operand
+        self.fn = None
+        self.offset = offset
+
+
+class LogicalOp(Node):
+    __slots__ = ("op", "left", "right")
+    fields = __slots__
+
+    def __init__(self, op, left, right, offset=None):
+        self.op = op  # "&&" or "||"; `right` is only evaluated when `left` does not decide
+        self.left = left
+        self.right = right
+        self.offset = offset
+
+
+class Call(Node):
+    __slots__ = ("name", "args", "target")
+    fields = ("name", "args")
+
+    def __init__(self, name, args, offset=None):
+        self.name = name
+        self.args = args
+        self.target = None
+        self.offset = offset
+
+
+class Name(Node):
+    __slots__ = ("id", "slot")
+    fields = ("id",)
+
+    def __init__(self, id, offset=None):
+        self.id = id
+        self.slot = None
+        self.offset = offset
+
+
+class Number(Node):
+    __slots__ = ("value",)
+    fields = __slots__
+
+    def __init__(self, value, offset=None):
+        self.value = value  # int, or float when the literal has a fraction
+        self.offset = offset
+
+
+class String(Node):
+    __slots__ = ("value",)
+    fields = __slots__
+
+    def __init__(self, value, offset=None):
+        self.value = value  # without the surrounding quotes
+        self.offset = offset
+
+
+def walk(node):
+    """Yield `node` and every node below it, depth first."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(node.children())))
+
+
+def shifted(node, delta):
+    """A copy of the tree under `node` with every offset moved by `delta`.
+    Resolver slots are left unset, as after node_from_data()."""
+    root = shifted_node(node, delta)
+    stack = [root]
+    while stack:
+        copy = stack.pop()
+        for name in copy.fields:
+            value = getattr(copy, name)
+            if isinstance(value, Node):
+                value = shifted_node(value, delta)
+                stack.append(value)
+            elif isinstance(value, list) and value and isinstance(value[0], Node):
+                value = [shifted_node(item, delta) for item in value]
+                stack.extend(value)
+            else:
+                continue
+            setattr(copy, name, value)
+    return root
+
+
+def shifted_node(node, delta):
+    # Fields still point at the original children until shifted() replaces them.
+    cls = type(node)
+    copy = cls.__new__(cls)
+    for name in cls.__slots__:
+        setattr(copy, name, getattr(node, name) if name in cls.fields else None)
+    copy.offset = node.offset + delta
+    return copy
+
+
+# ----------------------------
+# SERIALISATION
+# ----------------------------
+# Nodes flatten to nested tuples of plain values (marshal-friendly):
+# (class code, offset, field values...). Resolver slots are not saved.
+NODE_CLASSES = (
+    Program, Import, Function, Declaration, Assignment, If, While, For,
+    Output, Input, Return, BinOp, Call, Name, Number, String, UnaryOp,
+    LogicalOp,
+)
+NODE_CODES = {cls: code for code, cls in enumerate(NODE_CLASSES)}
+
+
+def node_to_data(node):
+    # Without recursion: a long operator chain nests deeper than Python's
+    # recursion limit. Children follow their parent in `order`, so walking
+    # it backwards finds every child's data already built.
+    order = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(node.children())
+    built = {}
+    for node in reversed(order):
+        values = []
+        for name in node.fields:
+            value = getattr(node, name)
+            if isinstance(value, Node):
+                value = built[id(value)]
+            elif isinstance(value, list) and value and isinstance(value[0], Node):
+                value = [built[id(item)] for item in value]
+            values.append(value)
+        built[id(node)] = (NODE_CODES[type(node)], node.offset, *values)
+    return built[id(order[0])]
+
+
+def node_from_data(data):
+    root = empty_node(data)
+    stack = [(root, data)]
+    while stack:
+        node, data = stack.pop()
+        for name, value in zip(node.fields, data[2:]):
+            if isinstance(value, tuple):
+                child = empty_node(value)
+                stack.append((child, value))
+                value = child
+            elif isinstance(value, list) and value and isinstance(value[0], tuple) and isinstance(value[0][0], int):
+                children = [empty_node(item) for item in value]
+                stack.extend(zip(children, value))
+                value = children
+            setattr(node, name, value)
+    return root
+
+
+def empty_node(data):
+    # Fields are set by node_from_data() as it reaches them.
+    cls = NODE_CLASSES[data[0]]
+    node = cls.__new__(cls)
+    for name in cls.__slots__:
+        setattr(node, name, None)
+    node.offset = data[1]
+    return node
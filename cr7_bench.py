@@ -0,0 +1,419 @@
+import contextlib
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+from cr7_ast import node_to_data, walk
+from cr7_compiler import (
+    KEYWORDS, LEXER, BufferedSink, CR7Parser, EventSink, FunctionCache, TextSink,
+    TraceSink, tokenize,
+)
+from cr7_interpreter import Interpreter
+from cr7_ll1 import TableParser, build_tables, load_tables
+from cr7_pygen import generate, run_python
+from cr7_vm import VM, compile_program
+
+# Throughput targets on a single core (CPython 3.11). bench_* reports
+# whether the current build meets them.
+LEX_TARGET_TOKENS_PER_SEC = 1_000_000
+
+# Smallest corpus the parallel lexer is measured on.
+PARALLEL_LEX_BYTES = 10 * 1024 * 1024
+
+# ----------------------------
+# CORPUS
+# ----------------------------
+FUNCTION_TEMPLATE = """play helper{n}(goal a, goal b) {{
+    // generated function {n}
+    goal total = a + b * 2;
+    player ratio = 1.5;
+    match label = "helper {n}";
+    referee (total > 10) {{
+        announce label;
+    }} bench {{
+        total = total - 1;
+    }}
+    practice (total < 100) {{
+        total = total + (a + 1) * 3;
+    }}
+    drill (goal i = 0; i < b; i++) {{
+        total = total + i;
+    }}
+    whistle total;
+}}
+"""
+
+
+LOOP_PROGRAM = """play step(goal x) {{
+    whistle x * 3 + 1;
+}}
+play kickoff() {{
+    goal total = 0;
+    drill (goal i = 0; i < {iterations}; i++) {{
+        referee (i / 2 * 2 < i) {{
+            total = total + step(i);
+        }} bench {{
+            total = total - i / 2;
+        }}
+    }}
+    goal n = 0;
+    practice (n < {iterations}) {{
+        n = n + 1;
+    }}
+    whistle total + n;
+}}
+"""
+
+
+def generate_corpus(functions=1000):
+    """Build a syntactically valid CR7 script with `functions` play blocks."""
+    parts = ["#import stadium\n"]
+    parts.extend(FUNCTION_TEMPLATE.format(n=n) for n in range(functions))
+    return "\n".join(parts)
+
+
+# The token pattern as it was before the Lexer engine, so the baseline
+# really measures the old lexer rather than today's specification.
+LEGACY_SPECIFICATION = [
+    ("META",     r"#\w+"),
+    ("COMMENT",  r"//.*"),
+    ("NUMBER",   r"\d+(\.\d+)?"),
+    ("ASSIGN",   r"="),
+    ("COMMA",    r","),
+    ("END",      r";"),
+    ("LPAREN",   r"\("),
+    ("RPAREN",   r"\)"),
+    ("LBRACE",   r"\{"),
+    ("RBRACE",   r"\}"),
+    ("STRING",   r'"[^"]*"'),
+    ("ID",       r"[A-Za-z_]\w*"),
+    ("OP",       r"[+\-*/<>!=]+"),
+    ("NEWLINE",  r"\n"),
+    ("SKIP",     r"[ \t]+"),
+    ("MISMATCH", r"."),
+]
+LEGACY_REGEX = "|".join(f"(?P<{name}>{pattern})" for name, pattern in LEGACY_SPECIFICATION)
+
+
+def legacy_tokenize(code):
+    """The original per-call finditer + keyword-group scan, kept as a reference."""
+    tokens = []
+    for match in re.finditer(LEGACY_REGEX, code):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "COMMENT":
+            continue
+        elif kind == "META":
+            tokens.append(("META_KEYWORD", value))
+            continue
+        elif kind == "ID":
+            for group_name, words in KEYWORDS.items():
+                if value in words:
+                    kind = f"{group_name}_KEYWORD"
+                    break
+        elif kind in ("SKIP", "NEWLINE"):
+            continue
+        elif kind == "MISMATCH":
+            raise RuntimeError(f"Unexpected token: {value}")
+        tokens.append((kind, value))
+    tokens.append(("EOF", ""))
+    return tokens
+
+
+def iter_unpositioned_tokens(code, lexer=LEXER):
+    """Lexer.iter_tokens() as it was before tokens carried offsets, to
+    price the source spans."""
+    kinds = lexer.kinds
+    keyword_kinds = lexer.keyword_kinds
+    id_index = lexer.id_index
+    mismatch_index = lexer.mismatch_index
+    for match in lexer.regex.finditer(code):
+        index = match.lastindex
+        value = match.group(index)
+        if index == id_index:
+            yield (keyword_kinds.get(value, "ID"), value)
+        elif index >= mismatch_index:
+            if index != mismatch_index:
+                break
+            raise RuntimeError(f"Unexpected token: {value}")
+        else:
+            yield (kinds[index], value)
+    yield ("EOF", "")
+
+
+def unpositioned_tokenize(code):
+    return list(iter_unpositioned_tokens(code))
+
+
+def best_of(fn, arg, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def parse(tokens, sink=None):
+    return CR7Parser(tokens, sink=sink or TraceSink()).parse_program()
+
+
+# ----------------------------
+# BENCHMARKS
+# ----------------------------
+def bench_lexer(code):
+    legacy_time, legacy_tokens = best_of(legacy_tokenize, code)
+    lexer_time, tokens = best_of(tokenize, code)
+    assert [token[:2] for token in tokens] == legacy_tokens
+    rate = len(tokens) / lexer_time
+    print(f"[Lexer] {len(tokens):,} tokens, {len(code) / 1e6:.1f} MB")
+    print(f"  legacy tokenize : {len(tokens) / legacy_time:12,.0f} tokens/sec")
+    print(f"  Lexer           : {rate:12,.0f} tokens/sec ({legacy_time / lexer_time:.2f}x)")
+    print(f"  target          : {LEX_TARGET_TOKENS_PER_SEC:12,} tokens/sec "
+          + ("✅" if rate >= LEX_TARGET_TOKENS_PER_SEC else "❌"))
+
+
+def bench_spans(code, rounds=21):
+    # Run the two lexers in turn and compare each pair, so machine noise
+    # hits both alike; one pair says little, so report the median cost and
+    # the spread between the quartiles.
+    costs = []
+    for _ in range(rounds):
+        bare_time = best_of(unpositioned_tokenize, code, repeat=1)[0]
+        span_time, tokens = best_of(tokenize, code, repeat=1)
+        costs.append(span_time / bare_time - 1)
+    cost = statistics.median(costs)
+    low, _, high = statistics.quantiles(costs, n=4)
+    print(f"[Source spans] {len(tokens):,} tokens, {rounds} paired runs")
+    print(f"  with offsets    : {cost:+.1%} median, {low:+.1%} to {high:+.1%} "
+          f"interquartile (budget +5%) " + ("✅" if cost < 0.05 else "❌"))
+
+
+def retained_bytes(fn, arg):
+    tracemalloc.start()
+    try:
+        result = fn(arg)
+        return tracemalloc.get_traced_memory()[0], result
+    finally:
+        tracemalloc.stop()
+
+
+def bench_token_memory(code):
+    list_bytes, tokens = retained_bytes(tokenize, code)
+    table_bytes, table = retained_bytes(LEXER.tokenize_table, code)
+    assert list(table) == tokens
+    print(f"[Token storage] {len(tokens):,} tokens")
+    print(f"  list of tuples  : {list_bytes / len(tokens):8.1f} bytes/token")
+    print(f"  TokenTable      : {table_bytes / len(table):8.1f} bytes/token "
+          f"({list_bytes / table_bytes:.1f}x smaller)")
+
+
+def bench_relex(code, edits=200):
+    """Single-keystroke edits: Lexer.relex() splicing the table in place
+    against lexing the whole edited source again."""
+    rng = random.Random(7)
+    # Random edits can leave stray characters (a lone "." from "1.5"), so
+    # both lexers skip them into a throwaway error list.
+    table = LEXER.tokenize_table(code, errors=[])
+    relex_time = full_time = 0.0
+    for _ in range(edits):
+        offset = rng.randrange(len(code))
+        if rng.random() < 0.5:
+            removed, inserted = 0, rng.choice("x ;=+1\n")
+        else:
+            removed, inserted = 1, ""
+        code = code[:offset] + inserted + code[offset + removed:]
+        start = time.perf_counter()
+        LEXER.relex(table, code, offset, removed, inserted, [])
+        relex_time += time.perf_counter() - start
+        start = time.perf_counter()
+        full = LEXER.tokenize_table(code, errors=[])
+        full_time += time.perf_counter() - start
+    assert list(table) == list(full)
+    print(f"[Relex] {edits} single-character edits on {len(full):,} tokens")
+    print(f"  full tokenize   : {full_time / edits * 1000:9.2f} ms/edit")
+    print(f"  Lexer.relex     : {relex_time / edits * 1000:9.2f} ms/edit ({full_time / relex_time:.0f}x)")
+
+
+def bench_parser(code):
+    tokens = tokenize(code)
+    parse_time, program = best_of(parse, tokens)
+    nodes = sum(1 for _ in walk(program))
+    del program
+    tree_bytes, _ = retained_bytes(parse, tokens)
+    print(f"[Parser] {nodes:,} AST nodes from {len(tokens):,} tokens")
+    print(f"  throughput      : {nodes / parse_time:12,.0f} nodes/sec")
+    print(f"  memory          : {tree_bytes / nodes:12.1f} bytes/node")
+
+
+def bench_table_parser(code):
+    """Recursive descent against the table-driven LL(1) parser."""
+    table = LEXER.tokenize_table(code)
+    descent_time, expected = best_of(parse, table)
+    table_time, program = best_of(lambda tokens: TableParser(tokens, sink=TraceSink()).parse_program(), table)
+    assert node_to_data(program) == node_to_data(expected)
+    nodes = sum(1 for _ in walk(program))
+    build_time, _ = best_of(lambda _: build_tables(), None)
+    load_time, _ = best_of(lambda _: load_tables(), None)
+    print(f"[LL(1)] {nodes:,} AST nodes from {len(table):,} tokens")
+    print(f"  recursive descent: {nodes / descent_time:12,.0f} nodes/sec")
+    print(f"  table-driven     : {nodes / table_time:12,.0f} nodes/sec ({descent_time / table_time:.2f}x)")
+    print(f"  tables           : {build_time * 1000:.1f} ms to generate, {load_time * 1000:.2f} ms to load generated")
+
+
+def bench_parallel_lexer(code, min_bytes=PARALLEL_LEX_BYTES):
+    """tokenize_table() against tokenize_table_parallel() for 1..cpu_count
+    workers on a corpus of at least `min_bytes`."""
+    code = code * -(-min_bytes // len(code))
+    sequential_time, expected = best_of(LEXER.tokenize_table, code, repeat=2)
+    cpus = os.cpu_count() or 1
+    print(f"[Parallel lexer] {len(code) / 1e6:.1f} MB, {len(expected):,} tokens, {cpus} CPU(s)")
+    print(f"  sequential      : {sequential_time * 1000:9.1f} ms")
+    for workers in range(1, cpus + 1):
+        parallel_time, table = best_of(lambda n: LEXER.tokenize_table_parallel(code, n), workers, repeat=2)
+        assert list(table.starts) == list(expected.starts) and list(table.kinds) == list(expected.kinds)
+        print(f"  {workers:2d} worker(s)    : {parallel_time * 1000:9.1f} ms "
+              f"({sequential_time / parallel_time:.2f}x)")
+
+
+def bench_parallel(code):
+    """Sequential parse against parse_program_parallel() for 1..cpu_count
+    workers. Pool start-up is included, as it is on the command line."""
+    table = LEXER.tokenize_table(code)
+    sequential_time, expected = best_of(parse, table)
+    expected = node_to_data(expected)
+    cpus = os.cpu_count() or 1
+    print(f"[Parallel] {len(table):,} tokens, {cpus} CPU(s)")
+    print(f"  sequential      : {sequential_time * 1000:9.1f} ms")
+    for workers in range(1, cpus + 1):
+        parallel_time, program = best_of(
+            lambda n: CR7Parser(table, code, TraceSink()).parse_program_parallel(n), workers)
+        assert node_to_data(program) == expected
+        print(f"  {workers:2d} worker(s)    : {parallel_time * 1000:9.1f} ms "
+              f"({sequential_time / parallel_time:.2f}x)")
+
+
+def bench_reparse(code, edits=20):
+    """Edit one function, then relex and reparse with a FunctionCache,
+    against parsing the whole edited source from scratch."""
+    rng = random.Random(11)
+    table = LEXER.tokenize_table(code)
+    cache = FunctionCache()
+    CR7Parser(table, code, TraceSink(), cache).parse_program()
+    cached_time = full_time = 0.0
+    for _ in range(edits):
+        # Rename one use of a local: `total` -> `totals`.
+        offset = code.find("total", rng.randrange(len(code) - 100)) + len("total")
+        code = code[:offset] + "s" + code[offset:]
+        start = time.perf_counter()
+        LEXER.relex(table, code, offset, 0, "s")
+        incremental = CR7Parser(table, code, TraceSink(), cache).parse_program()
+        cached_time += time.perf_counter() - start
+        start = time.perf_counter()
+        full = parse(LEXER.tokenize_table(code))
+        full_time += time.perf_counter() - start
+        assert node_to_data(incremental) == node_to_data(full)
+    functions = code.count("play ")
+    print(f"[Reparse] {edits} one-function edits in a {functions:,}-function file")
+    print(f"  full lex + parse: {full_time / edits * 1000:9.1f} ms/edit")
+    print(f"  relex + cached  : {cached_time / edits * 1000:9.1f} ms/edit ({full_time / cached_time:.0f}x, "
+          f"{cache.hits:,} hits / {cache.misses:,} misses)")
+
+
+def bench_trace(code):
+    """Parser cost per trace mode; text and buffered output go to /dev/null."""
+    tokens = tokenize(code)
+    modes = {"off": TraceSink, "events": EventSink, "buffered": BufferedSink, "text": TextSink}
+    times = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for mode, make_sink in modes.items():
+            times[mode], _ = best_of(lambda tokens: parse(tokens, make_sink()), tokens)
+    print(f"[Trace] parsing {len(tokens):,} tokens")
+    for mode, seconds in times.items():
+        print(f"  {mode:16}: {seconds * 1000:9.1f} ms ({seconds / times['off']:.2f}x off)")
+
+
+def count_ops(interpreter):
+    """Wrap every dispatch-table entry so each executed statement or
+    evaluated expression bumps a counter; returns the counter list."""
+    counter = [0]
+
+    def counting(handler):
+        def wrapped(node, frame):
+            counter[0] += 1
+            return handler(node, frame)
+        return wrapped
+
+    for table in (interpreter.statements, interpreter.expressions):
+        for kind, handler in table.items():
+            table[kind] = counting(handler)
+    return counter
+
+
+def loop_program(iterations):
+    return parse(tokenize(LOOP_PROGRAM.format(iterations=iterations)))
+
+
+def bench_interpreter(code, iterations=20000):
+    counted = Interpreter(loop_program(iterations))
+    counter = count_ops(counted)
+    result = counted.run()
+    ops = counter[0]
+    run_time, _ = best_of(lambda program: Interpreter(program).run(), loop_program(iterations))
+    print(f"[Interpreter] loop program, {iterations:,} iterations, {ops:,} ops -> {result}")
+    print(f"  AST walker      : {ops / run_time:12,.0f} ops/sec")
+    return ops, run_time
+
+
+def bench_vm(code, iterations=20000):
+    ops, ast_time = bench_interpreter(code, iterations)
+    module = compile_program(loop_program(iterations))
+    vm_time, result = best_of(lambda module: VM(module).run(), module)
+    print(f"  bytecode VM     : {ops / vm_time:12,.0f} ops/sec "
+          f"({ast_time / vm_time:.2f}x the AST walker) -> {result}")
+    return ops, ast_time
+
+
+def bench_python(code, iterations=20000):
+    ops, ast_time = bench_vm(code, iterations)
+    module = generate(loop_program(iterations))
+    module.compiled()
+    py_time, result = best_of(run_python, module)
+    print(f"  Python codegen  : {ops / py_time:12,.0f} ops/sec "
+          f"({ast_time / py_time:.2f}x the AST walker) -> {result}")
+
+
+BENCHMARKS = {
+    "lexer": bench_lexer,
+    "tokens": bench_token_memory,
+    "spans": bench_spans,
+    "relex": bench_relex,
+    "parser": bench_parser,
+    "ll1": bench_table_parser,
+    "trace": bench_trace,
+    "reparse": bench_reparse,
+    "parallel": bench_parallel,
+    "parallel-lexer": bench_parallel_lexer,
+    "interpreter": bench_interpreter,
+    "vm": bench_vm,
+    "python": bench_python,
+}
+
+
+def main():
+    functions = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    selected = sys.argv[1:2] or list(BENCHMARKS)
+    if selected == ["all"]:
+        selected = list(BENCHMARKS)
+    code = generate_corpus(functions)
+    for name in selected:
+        BENCHMARKS[name](code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import hashlib
+import marshal
+import os
+import tempfile
+from importlib.util import MAGIC_NUMBER
+
+# ----------------------------
+# COMPILE CACHE
+# ----------------------------
+# Content-addressed store of compiler artefacts. An entry is keyed by the
+# hash of the source bytes plus the compiler version and the Python bytecode
+# magic, and holds a dict of marshal-friendly artefacts, e.g. {"tokens": ...,
+# "ast": ..., "bytecode": ...}; backends add their artefact to an existing
+# entry as they produce it.
+MAGIC = b"CR7C\x01"
+SUFFIX = ".cr7c"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_DIR_ENV = "CR7_CACHE_DIR"
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest
+
+
+class CompileCache:
+    """Directory of .cr7c files with size-bounded LRU eviction.
+
+    Recency is tracked through file modification times: a hit touches the
+    entry, and when the directory grows past `max_bytes` the stalest
+    entries are deleted first.
+    """
+
+    def __init__(self, directory, version, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, version, max_bytes=DEFAULT_MAX_BYTES):
+        """The cache named by $CR7_CACHE_DIR, or None when it is unset."""
+        directory = os.environ.get(CACHE_DIR_ENV)
+        return cls(directory, version, max_bytes) if directory else None
+
+    # ----------------------------
+    # KEYS
+    # ----------------------------
+    def key(self, source):
+        """Key for a str or bytes-like source."""
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        digest = hashlib.sha256(source)
+        return self.finish_key(digest)
+
+    def key_for_file(self, path):
+        return self.finish_key(hash_file(path))
+
+    def finish_key(self, digest):
+        # Entries hold marshalled code objects, which only the Python that
+        # wrote them can load.
+        digest.update(b"\0" + self.version.encode("ascii") + b"\0" + MAGIC_NUMBER)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    # ----------------------------
+    # ENTRIES
+    # ----------------------------
+    def get(self, key):
+        """Return the artefact dict stored under `key` ({} on a miss)."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return {}
+        if not data.startswith(MAGIC):
+            return {}
+        try:
+            entry = marshal.loads(data[len(MAGIC):])
+        except (EOFError, ValueError, TypeError):
+            return {}
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def update(self, key, **artefacts):
+        """Merge `artefacts` into the entry for `key` and write it back.
+        An entry nested too deeply for marshal is returned but not written."""
+        entry = self.get(key)
+        entry.update(artefacts)
+        try:
+            data = MAGIC + marshal.dumps(entry)
+        except ValueError:
+            return entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self.path(key))
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+        return entry
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not item.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(SUFFIX):
+                    os.unlink(item.path)
@@ -0,0 +1,126 @@
+import errno
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+
+from cr7_cache import CACHE_DIR_ENV
+
+# ----------------------------
+# DAEMON CLIENT
+# ----------------------------
+# Thin front end for `cr7_compiler.py --serve`: forwards its argv to the
+# daemon over a Unix socket and replays what comes back. It only imports
+# the standard library so starting it stays cheap; with no daemon running
+# it falls back to compiling in-process.
+#
+# Protocol: the client sends one JSON line {"argv", "cwd", "env"}. The
+# daemon answers with JSON lines: {"out": text} and {"err": text} carry
+# output, {"read": true} asks for one line of stdin (answered with
+# {"line": text}, "" at EOF), and {"exit": status} ends the request.
+#
+# Whoever answers on the socket runs the user's scripts and sees their
+# input, so the default socket lives where no one else can create it, and
+# a socket owned by another user is never connected to.
+SOCKET_ENV = "CR7_SOCKET"
+RUNTIME_DIR_ENV = "XDG_RUNTIME_DIR"
+SOCKET_NAME = "cr7.sock"
+FORWARDED_ENV = (CACHE_DIR_ENV,)
+
+
+def socket_dir(create=False):
+    """$XDG_RUNTIME_DIR, or else cr7-<uid> in the temp directory, which must
+    be the user's own and closed to everyone else; `create` makes it."""
+    runtime = os.environ.get(RUNTIME_DIR_ENV)
+    if runtime:
+        return runtime
+    directory = os.path.join(tempfile.gettempdir(), f"cr7-{os.getuid()}")
+    if create:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+    check_owned(directory, private=True)
+    return directory
+
+
+def socket_path(create=False):
+    """$CR7_SOCKET, or cr7.sock in socket_dir()."""
+    return os.environ.get(SOCKET_ENV) or os.path.join(socket_dir(create), SOCKET_NAME)
+
+
+def check_owned(path, private=False):
+    """Raise PermissionError unless the user owns `path` (not following
+    symlinks); a `private` one must also be a directory no one else can use."""
+    info = os.lstat(path)
+    if info.st_uid != os.getuid():
+        raise PermissionError(errno.EPERM, "Owned by another user", path)
+    if private and (not stat.S_ISDIR(info.st_mode) or info.st_mode & 0o077):
+        raise PermissionError(errno.EPERM, "Not a private directory", path)
+
+
+def send(connection, message):
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def request(argv, path=None, stdin=None, stdout=None, stderr=None):
+    """Run the compiler with `argv` in the daemon at `path`; returns its exit
+    status. Raises OSError when no daemon is listening or it drops the
+    request before answering, PermissionError when the socket is not the
+    user's own. A connection lost after that is reported, with status 1."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    path = path or socket_path()
+    check_owned(path)
+    answered = False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(path)
+            send(connection, {
+                "argv": list(argv),
+                "cwd": os.getcwd(),
+                "env": {name: os.environ.get(name) for name in FORWARDED_ENV},
+            })
+            with connection.makefile("rb") as replies:
+                for line in replies:
+                    answered = True
+                    message = json.loads(line)
+                    if "out" in message:
+                        stdout.write(message["out"])
+                    elif "err" in message:
+                        stderr.write(message["err"])
+                    elif "read" in message:
+                        stdout.flush()
+                        send(connection, {"line": stdin.readline()})
+                    elif "exit" in message:
+                        stdout.flush()
+                        return message["exit"]
+        except OSError as e:
+            if not answered:
+                raise
+            # Some output already came back, so running again would repeat it.
+            stdout.flush()
+            stderr.write(f"[CR7 Client] Lost the daemon: {e}\n")
+            return 1
+    stderr.write("[CR7 Client] The daemon closed the connection\n")
+    return 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        return request(argv)
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+    except OSError as e:
+        sys.stderr.write(f"[CR7 Client] Not using the daemon: {e}\n")
+    # No daemon: behave exactly like cr7_compiler.py, just slower.
+    from cr7_compiler import main as compile_main
+    return compile_main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,36 @@
 import re
 import sys
 import os
+import mmap
+import argparse
+import json
+import hashlib
+import io
+import marshal
+import glob
+import time
+import signal
+import socketserver
+import traceback
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager, redirect_stderr, redirect_stdout
+from itertools import repeat
+from multiprocessing import shared_memory
+
+from cr7_ast import (
+    Assignment, BinOp, Call, Declaration, For, Function, If, Import, Input,
+    LogicalOp, Name, Number, Output, Program, Return, String, UnaryOp, While,
+)
+from cr7_ast import node_from_data, node_to_data, shifted, walk
+from cr7_cache import DEFAULT_MAX_BYTES, CompileCache
+from cr7_client import check_owned, send, socket_path
+from cr7_interpreter import CR7RuntimeError, resolve, run_program
+from cr7_profile import Profile
+from cr7_pygen import PythonModule, generate, run_python
+from cr7_vm import Module, compile_program, disassemble, instruction_width, run_module
 
 KEYWORDS = {
     "FUNCTION": ["play", "kickoff", "whistle"],
@@ -14,8 +44,8 @@ KEYWORDS = {
 token_specification = [
     ("META",     r"#\w+"),
     ("COMMENT",  r"//.*"),
-    ("NUMBER",   r"\d+(\.\d+)?"),
-    ("ASSIGN",   r"="),
+    ("NUMBER",   r"\d+(?:\.\d+)?"),
+    ("ASSIGN",   r"=(?!=)"),
     ("COMMA",    r","),
     ("END",      r";"),
     ("LPAREN",   r"\("),
@@ -24,7 +54,7 @@ token_specification = [
     ("RBRACE",   r"\}"),
     ("STRING",   r'"[^"]*"'),
     ("ID",       r"[A-Za-z_]\w*"),
-    ("OP",       r"[+\-*/<>!=]+"),
+    ("OP",       r"\+\+|--|&&|\|\||[<>!=]=|[+\-*/<>!]"),
     ("NEWLINE",  r"\n"),
     ("SKIP",     r"[ \t]+"),
     ("MISMATCH", r"."),
@@ -32,299 +62,2012 @@ token_specification = [
 
 token_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in token_specification)
 
+# Tokens are (kind, value, offset) triples; offset is where the token starts
+# in the source. Synthesised EOF tokens past the end have no offset.
+EOF_TOKEN = ("EOF", "", None)
+
+# Every token kind the lexer can emit, indexed by its compact kind code.
+KIND_NAMES = tuple(
+    ["EOF", "META_KEYWORD"]
+    + [f"{group_name}_KEYWORD" for group_name in KEYWORDS if group_name != "META"]
+    + [name for name, _ in token_specification if name not in ("META", "SKIP", "NEWLINE", "COMMENT", "MISMATCH")]
+)
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+
+# Part of every compile-cache key; bump it whenever an artefact format or
+# the meaning of a compiled program changes.
+COMPILER_VERSION = "0.15"
+
+# Files larger than this many bytes are lexed straight from an mmap by default.
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# Below this many bytes --jobs lexes in-process; a pool costs more than it saves.
+PARALLEL_LEX_THRESHOLD = 1024 * 1024
+
 # ----------------------------
 # LEXER
 # ----------------------------
+class LexError(RuntimeError):
+    """A character no token starts with."""
+
+
+class Lexer:
+    """Single-pass lexer built once from `token_specification`.
+
+    Whitespace and comments are folded into a prefix of every token match, so
+    the Python loop only runs once per emitted token. Token kinds are
+    resolved from the match's group index, and every keyword group is
+    flattened into one dict so an ID costs a single lookup. Token text is
+    read as match[index], which skips a method call per token and pays for
+    the start offset every token carries.
+    """
+
+    IGNORED = ("SKIP", "NEWLINE", "COMMENT")
+
+    def __init__(self, specification=token_specification, keywords=KEYWORDS):
+        skip = "|".join(pattern for name, pattern in specification if name in self.IGNORED)
+        emitted = [(name, pattern) for name, pattern in specification if name not in self.IGNORED]
+        # A last, empty group matches at the end of the input, so trailing
+        # whitespace or a final comment ends the scan instead of being
+        # backtracked into a MISMATCH. It sorts after MISMATCH, so the hot
+        # loops only test for it on their `index >= mismatch_index` branch.
+        pattern = f"(?:{skip})*(?:" + "|".join(f"({pattern})" for _, pattern in emitted) + r"|(\Z))"
+        self.regex = re.compile(pattern)
+        self.bytes_regex = re.compile(pattern.encode("ascii"))
+        self.kinds = (None,) + tuple(
+            "META_KEYWORD" if name == "META" else name for name, _ in emitted
+        )
+        self.id_index = self.kinds.index("ID")
+        self.mismatch_index = self.kinds.index("MISMATCH")
+        self.end_index = len(self.kinds)
+        self.keyword_kinds = {
+            word: f"{group_name}_KEYWORD"
+            for group_name, words in keywords.items()
+            for word in words
+        }
+
+    def iter_tokens(self, code):
+        """Yield tokens lazily, ending with EOF, so parsing can start before
+        lexing finishes. `code` may also be a bytes-like buffer (e.g. an mmap),
+        in which case only the matched token slices are decoded."""
+        if not isinstance(code, str):
+            yield from self.iter_bytes_tokens(code)
+            return
+        kinds = self.kinds
+        keyword_kinds = self.keyword_kinds
+        id_index = self.id_index
+        mismatch_index = self.mismatch_index
+        for match in self.regex.finditer(code):
+            index = match.lastindex
+            value = match[index]
+            if index == id_index:
+                yield (keyword_kinds.get(value, "ID"), value, match.start(index))
+            elif index >= mismatch_index:
+                if index != mismatch_index:
+                    break
+                self.mismatch(code, value, match.start(index))
+            else:
+                yield (kinds[index], value, match.start(index))
+        yield ("EOF", "", len(code))
+
+    def iter_bytes_tokens(self, buffer):
+        kinds = self.kinds
+        keyword_kinds = self.keyword_kinds
+        id_index = self.id_index
+        mismatch_index = self.mismatch_index
+        for match in self.bytes_regex.finditer(buffer):
+            index = match.lastindex
+            value = match[index].decode("utf-8", "replace")
+            if index == id_index:
+                yield (keyword_kinds.get(value, "ID"), value, match.start(index))
+            elif index >= mismatch_index:
+                if index != mismatch_index:
+                    break
+                self.mismatch(buffer, value, match.start(index))
+            else:
+                yield (kinds[index], value, match.start(index))
+        yield ("EOF", "", len(buffer))
+
+    def mismatch(self, code, value, offset):
+        line, column = LineIndex(code).position(offset)
+        raise LexError(f"Unexpected token: {value} at line {line}, column {column}")
+
+    def tokenize(self, code):
+        return list(self.iter_tokens(code))
+
+    def tokenize_table(self, code, start=0, stop=None, errors=None):
+        """Lex `code` (a str or bytes-like buffer) into a compact TokenTable.
+        With `start`/`stop` only that region is lexed; offsets stay absolute.
+        When an `errors` list is given, unexpected characters are skipped and
+        their offsets appended to it instead of raising."""
+        stop = len(code) if stop is None else stop
+        decode = not isinstance(code, str)
+        regex = self.bytes_regex if decode else self.regex
+        group_codes = [KIND_CODES.get(kind) for kind in self.kinds]
+        keyword_codes = {word: KIND_CODES[kind] for word, kind in self.keyword_kinds.items()}
+        id_code = KIND_CODES["ID"]
+        id_index = self.id_index
+        mismatch_index = self.mismatch_index
+
+        table = TokenTable(byte_offsets=decode)
+        add_kind = table.kinds.append
+        add_start = table.starts.append
+        add_value = table.value_ids.append
+        interned = table.interned
+        values = table.values
+        for match in regex.finditer(code, start, stop):
+            index = match.lastindex
+            value = match[index]
+            if decode:
+                value = value.decode("utf-8", "replace")
+            if index == id_index:
+                add_kind(keyword_codes.get(value, id_code))
+            elif index >= mismatch_index:
+                if index != mismatch_index:
+                    break
+                if errors is None:
+                    self.mismatch(code, value, match.start(index))
+                errors.append(match.start(index))
+                continue
+            else:
+                add_kind(group_codes[index])
+            value_id = interned.get(value)
+            if value_id is None:
+                value_id = interned[value] = len(values)
+                values.append(value)
+            add_value(value_id)
+            add_start(match.start(index))
+        table.append_eof(stop)
+        return table
+
+    def tokenize_table_parallel(self, code, workers=None, errors=None):
+        """tokenize_table() with the source cut into chunks that are lexed in
+        a process pool and joined back into one table.
+
+        Chunks end right after a newline, where no token but a string can
+        carry on. A chunk that ends inside a string shows up as an unmatched
+        quote; its tokens are kept up to that quote and the rest is lexed
+        again here, through the end of the next chunk.
+        """
+        workers = workers or os.cpu_count() or 1
+        text = isinstance(code, str)
+        bounds = chunk_bounds(code, workers * LEX_CHUNKS_PER_WORKER)
+        # Workers read the source from shared memory as UTF-8, so str chunks
+        # are encoded one by one and remember where their characters start.
+        if text:
+            encoded = [code[start:stop].encode("utf-8") for start, stop in bounds]
+            size = sum(map(len, encoded))
+        else:
+            size = len(code)
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            tasks = []
+            if text:
+                position = 0
+                for (start, _), data in zip(bounds, encoded):
+                    memory.buf[position:position + len(data)] = data
+                    tasks.append((position, position + len(data), start))
+                    position += len(data)
+                del encoded
+            else:
+                memory.buf[:size] = code
+                tasks = [(start, stop, start) for start, stop in bounds]
+            with ProcessPoolExecutor(workers, initializer=init_lex_worker, initargs=(self, memory.name)) as pool:
+                futures = [pool.submit(lex_chunk, *task, text) for task in tasks]
+                results = [future.result() for future in futures]
+        finally:
+            memory.close()
+            memory.unlink()
+
+        table = TokenTable(byte_offsets=not text)
+        found = []
+        index = 0
+        while index < len(results):
+            data, chunk_errors = results[index]
+            chunk = TokenTable.from_data(data)
+            index += 1
+            quote = open_quote(code, chunk_errors)
+            while quote is not None and index < len(results):
+                table.extend(chunk, bisect_left(chunk.starts, quote))
+                found.extend(offset for offset in chunk_errors if offset < quote)
+                chunk_errors = []
+                chunk = self.tokenize_table(code, quote, bounds[index][1], chunk_errors)
+                index += 1
+                quote = open_quote(code, chunk_errors)
+            table.extend(chunk, len(chunk) - 1)  # without the chunk's EOF
+            found.extend(chunk_errors)
+        table.append_eof(len(code))
+        if found:
+            if errors is None:
+                value = code[found[0]:found[0] + 1]
+                self.mismatch(code, value if text else value.decode("utf-8", "replace"), found[0])
+            errors.extend(found)
+        return table
+
+    def relex(self, table, code, offset, removed, inserted, errors=None):
+        """Bring `table`, lexed from the source before an edit, up to date
+        with `code`, the source after `removed` characters at `offset` were
+        replaced by `inserted`.
+
+        Lexing restarts at the last token before the edit and stops at the
+        first new token past the edit that lines up with an old one (same
+        shifted start, kind and value); from there on the lexer would
+        retrace the old tokens, so they are kept and only their offsets
+        move. The table is updated in place, and so is `errors`, the offsets
+        of the unexpected characters in the source before the edit: those
+        in the relexed stretch are found again. Returns (first, old_stop,
+        new_stop): tokens[first:old_stop] were replaced by
+        tokens[first:new_stop].
+        """
+        decode = table.byte_offsets
+        regex = self.bytes_regex if decode else self.regex
+        group_codes = [KIND_CODES.get(kind) for kind in self.kinds]
+        keyword_codes = {word: KIND_CODES[kind] for word, kind in self.keyword_kinds.items()}
+        id_code = KIND_CODES["ID"]
+        id_index = self.id_index
+        mismatch_index = self.mismatch_index
+
+        kinds, starts, value_ids = table.kinds, table.starts, table.value_ids
+        interned, values = table.interned, table.values
+        delta = len(inserted) - removed
+        inserted_end = offset + len(inserted)
+        # A token ending right at the edit could grow into it, so restart
+        # from the last token that starts before the edit. A quote left
+        # unmatched earlier (skipped as an error) can pair with one the edit
+        # adds, so restart before the last quote too unless a string owns it.
+        restart = offset
+        quote = code.rfind(b'"' if decode else '"', 0, offset)
+        if quote >= 0:
+            owner = bisect_right(starts, quote) - 1
+            if owner < 0 or kinds[owner] != KIND_CODES["STRING"] or quote >= table.span(owner)[1]:
+                restart = quote
+        # The edit can move tokens that start at or after `restart`, so the
+        # old start of one of those is no place to resume; with no token
+        # before `restart`, lex from the top.
+        first = bisect_left(starts, restart) - 1
+        if first < 0:
+            first = position = 0
+        else:
+            position = starts[first]
+        old_index = bisect_left(starts, offset + removed, first)
+        old_count = len(starts) - 1  # the EOF token never lines up
+
+        new_kinds, new_starts, new_ids = array("B"), array("I"), array("I")
+        found = []
+        resync = None
+        for match in regex.finditer(code, position):
+            index = match.lastindex
+            start = match.start(index)
+            value = match[index]
+            if decode:
+                value = value.decode("utf-8", "replace")
+            if index == id_index:
+                kind = keyword_codes.get(value, id_code)
+            elif index >= mismatch_index:
+                if index != mismatch_index:
+                    break
+                if errors is None:
+                    self.mismatch(code, value, start)
+                found.append(start)
+                continue
+            else:
+                kind = group_codes[index]
+            if start >= inserted_end:
+                old_start = start - delta
+                while old_index < old_count and starts[old_index] < old_start:
+                    old_index += 1
+                if (old_index < old_count and starts[old_index] == old_start
+                        and kinds[old_index] == kind and values[value_ids[old_index]] == value):
+                    resync = old_index
+                    break
+            value_id = interned.get(value)
+            if value_id is None:
+                value_id = interned[value] = len(values)
+                values.append(value)
+            new_kinds.append(kind)
+            new_starts.append(start)
+            new_ids.append(value_id)
+
+        old_stop = len(starts) if resync is None else resync
+        if errors:
+            # The relexed stretch ran from `position` to where the old tokens
+            # resume; later unexpected characters move with the text.
+            end = len(code) - delta if resync is None else starts[resync]
+            errors[bisect_left(errors, position):] = found + [
+                error + delta for error in errors[bisect_left(errors, end):]]
+        elif errors is not None:
+            errors.extend(found)
+        if resync is None:
+            eof_id = interned.get("")
+            if eof_id is None:
+                eof_id = interned[""] = len(values)
+                values.append("")
+            new_kinds.append(KIND_CODES["EOF"])
+            new_starts.append(len(code))
+            new_ids.append(eof_id)
+        tail = starts[old_stop:]
+        if delta:
+            tail = array("I", [start + delta for start in tail])
+        kinds[first:old_stop] = new_kinds
+        value_ids[first:old_stop] = new_ids
+        del starts[first:]
+        starts.extend(new_starts)
+        starts.extend(tail)
+        return first, old_stop, first + len(new_kinds)
+
+
+LEXER = Lexer()
+
+
 def tokenize(code):
-    tokens = []
-    for match in re.finditer(token_regex, code):
-        kind = match.lastgroup
-        value = match.group()
-
-        if kind == "COMMENT":
-            continue
-        elif kind == "META":
-            tokens.append(("META_KEYWORD", value))
-            continue
-        elif kind == "ID":
-            for group_name, words in KEYWORDS.items():
-                if value in words:
-                    kind = f"{group_name}_KEYWORD"
+    return LEXER.tokenize(code)
+
+
+class TokenTable:
+    """Compact token storage: parallel arrays of kind codes, source offsets
+    and value ids into an intern table, so a token costs ~9 bytes instead of
+    a tuple of strings. Indexing yields the usual (kind, value, offset) token.
+
+    End offsets are not stored; a token ends where its value does, measured
+    in bytes when the table was lexed from a bytes buffer.
+    """
+
+    def __init__(self, byte_offsets=False):
+        self.kinds = array("B")
+        self.starts = array("I")
+        self.value_ids = array("I")
+        self.values = []
+        self.interned = {}
+        self.byte_offsets = byte_offsets
+
+    def append_eof(self, offset):
+        value_id = self.interned.get("")
+        if value_id is None:
+            value_id = self.interned[""] = len(self.values)
+            self.values.append("")
+        self.kinds.append(KIND_CODES["EOF"])
+        self.starts.append(offset)
+        self.value_ids.append(value_id)
+
+    def extend(self, other, stop=None):
+        """Append other[:stop], interning its values into this table."""
+        stop = len(other) if stop is None else stop
+        interned, values = self.interned, self.values
+        value_ids = []
+        for value in other.values:
+            value_id = interned.get(value)
+            if value_id is None:
+                value_id = interned[value] = len(values)
+                values.append(value)
+            value_ids.append(value_id)
+        self.kinds.extend(other.kinds[:stop])
+        self.starts.extend(other.starts[:stop])
+        self.value_ids.extend(map(value_ids.__getitem__, other.value_ids[:stop]))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        return (KIND_NAMES[self.kinds[i]], self.values[self.value_ids[i]], self.starts[i])
+
+    def __iter__(self):
+        values = self.values
+        for code, value_id, start in zip(self.kinds, self.value_ids, self.starts):
+            yield (KIND_NAMES[code], values[value_id], start)
+
+    def value(self, i):
+        return self.values[self.value_ids[i]]
+
+    def span(self, i):
+        value = self.value(i)
+        width = len(value.encode("utf-8")) if self.byte_offsets else len(value)
+        return self.starts[i], self.starts[i] + width
+
+    def to_data(self):
+        return (self.kinds.tobytes(), self.starts.tobytes(), self.value_ids.tobytes(),
+                self.values, self.byte_offsets)
+
+    @classmethod
+    def from_data(cls, data):
+        kinds, starts, value_ids, values, byte_offsets = data
+        table = cls(byte_offsets)
+        table.kinds.frombytes(kinds)
+        table.starts.frombytes(starts)
+        table.value_ids.frombytes(value_ids)
+        table.values = list(values)
+        table.interned = {value: i for i, value in enumerate(table.values)}
+        return table
+
+
+class LineIndex:
+    """Maps source offsets to 1-based (line, column) pairs. Line starts are
+    only collected on the first lookup, so lexing never counts lines."""
+
+    def __init__(self, source):
+        self.source = source
+        self.line_starts = None
+
+    def build(self):
+        newline = "\n" if isinstance(self.source, str) else b"\n"
+        find = self.source.find
+        line_starts = array("I", [0])
+        i = find(newline)
+        while i != -1:
+            line_starts.append(i + 1)
+            i = find(newline, i + 1)
+        self.line_starts = line_starts
+
+    def position(self, offset):
+        if self.line_starts is None:
+            self.build()
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+
+class TokenCursor:
+    """Positional view over an indexable token sequence (a list or a
+    TokenTable), starting at tokens[start]; past the end it keeps
+    returning EOF."""
+
+    def __init__(self, tokens, start=0):
+        self.tokens = tokens
+        self.index = start
+        self.size = len(tokens)
+
+    def peek(self, n=0):
+        i = self.index + n
+        return self.tokens[i] if i < self.size else EOF_TOKEN
+
+    def advance(self):
+        token = self.peek()
+        self.index += 1
+        return token
+
+
+class TokenStream:
+    """Pulls tokens on demand from any iterable (a list or a Lexer
+    generator), holding at most `max_lookahead + 1` of them at a time."""
+
+    def __init__(self, tokens, max_lookahead=1):
+        self.source = iter(tokens)
+        self.buffer = deque()
+        self.max_lookahead = max_lookahead
+
+    def peek(self, n=0):
+        buffer = self.buffer
+        if len(buffer) > n:
+            return buffer[n]
+        if n > self.max_lookahead:
+            raise IndexError(f"Lookahead {n} exceeds buffer size {self.max_lookahead}")
+        while len(buffer) <= n:
+            buffer.append(next(self.source, EOF_TOKEN))
+        return buffer[n]
+
+    def advance(self):
+        token = self.peek()
+        self.buffer.popleft()
+        return token
+
+def top_level_spans(tokens):
+    """Split a token sequence into its top-level items by brace counting
+    alone, without parsing: a (start, stop) index range per `#import` line
+    and per `play` function up to its matching `}`. Functions don't nest, so
+    an unclosed one ends where the next item begins, and stray tokens
+    between items form a span of their own; the parser then reports what
+    is wrong inside each span.
+
+    `play` is also a valid function name and callee, so it only begins an
+    item outside parentheses and after a token that leaves no name or
+    operand pending: `play play() {` and `announce play() + 1;` stay whole."""
+    # Scan kind codes and value ids rather than building token tuples.
+    if isinstance(tokens, TokenTable):
+        kinds, value_ids = tokens.kinds, tokens.value_ids
+        play = tokens.interned.get("play", -1)
+    else:
+        kinds = [KIND_CODES[kind] for kind, _, _ in tokens]
+        value_ids = [value == "play" for _, value, _ in tokens]
+        play = True
+    eof, meta = KIND_CODES["EOF"], KIND_CODES["META_KEYWORD"]
+    lbrace, rbrace = KIND_CODES["LBRACE"], KIND_CODES["RBRACE"]
+    lparen, rparen = KIND_CODES["LPAREN"], KIND_CODES["RPAREN"]
+    # After one of these, a `play` is a function name or an operand.
+    pending = {KIND_CODES[kind] for kind in ("FUNCTION_KEYWORD", "OUTPUT_KEYWORD", "OP", "ASSIGN", "COMMA")}
+    spans = []
+    i = 0
+    while True:
+        kind = kinds[i]
+        if kind == eof:
+            return spans
+        start = i
+        i += 1
+        if kind == meta and kinds[i] == meta:
+            i += 1
+        elif value_ids[start] != play:
+            parens = 0
+            while True:
+                kind = kinds[i]
+                if kind == eof or kind == meta or (
+                        value_ids[i] == play and parens <= 0 and kinds[i - 1] not in pending):
                     break
-        elif kind in ("SKIP", "NEWLINE"):
-            continue
-        elif kind == "MISMATCH":
-            raise RuntimeError(f"Unexpected token: {value}")
-        tokens.append((kind, value))
-    tokens.append(("EOF", ""))
-    return tokens
+                i += 1
+                if kind == lparen:
+                    parens += 1
+                elif kind == rparen:
+                    parens -= 1
+        else:
+            depth = parens = 0
+            while True:
+                kind = kinds[i]
+                if kind == eof or (value_ids[i] == play and parens <= 0 and kinds[i - 1] not in pending):
+                    break
+                i += 1
+                if kind == lparen:
+                    parens += 1
+                elif kind == rparen:
+                    parens -= 1
+                elif kind == lbrace or kind == rbrace:
+                    parens = 0  # no brace is ever inside parentheses
+                    depth += 1 if kind == lbrace else -1
+                    if depth <= 0:
+                        break
+        spans.append((start, i))
+
+
+class FunctionCache:
+    """Parsed top-level items keyed by a digest of their source text, or of
+    their tokens (kinds, values and offsets relative to the item's first
+    token) when the parser has no source. An item whose text is unchanged
+    therefore hits even after edits elsewhere moved it. A moved item is
+    handed out as a copy with its offsets shifted to the new position, so
+    programs parsed earlier keep theirs; an item that did not move is
+    shared as is. Entries the latest parse did not use are dropped."""
+
+    def __init__(self):
+        self.entries = {}  # key -> (node, start offset)
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tokens, start, stop, source=None):
+        if source is not None:
+            # The same text lexes to the same tokens, so hash it directly.
+            first, last = tokens[start], tokens[stop - 1]
+            end = tokens.span(stop - 1)[1] if isinstance(tokens, TokenTable) else last[2] + len(last[1])
+            text = source[first[2]:end]
+            return hashlib.blake2b(text.encode("utf-8") if isinstance(text, str) else text, digest_size=16).digest()
+        if isinstance(tokens, TokenTable):
+            base = tokens.starts[start]
+            values = tokens.values
+            digest = hashlib.blake2b(tokens.kinds[start:stop].tobytes(), digest_size=16)
+            digest.update(array("I", [offset - base for offset in tokens.starts[start:stop]]).tobytes())
+            digest.update("\0".join([values[i] for i in tokens.value_ids[start:stop]]).encode("utf-8"))
+        else:
+            base = tokens[start][2]
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(repr([(kind, value, offset - base) for kind, value, offset in tokens[start:stop]]).encode("utf-8"))
+        return digest.digest()
+
+    def get(self, key, start):
+        entry = self.entries.get(key)
+        if entry is None or key in self.used:  # never share a node within one program
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used.add(key)
+        node, cached_start = entry
+        if cached_start != start:
+            node = shifted(node, start - cached_start)
+            self.entries[key] = (node, start)
+        return node
+
+    def put(self, key, node, start):
+        self.entries[key] = (node, start)
+        self.used.add(key)
+
+    def retain_used(self):
+        """Drop entries not used since the last call."""
+        self.entries = {key: self.entries[key] for key in self.used}
+        self.used = set()
+
+
+# ----------------------------
+# TRACE SINKS
+# ----------------------------
+# The parser reports progress as events: start(), node() once per parsed
+# construct, finish(). Every call site is guarded by `if self.tracing:`, so a
+# disabled sink costs one attribute test and no message is ever built.
+class TraceSink:
+    """Disabled sink: the parser skips all tracing."""
+    enabled = False
+
+    def start(self):
+        pass
+
+    def node(self, label, offset, detail=None):
+        pass
+
+    def finish(self):
+        pass
+
+    def flush(self):
+        pass
+
+
+def node_message(label, detail=None):
+    return f"→ {label} parsed" + (f" ({detail})" if detail is not None else "")
+
+
+class TextSink(TraceSink):
+    """Writes the classic progress lines as they happen via write(msg, color)."""
+    enabled = True
+
+    def __init__(self, write=None):
+        self.write = write or (lambda msg, color=None: print(msg))
+
+    def start(self):
+        self.write("[Parser] Starting CR7 Script Parsing...\n", "header")
+
+    def node(self, label, offset, detail=None):
+        self.write(node_message(label, detail), "info")
+
+    def finish(self):
+        self.write("\n[Parser] Parsing completed successfully ✅", "success")
+
+
+class BufferedSink(TextSink):
+    """Collects (msg, color) lines and hands them to write_lines(lines) in a
+    single call on flush(). By default they go to stdout in one write. With
+    `batch`, lines are also handed over whenever that many are pending."""
+
+    def __init__(self, write_lines=None, batch=None):
+        super().__init__(self.collect)
+        self.lines = []
+        self.batch = batch
+        self.write_lines = write_lines or (lambda lines: sys.stdout.write("".join(msg + "\n" for msg, _ in lines)))
+
+    def collect(self, msg, color=None):
+        self.lines.append((msg, color))
+        if self.batch is not None and len(self.lines) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            lines, self.lines = self.lines, []
+            self.write_lines(lines)
+
+
+class EventSink(TraceSink):
+    """Records (event, label, offset, detail) tuples for tools to consume."""
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    def start(self):
+        self.events.append(("start", None, None, None))
+
+    def node(self, label, offset, detail=None):
+        self.events.append(("node", label, offset, detail))
+
+    def finish(self):
+        self.events.append(("finish", None, None, None))
+
+
+TRACE_MODES = {
+    "text": TextSink,
+    "buffered": BufferedSink,
+    "events": EventSink,
+    "off": TraceSink,
+}
+
 
 # ----------------------------
 # PARSER
 # ----------------------------
+# Binding power of each binary operator, loosest first; all of them are
+# left-associative. Prefix operators bind tighter than any of them.
+BINARY_OPERATORS = {
+    "||": 1,
+    "&&": 2,
+    "==": 3, "!=": 3,
+    "<": 4, ">": 4, "<=": 4, ">=": 4,
+    "+": 5, "-": 5,
+    "*": 6, "/": 6,
+}
+PREFIX_OPERATORS = {"!": 7, "-": 7}
+LOGICAL_OPERATORS = ("&&", "||")
+
+# Statements that open a block, and how the trace names them once closed.
+BLOCK_KEYWORDS = ("referee", "practice", "drill")
+BLOCK_LABELS = {If: "If statement", While: "While", For: "For"}
+
+
+class ParseError(Exception):
+    """Raised by CR7Parser.error() under parse_all() to unwind to the
+    nearest point where parsing can resume."""
+
+
 class CR7Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
+    def __init__(self, tokens, source=None, sink=None, cache=None):
+        # Progress goes through self.log by default; errors always do.
+        self.sink = TextSink(self.log) if sink is None else sink
+        self.cache = cache  # FunctionCache reused across parses of edited source
+        self.tracing = self.sink.enabled
+        self.lines = LineIndex(source) if source is not None else None
+        if isinstance(tokens, (TokenStream, TokenCursor)):
+            self.tokens = tokens
+        elif isinstance(tokens, (list, tuple, TokenTable)):
+            self.tokens = TokenCursor(tokens)
+        else:
+            self.tokens = TokenStream(tokens)
         self.pos = 0
+        self.recover = False  # set by parse_all()
+        self.diagnostics = []
+
+    def log(self, msg, color=None):
+        print(msg)
 
     def current_token(self):
-        return self.tokens[self.pos]
+        return self.tokens.peek()
+
+    def lookahead(self, n=1):
+        return self.tokens.peek(n)
+
+    def advance(self):
+        self.pos += 1
+        return self.tokens.advance()
 
     def match(self, expected_type, expected_value=None):
-        kind, value = self.current_token()
+        kind, value, _ = self.current_token()
         if kind == expected_type and (expected_value is None or value == expected_value):
-            self.pos += 1
+            self.advance()
             return value
         else:
             self.error(f"Expected {expected_type}" + (f"('{expected_value}')" if expected_value else ""), kind, value)
 
+    def location(self, offset=None):
+        """' at line L, column C' for `offset` (default: the current token),
+        when the source is known."""
+        if offset is None:
+            offset = self.current_token()[2]
+        if self.lines is None or offset is None:
+            return ""
+        line, column = self.lines.position(offset)
+        return f" at line {line}, column {column}"
+
     def error(self, msg, actual_kind=None, actual_value=None):
         if actual_kind is None or actual_value is None:
-            actual_kind, actual_value = self.current_token()
-        print(f"[Syntax Error] {msg} at token '{actual_value}' (type {actual_kind})")
+            actual_kind, actual_value, _ = self.current_token()
+        message = f"{msg} at token '{actual_value}' (type {actual_kind})"
+        if self.recover:
+            # An error at the same token is a knock-on of the last one.
+            offset = self.offset()
+            if not self.diagnostics or self.diagnostics[-1][1] != offset:
+                self.diagnostics.append((message, offset))
+            raise ParseError(message)
+        self.sink.flush()
+        self.log(f"[Syntax Error] {message}{self.location()}", "error")
         sys.exit(1)
 
+    def synchronize(self):
+        """Panic-mode recovery after a syntax error: skip tokens up to and
+        including the next `;`, or the `}` closing a block opened while
+        skipping. Stops short of a `}` that closes an enclosing block and
+        returns False before the next item: a `play` (functions don't nest,
+        as in top_level_spans) or an `#import` outside any block."""
+        depth = 0
+        while True:
+            kind, value, _ = self.current_token()
+            if kind == "EOF":
+                return True
+            if kind == "FUNCTION_KEYWORD" and value == "play":
+                return False
+            if depth == 0:
+                if kind == "META_KEYWORD":
+                    return False
+                if kind == "RBRACE":
+                    return True
+            self.advance()
+            if kind == "END" and depth == 0:
+                return True
+            if kind == "LBRACE":
+                depth += 1
+            elif kind == "RBRACE":
+                depth -= 1
+                if depth == 0:
+                    return True
+
+    def offset(self):
+        return self.current_token()[2]
+
     # ----------------------------
     # PROGRAM ENTRY
     # ----------------------------
     def parse_program(self):
-        print("[Parser] Starting CR7 Script Parsing...\n")
-
-        while self.current_token()[0] != "EOF":
-            kind, value = self.current_token()
-            if kind == "META_KEYWORD":
-                self.parse_meta()
-            elif kind == "FUNCTION_KEYWORD":
-                self.parse_function()
-            else:
-                self.error(f"Unexpected statement start: {value}")
+        if self.tracing:
+            self.sink.start()
+        program = Program([], [], self.offset())
 
-        print("\n[Parser] Parsing completed successfully ✅")
+        cursor = self.tokens
+        if self.cache is not None and isinstance(cursor, TokenCursor):
+            self.parse_items_cached(program, cursor.tokens)
+        else:
+            self.parse_items(program)
+
+        if self.tracing:
+            self.sink.finish()
+            self.sink.flush()
+        return program
+
+    def parse_all(self):
+        """parse_program() that keeps going after syntax errors, so one pass
+        finds all of them. Each error is recorded and parsing resumes after
+        synchronize(). Returns (program, diagnostics): diagnostics are
+        (message, offset) pairs in source order and nothing is printed for
+        them; program holds every item and statement that parsed."""
+        self.recover = True
+        if self.tracing:
+            self.sink.start()
+        program = Program([], [], self.offset())
+        self.parse_items(program)
+        if self.tracing:
+            if not self.diagnostics:
+                self.sink.finish()
+            self.sink.flush()
+        return program, self.diagnostics
+
+    def parse_items(self, program, stop=None):
+        """Parse top-level items up to EOF into `program`; returns how many.
+        With `stop`, no item starts at or past tokens[stop], but the last one
+        may run past it: an unclosed function goes on into what follows, so
+        its error is the one the sequential parser reports."""
+        count = 0
+        while self.current_token()[0] != "EOF" and (stop is None or self.tokens.index < stop):
+            kind, value, _ = self.current_token()
+            start = self.pos
+            try:
+                if kind == "META_KEYWORD":
+                    program.imports.append(self.parse_meta())
+                elif kind == "FUNCTION_KEYWORD":
+                    program.functions.append(self.parse_function())
+                else:
+                    self.error(f"Unexpected statement start: {value}")
+            except ParseError:
+                self.synchronize()
+                kind = self.current_token()[0]
+                # A stray `}` ends nothing at the top level; skip it, and
+                # any item start that failed without consuming a token.
+                if kind != "EOF" and (kind == "RBRACE" or self.pos == start):
+                    self.advance()
+            count += 1
+        return count
+
+    def parse_items_cached(self, program, tokens):
+        """parse_items() one top-level span at a time, reusing the cached
+        node of any span whose tokens are unchanged. Only an item that
+        parsed to exactly the end of its span is cached."""
+        cache = self.cache
+        cache.used.clear()  # a parse that failed part-way leaves keys behind
+        cursor = self.tokens
+        source = self.lines.source if self.lines is not None else None
+        for start, stop in top_level_spans(tokens):
+            if stop <= cursor.index:
+                continue  # parsed as part of the item before
+            if start < cursor.index:
+                self.parse_items(program, stop)
+                continue
+            key = cache.key(tokens, start, stop, source)
+            offset = tokens[start][2]
+            node = cache.get(key, offset)
+            if node is not None:
+                (program.functions if isinstance(node, Function) else program.imports).append(node)
+                if self.tracing:
+                    self.sink.node("Function" if isinstance(node, Function) else "Meta statement", offset, "cached")
+                cursor.index = stop
+                continue
+            if self.parse_items(program, stop) == 1 and cursor.index == stop:
+                node = program.functions[-1] if tokens[start][1] == "play" else program.imports[-1]
+                cache.put(key, node, offset)
+        cache.retain_used()
+
+    def parse_program_parallel(self, workers=None):
+        """parse_program() with the top-level items split across a process
+        pool. Items are delimited by top_level_spans(), grouped into a few
+        batches per worker and parsed in the workers; their ASTs come back
+        marshalled and are merged in source order. The first syntax error in
+        source order is reported, as the sequential parser would: a batch
+        that fails, or whose last item ran past its end, is parsed again
+        here from its start, together with everything after it."""
+        cursor = self.tokens
+        tokens = cursor.tokens
+        workers = workers or os.cpu_count() or 1
+        if self.tracing:
+            self.sink.start()
+        program = Program([], [], self.offset())
+        batches = batch_spans(top_level_spans(tokens), workers * PARSE_BATCHES_PER_WORKER)
+        # Only the tokens go to the workers: the source may be an mmap, which
+        # cannot be pickled for the spawn and forkserver start methods.
+        resume = None
+        with ProcessPoolExecutor(workers, initializer=init_parse_worker, initargs=(tokens,)) as pool:
+            futures = [pool.submit(parse_batch, start, stop) for start, stop in batches]
+            for (start, stop), future in zip(batches, futures):
+                data, end = future.result()
+                if data is None or end != stop:
+                    for pending in futures:
+                        pending.cancel()
+                    resume = start
+                    break
+                part = node_from_data(marshal.loads(data))
+                program.imports += part.imports
+                program.functions += part.functions
+                if self.tracing:
+                    for node in part.imports:
+                        self.sink.node("Meta statement", node.offset, "#import stadium")
+                    for node in part.functions:
+                        self.sink.node("Function", node.offset)
+        if resume is not None:
+            cursor.index = resume
+            self.parse_items(program)
+        cursor.index = cursor.size - 1  # at EOF
+        if self.tracing:
+            self.sink.finish()
+            self.sink.flush()
+        return program
 
     # ----------------------------
     # META (#import stadium)
     # ----------------------------
     def parse_meta(self):
+        offset = self.offset()
         self.match("META_KEYWORD", "#import")
         if self.current_token()[1] == "stadium":
-            self.match("META_KEYWORD", "stadium")
+            module = self.match("META_KEYWORD", "stadium")
         else:
             self.error("Expected 'stadium' after #import")
-        print("→ Meta statement parsed (#import stadium)")
+        if self.tracing:
+            self.sink.node("Meta statement", offset, "#import stadium")
+        return Import(module, offset)
 
     # ----------------------------
     # FUNCTION
     # ----------------------------
     def parse_function(self):
+        offset = self.offset()
         self.match("FUNCTION_KEYWORD", "play")
-        self.match("ID")  # function name
+
+        # Function name can be ID or FUNCTION_KEYWORD (e.g., kickoff)
+        kind, name, _ = self.current_token()
+        if kind in ("ID", "FUNCTION_KEYWORD"):
+            self.advance()
+        else:
+            self.error("Expected function name after 'play'")
+
         self.match("LPAREN")
-        self.parse_param_list()
+        params = self.parse_param_list()
         self.match("RPAREN")
         self.match("LBRACE")
-        self.parse_statement_list()
+        body = self.parse_statement_list()
         self.match("RBRACE")
-        print("→ Function parsed")
+        if self.tracing:
+            self.sink.node("Function", offset)
+        return Function(name, params, body, offset)
 
     def parse_param_list(self):
+        params = []
         if self.current_token()[0] == "TYPE_KEYWORD":
-            self.match("TYPE_KEYWORD")
-            self.match("ID")
+            params.append((self.match("TYPE_KEYWORD"), self.match("ID")))
             while self.current_token()[0] == "COMMA":
                 self.match("COMMA")
-                self.match("TYPE_KEYWORD")
-                self.match("ID")
+                params.append((self.match("TYPE_KEYWORD"), self.match("ID")))
+        return params
 
     # ----------------------------
     # STATEMENTS
     # ----------------------------
     def parse_statement_list(self):
-        while self.current_token()[0] not in ("EOF", "RBRACE"):
-            self.parse_statement()
+        """Statements up to the `}` closing the current block. Nested blocks
+        don't recurse: a `referee`/`practice`/`drill` whose block is open
+        waits on an explicit stack together with the statement list it
+        belongs to, so nesting depth costs no Python stack."""
+        statements = []
+        stack = []  # (enclosing statement list, statement whose block is open)
+        closing = False
+        while True:
+            kind, value, _ = self.current_token()
+            try:
+                if not closing and kind != "EOF" and kind != "RBRACE":
+                    if kind == "CONTROL_KEYWORD" and value in BLOCK_KEYWORDS:
+                        node = self.parse_block_header(value)
+                        stack.append((statements, node))
+                        statements = []
+                    else:
+                        statements.append(self.parse_statement())
+                    continue
+                if not stack:
+                    return statements
+                # Close the innermost block. From here on an error belongs to
+                # the enclosing list, and the unfinished statement is dropped.
+                closing = False
+                body = statements
+                statements, node = stack.pop()
+                self.match("RBRACE")
+                if node.body is None:
+                    node.body = body
+                    if type(node) is If and self.current_token()[1] == "bench":
+                        self.match("CONTROL_KEYWORD", "bench")
+                        self.match("LBRACE")
+                        stack.append((statements, node))
+                        statements = []
+                        continue
+                else:
+                    node.orelse = body
+                if self.tracing:
+                    self.sink.node(BLOCK_LABELS[type(node)], node.offset)
+                statements.append(node)
+            except ParseError:
+                # Without a `}` to sync to, the block is missing it; the
+                # next function starts here.
+                closing = not self.synchronize()
+
+    def parse_block_header(self, keyword):
+        """Parse a block statement up to and including its `{`; returns the
+        node with its body still to be filled in."""
+        if keyword == "referee":
+            return self.parse_if()
+        if keyword == "practice":
+            return self.parse_while()
+        return self.parse_for()
 
     def parse_statement(self):
-        kind, value = self.current_token()
+        kind, value, _ = self.current_token()
 
         if kind == "TYPE_KEYWORD":
-            self.parse_declaration()
+            return self.parse_declaration()
         elif kind == "ID":
-            self.parse_assignment()
+            return self.parse_assignment()
         elif kind == "CONTROL_KEYWORD":
-            if value == "referee":
-                self.parse_if()
-            elif value == "practice":
-                self.parse_while()
-            elif value == "drill":
-                self.parse_for()
-            elif value == "bench":
-                return
+            # referee/practice/drill open blocks; parse_statement_list handles them.
+            if value == "bench":
+                self.error("'bench' without a matching 'referee'", kind, value)
             else:
                 self.error(f"Unknown control keyword '{value}'", kind, value)
         elif kind == "OUTPUT_KEYWORD":
-            self.parse_output()
+            return self.parse_output()
         elif kind == "INPUT_KEYWORD":
-            self.parse_input()
+            return self.parse_input()
         elif kind == "FUNCTION_KEYWORD" and value == "whistle":
-            self.parse_return()
+            return self.parse_return()
         else:
             self.error(f"Unexpected statement start: {value}", kind, value)
 
     def parse_declaration(self):
-        self.match("TYPE_KEYWORD")
-        self.match("ID")
+        offset = self.offset()
+        type_name = self.match("TYPE_KEYWORD")
+        name = self.match("ID")
+        value = None
         if self.current_token()[0] == "ASSIGN":
             self.match("ASSIGN")
-            self.parse_expr()
+            value = self.parse_expr()
         self.match("END")
-        print("→ Declaration parsed")
+        if self.tracing:
+            self.sink.node("Declaration", offset)
+        return Declaration(type_name, name, value, offset)
 
     def parse_assignment(self):
-        self.match("ID")
+        offset = self.offset()
+        name = self.match("ID")
         self.match("ASSIGN")
-        self.parse_expr()
+        value = self.parse_expr()
         self.match("END")
-        print("→ Assignment parsed")
+        if self.tracing:
+            self.sink.node("Assignment", offset)
+        return Assignment(name, value, offset)
 
     def parse_if(self):
+        offset = self.offset()
         self.match("CONTROL_KEYWORD", "referee")
         self.match("LPAREN")
-        self.parse_condition()
+        condition = self.parse_condition()
         self.match("RPAREN")
         self.match("LBRACE")
-        self.parse_statement_list()
-        self.match("RBRACE")
-
-        if self.current_token()[1] == "bench":
-            self.match("CONTROL_KEYWORD", "bench")
-            self.match("LBRACE")
-            self.parse_statement_list()
-            self.match("RBRACE")
-        print("→ If statement parsed")
+        return If(condition, None, None, offset)
 
     def parse_while(self):
+        offset = self.offset()
         self.match("CONTROL_KEYWORD", "practice")
         self.match("LPAREN")
-        self.parse_condition()
+        condition = self.parse_condition()
         self.match("RPAREN")
         self.match("LBRACE")
-        self.parse_statement_list()
-        self.match("RBRACE")
-        print("→ While parsed")
+        return While(condition, None, offset)
 
     def parse_for(self):
+        offset = self.offset()
         self.match("CONTROL_KEYWORD", "drill")
         self.match("LPAREN")
+        init = condition = update = None
         if self.current_token()[0] == "TYPE_KEYWORD":
-            self.parse_declaration_in_for()
+            init = self.parse_declaration_in_for()
         elif self.current_token()[0] == "ID":
-            self.parse_assignment_in_for()
+            init = self.parse_assignment_in_for()
         self.match("END")
         if self.current_token()[0] != "END":
-            self.parse_condition()
+            condition = self.parse_condition()
         self.match("END")
         if self.current_token()[0] == "ID":
-            self.parse_assignment_in_for()
+            update = self.parse_assignment_in_for()
         self.match("RPAREN")
         self.match("LBRACE")
-        self.parse_statement_list()
-        self.match("RBRACE")
-        print("→ For parsed")
+        return For(init, condition, update, None, offset)
 
     def parse_declaration_in_for(self):
-        self.match("TYPE_KEYWORD")
-        self.match("ID")
+        offset = self.offset()
+        type_name = self.match("TYPE_KEYWORD")
+        name = self.match("ID")
+        value = None
         if self.current_token()[0] == "ASSIGN":
             self.match("ASSIGN")
-            self.parse_expr()
-        print("→ For-init declaration parsed")
+            value = self.parse_expr()
+        if self.tracing:
+            self.sink.node("For-init declaration", offset)
+        return Declaration(type_name, name, value, offset)
 
     def parse_assignment_in_for(self):
         # support i = i + 1 or i++ / i--
-        self.match("ID")
-        kind, value = self.current_token()
+        offset = self.offset()
+        name = self.match("ID")
+        kind, value, op_offset = self.current_token()
         if kind == "ASSIGN":
             self.match("ASSIGN")
-            self.parse_expr()
-            print("→ For-update parsed (assignment)")
+            node = Assignment(name, self.parse_expr(), offset)
+            if self.tracing:
+                self.sink.node("For-update", offset, "assignment")
         elif kind == "OP" and value in ("++", "--"):
             self.match("OP")
-            print("→ For-update parsed (increment/decrement)")
+            node = Assignment(name, BinOp(value[0], Name(name, offset), Number(1, op_offset), op_offset), offset)
+            if self.tracing:
+                self.sink.node("For-update", offset, "increment/decrement")
         else:
             self.error("Expected '=' or '++'/'--' in for update")
-
+        return node
 
     def parse_output(self):
+        offset = self.offset()
         self.match("OUTPUT_KEYWORD")
-        self.parse_expr()
+        value = self.parse_expr()
         self.match("END")
-        print("→ Output parsed")
+        if self.tracing:
+            self.sink.node("Output", offset)
+        return Output(value, offset)
 
     def parse_input(self):
+        offset = self.offset()
         self.match("INPUT_KEYWORD")
-        self.match("ID")
+        name = self.match("ID")
         self.match("END")
-        print("→ Input parsed")
+        if self.tracing:
+            self.sink.node("Input", offset)
+        return Input(name, offset)
 
     def parse_return(self):
+        offset = self.offset()
         self.match("FUNCTION_KEYWORD", "whistle")
-        self.parse_expr()
+        value = self.parse_expr()
         self.match("END")
-        print("→ Return parsed")
+        if self.tracing:
+            self.sink.node("Return", offset)
+        return Return(value, offset)
 
     def parse_condition(self):
-        self.parse_expr()
-        if self.current_token()[0] == "OP":
-            self.match("OP")
-            self.parse_expr()
-        else:
-            self.error("Expected relational operator in condition")
+        return self.parse_expr()
 
     def parse_expr(self):
-        self.parse_term()
-        while self.current_token()[0] == "OP" and self.current_token()[1] in ("+", "-"):
-            self.match("OP")
-            self.parse_term()
+        """Precedence climbing in one loop over BINARY_OPERATORS. Pending
+        operators and their left operands wait on two explicit stacks, and an
+        operator is applied as soon as the next one binds no tighter. A `(`
+        or a call's argument list opens a group on the same stack instead of
+        recursing, so only leaf operands (parse_factor) cost a call each and
+        nesting depth costs no Python stack."""
+        operands = []
+        # (binding power, op, offset, is prefix) for operators;
+        # (-1, name, offset, args) for open groups, args None for a `(`.
+        operators = []
+        node = None
+        while True:
+            kind, value, offset = self.current_token()
+            if node is None:
+                # Expecting an operand.
+                if kind == "OP" and value in PREFIX_OPERATORS:
+                    operators.append((PREFIX_OPERATORS[value], value, offset, True))
+                    self.advance()
+                elif kind == "LPAREN":
+                    operators.append((-1, value, offset, None))
+                    self.advance()
+                elif (kind == "ID" or kind == "FUNCTION_KEYWORD") and self.lookahead(1)[0] == "LPAREN":
+                    self.advance()
+                    self.advance()
+                    if self.current_token()[0] == "RPAREN":
+                        self.advance()
+                        node = self.finish_call(value, [], offset)
+                    else:
+                        operators.append((-1, value, offset, []))
+                else:
+                    node = self.parse_factor()
+                continue
+            power = BINARY_OPERATORS.get(value, 0) if kind == "OP" else 0
+            # Every binary operator is left-associative, so equal power reduces.
+            while operators and operators[-1][0] >= power:
+                _, pending, pending_offset, prefix = operators.pop()
+                if prefix:
+                    node = UnaryOp(pending, node, pending_offset)
+                elif pending in LOGICAL_OPERATORS:
+                    node = LogicalOp(pending, operands.pop(), node, pending_offset)
+                else:
+                    node = BinOp(pending, operands.pop(), node, pending_offset)
+            if power:
+                operands.append(node)
+                operators.append((power, value, offset, False))
+                self.advance()
+                node = None
+                continue
+            if not operators:
+                return node
+            # Only a group is left above: `node` ends its innermost part.
+            _, name, group_offset, args = operators.pop()
+            if args is None:
+                self.match("RPAREN")
+                continue
+            args.append(node)
+            if kind == "COMMA":
+                self.advance()
+                operators.append((-1, name, group_offset, args))
+                node = None
+                continue
+            self.match("RPAREN")
+            node = self.finish_call(name, args, group_offset)
 
-    def parse_term(self):
-        self.parse_factor()
-        while self.current_token()[0] == "OP" and self.current_token()[1] in ("*", "/"):
-            self.match("OP")
-            self.parse_factor()
+    def finish_call(self, name, args, offset):
+        if self.tracing:
+            self.sink.node("Function call", offset, name)
+        return Call(name, args, offset)
 
     def parse_factor(self):
-        kind, value = self.current_token()
-        if kind in ("NUMBER", "STRING", "ID"):
-            self.match(kind)
-        elif kind == "LPAREN":
-            self.match("LPAREN")
-            self.parse_expr()
-            self.match("RPAREN")
+        kind, value, offset = self.current_token()
+        if kind == "ID":
+            self.advance()
+            return Name(value, offset)
+        elif kind == "NUMBER":
+            self.advance()
+            return Number(float(value) if "." in value else int(value), offset)
+        elif kind == "STRING":
+            self.advance()
+            return String(value[1:-1], offset)
         else:
             self.error("Invalid factor")
 
+# ----------------------------
+# PARALLEL LEXING
+# ----------------------------
+# Worker side of Lexer.tokenize_table_parallel(). The source sits once in a
+# shared memory block; a task lexes one chunk of it and sends back the
+# chunk's table with its offsets already made absolute.
+LEX_CHUNKS_PER_WORKER = 2
+
+worker_lexer = None
+worker_memory = None
+
+
+def chunk_bounds(code, count):
+    """Cut `code` into about `count` (start, stop) chunks ending after a newline."""
+    newline = "\n" if isinstance(code, str) else b"\n"
+    size = len(code)
+    bounds = []
+    start = 0
+    for i in range(1, count):
+        cut = code.find(newline, max(start, size * i // count))
+        if cut < 0:
+            break
+        bounds.append((start, cut + 1))
+        start = cut + 1
+    bounds.append((start, size))
+    return bounds
+
+
+def open_quote(code, errors):
+    """The first skipped offset holding a quote, i.e. a string left open."""
+    quote = '"' if isinstance(code, str) else b'"'
+    for offset in errors:
+        if code[offset:offset + 1] == quote:
+            return offset
+    return None
+
+
+def init_lex_worker(lexer, name):
+    global worker_lexer, worker_memory
+    worker_lexer = lexer
+    worker_memory = shared_memory.SharedMemory(name)
+
+
+def lex_chunk(byte_start, byte_stop, base, text):
+    """Lex shared bytes [byte_start:byte_stop), whose first character is at
+    `base`; returns (table data, skipped offsets)."""
+    chunk = bytes(worker_memory.buf[byte_start:byte_stop])
+    if text:
+        chunk = chunk.decode("utf-8")
+    errors = []
+    table = worker_lexer.tokenize_table(chunk, errors=errors)
+    if base:
+        table.starts = array("I", [start + base for start in table.starts])
+        errors = [offset + base for offset in errors]
+    return table.to_data(), errors
+
+
+# ----------------------------
+# PARALLEL PARSING
+# ----------------------------
+# Worker side of CR7Parser.parse_program_parallel(). The token table and
+# source reach each worker once through the pool initializer (inherited
+# for free under fork); tasks are just (start, stop) token ranges.
+PARSE_BATCHES_PER_WORKER = 4
+
+worker_tokens = None
+
+
+def batch_spans(spans, count):
+    """Merge consecutive spans into about `count` ranges of similar size."""
+    if not spans:
+        return []
+    target = (spans[-1][1] - spans[0][0]) / count
+    batches = []
+    start = spans[0][0]
+    for _, stop in spans:
+        if stop - start >= target:
+            batches.append((start, stop))
+            start = stop
+    if start < spans[-1][1]:
+        batches.append((start, spans[-1][1]))
+    return batches
+
+
+def init_parse_worker(tokens):
+    global worker_tokens
+    worker_tokens = tokens
+
+
+class BatchParser(CR7Parser):
+    """Silent parser for one batch; keeps the error message it would log."""
+
+    message = None
+
+    def log(self, msg, color=None):
+        self.message = msg
+
+
+def parse_batch(start, stop):
+    """Parse the items starting in tokens[start:stop]; returns (marshalled
+    Program, index the parse ended at), or (None, None) on a syntax error
+    or a tree too deep for marshal, which the parent then parses itself."""
+    parser = BatchParser(TokenCursor(worker_tokens, start), None, TraceSink())
+    program = Program([], [])
+    try:
+        parser.parse_items(program, stop)
+    except SystemExit:
+        return None, None
+    try:
+        return marshal.dumps(node_to_data(program)), parser.tokens.index
+    except ValueError:
+        return None, None
+
+
 # ----------------------------
 # MAIN
 # ----------------------------
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python cr7_compiler.py <filename.cr7>")
-        return
+# What a loader raises on an artefact it cannot read: a damaged entry, or
+# one written by a build whose format the version key failed to tell apart.
+UNREADABLE_ARTEFACT = (EOFError, ValueError, TypeError, IndexError, KeyError)
 
-    file_path = sys.argv[1]
-    if not os.path.exists(file_path):
-        print(f"[CR7 Compiler] File not found: {file_path}")
-        return
 
+class CompiledScript:
+    """A parsed program plus the backend artefacts built from it. With a
+    cache, artefacts are read from the script's entry when present and
+    added to it when built, so unchanged scripts skip every stage."""
+
+    def __init__(self, program, cache=None, key=None, entry=None):
+        self.program = program
+        self.cache = cache
+        self.key = key
+        self.entry = entry or {}
+        self.built = {}
+        self.functions = None
+
+    def resolved(self):
+        """The program's functions by name. The program is resolved once,
+        however many backends are built from it."""
+        if self.functions is None:
+            self.functions = resolve(self.program)
+        return self.functions
+
+    @classmethod
+    def from_cache(cls, cache, key):
+        entry = cache.get(key)
+        if "ast" not in entry:
+            return None
+        try:
+            program = node_from_data(entry["ast"])
+        except UNREADABLE_ARTEFACT:
+            return None
+        return cls(program, cache, key, entry)
+
+    def artefact(self, name, build, loader):
+        artefact = self.built.get(name)
+        if artefact is not None:
+            return artefact
+        if name in self.entry:
+            try:
+                artefact = loader(self.entry[name])
+            except UNREADABLE_ARTEFACT:
+                pass  # rebuilt and written back below, like a miss
+        if artefact is None:
+            artefact = build(self.program, self.resolved())
+            if self.cache is not None:
+                self.entry = self.cache.update(self.key, **{name: artefact.to_data()})
+        self.built[name] = artefact
+        return artefact
+
+    def bytecode(self):
+        return self.artefact("bytecode", compile_program, Module.from_data)
+
+    def python(self):
+        return self.artefact("python", generate, PythonModule.from_data)
+
+
+BACKENDS = {
+    "ast": lambda script: run_program(script.program, functions=script.resolved()),
+    "vm": lambda script: run_module(script.bytecode()),
+    "python": lambda script: run_python(script.python()),
+}
+
+
+def describe_offset(code, offset):
+    if offset is None:
+        return ""
+    line, column = LineIndex(code).position(offset)
+    return f" at line {line}, column {column}"
+
+
+NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+@contextmanager
+def open_source(file_path, use_mmap=None, threshold=MMAP_THRESHOLD):
+    """Yield the contents of a .cr7 file for the lexer.
+
+    With `use_mmap` left as None the file is memory-mapped when it is larger
+    than `threshold` bytes; a mapped file is yielded as the mmap itself so the
+    full source is never decoded into one str. Files with non-ASCII text are
+    always read as str.
+    """
+    size = os.path.getsize(file_path)
+    if use_mmap is None:
+        use_mmap = size > threshold
+    if use_mmap and size:
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            # The bytes pattern only knows ASCII (\w, \d) and reports byte
+            # columns, so it is used on pure-ASCII files only, where both
+            # patterns agree; anything else is decoded like a small file.
+            if NON_ASCII.search(buffer) is None:
+                yield buffer
+                return
     with open(file_path, "r", encoding="utf-8") as f:
-        code = f.read()
+        yield f.read()
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog="cr7_compiler.py", description="CR7 Script compiler")
+    arg_parser.add_argument("files", nargs="*", metavar="filename.cr7",
+                            help="a script; several files, directories or globs (** recurses) "
+                                 "are compiled in batch mode")
+    mmap_group = arg_parser.add_mutually_exclusive_group()
+    mmap_group.add_argument("--mmap", dest="use_mmap", action="store_true", default=None,
+                            help="lex directly from a memory-mapped file")
+    mmap_group.add_argument("--no-mmap", dest="use_mmap", action="store_false",
+                            help="always read the file into memory")
+    arg_parser.add_argument("--run", action="store_true",
+                            help="execute the program from kickoff after parsing")
+    arg_parser.add_argument("--backend", choices=sorted(BACKENDS), default="vm",
+                            help="execution backend for --run (default vm)")
+    arg_parser.add_argument("--dis", action="store_true",
+                            help="print the bytecode disassembly")
+    arg_parser.add_argument("--emit-python", metavar="FILE",
+                            help="write the program transpiled to Python source")
+    arg_parser.add_argument("--mmap-threshold", type=int, default=MMAP_THRESHOLD, metavar="BYTES",
+                            help=f"use mmap for files larger than this (default {MMAP_THRESHOLD})")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                            help="parse top-level functions in N worker processes; "
+                                 "in batch mode, compile N files at a time")
+    arg_parser.add_argument("--all-errors", action="store_true",
+                            help="recover from syntax errors and report all of them, not just the first")
+    arg_parser.add_argument("--trace", choices=TRACE_MODES, default="buffered",
+                            help="parser progress: printed per line (text), in one write (buffered, default), "
+                                 "as JSON lines (events), or not at all (off)")
+    arg_parser.add_argument("--profile", action="store_true",
+                            help="compile from source, ignoring the cache, and print the wall time, CPU time, "
+                                 "peak memory and counts of each phase")
+    arg_parser.add_argument("--profile-json", metavar="FILE",
+                            help="like --profile, but write the report as JSON to FILE (- for stdout)")
+    arg_parser.add_argument("--no-profile-memory", dest="profile_memory", action="store_false",
+                            help="profile without tracemalloc, which slows every phase several times over")
+    cache_group = arg_parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--cache-dir", metavar="DIR",
+                             help="reuse compiled artefacts from DIR (default $CR7_CACHE_DIR)")
+    cache_group.add_argument("--no-cache", action="store_true",
+                             help="ignore $CR7_CACHE_DIR and always compile from source")
+    arg_parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES, metavar="BYTES",
+                            help=f"evict least recently used entries above this (default {DEFAULT_MAX_BYTES})")
+    daemon_group = arg_parser.add_argument_group("daemon")
+    daemon_group.add_argument("--serve", action="store_true",
+                              help="stay running and compile for cr7_client.py over a Unix socket")
+    daemon_group.add_argument("--socket", metavar="PATH",
+                              help="socket for --serve (default $CR7_SOCKET, or cr7.sock in $XDG_RUNTIME_DIR "
+                                   "or in a private cr7-<uid> directory under the temp dir)")
+    return arg_parser
+
+
+def open_cache(args):
+    if args.no_cache:
+        return None
+    if args.cache_dir:
+        return CompileCache(args.cache_dir, COMPILER_VERSION, args.cache_size)
+    return CompileCache.from_env(COMPILER_VERSION, args.cache_size)
+
+
+def parse_file(file_path, args, cache=None, key=None):
+    """Lex and parse `file_path`, storing the AST in `cache` when given."""
+    sink = TRACE_MODES[args.trace]()
+    with open_source(file_path, args.use_mmap, args.mmap_threshold) as code:
+        if args.all_errors:
+            tokens = LEXER.iter_tokens(code)
+            parser = CR7Parser(tokens, code, sink)
+            try:
+                program, diagnostics = parser.parse_all()
+            finally:
+                tokens.close()
+            for message, offset in diagnostics:
+                parser.log(f"[Syntax Error] {message}{parser.location(offset)}", "error")
+            if diagnostics:
+                print(f"[CR7 Compiler] {len(diagnostics)} syntax error{'s' if len(diagnostics) != 1 else ''}")
+                sys.exit(1)
+        elif args.jobs > 1:
+            if len(code) >= PARALLEL_LEX_THRESHOLD:
+                tokens = LEXER.tokenize_table_parallel(code, args.jobs)
+            else:
+                tokens = LEXER.tokenize_table(code)
+            program = CR7Parser(tokens, code, sink).parse_program_parallel(args.jobs)
+        else:
+            tokens = LEXER.iter_tokens(code)
+            try:
+                program = CR7Parser(tokens, code, sink).parse_program()
+            finally:
+                # Drop the lexer's hold on an mmap buffer before it is closed.
+                tokens.close()
+    if isinstance(sink, EventSink):
+        sys.stdout.write("".join(json.dumps(event) + "\n" for event in sink.events))
+    entry = cache.update(key, ast=node_to_data(program)) if cache is not None else None
+    return CompiledScript(program, cache, key, entry)
+
+
+NESTED_TOO_DEEPLY = "[CR7 Compiler] Program is nested too deeply to compile"
+
+
+def count_instructions(module):
+    count = 0
+    for function in module.functions:
+        code, pc = function.code, 0
+        while pc < len(code):
+            pc += instruction_width(module, code, pc)
+            count += 1
+    return count
+
+
+def compile_profiled(file_path, args, profile):
+    """parse_file() plus name resolution and the --backend build, each
+    phase recorded in `profile`. The source is lexed into a table up front
+    so lexing and parsing are timed apart. Returns the CompiledScript."""
+    sink = TRACE_MODES[args.trace]()
+    with ExitStack() as stack:
+        with profile.phase("read") as phase:
+            code = stack.enter_context(open_source(file_path, args.use_mmap, args.mmap_threshold))
+        phase.count("bytes", os.path.getsize(file_path))
+        with profile.phase("lex") as phase:
+            if args.jobs > 1 and len(code) >= PARALLEL_LEX_THRESHOLD:
+                tokens = LEXER.tokenize_table_parallel(code, args.jobs)
+            else:
+                tokens = LEXER.tokenize_table(code)
+        phase.count("tokens", len(tokens) - 1)  # not counting EOF
+        with profile.phase("parse") as phase:
+            parser = CR7Parser(tokens, code, sink)
+            if args.all_errors:
+                program, diagnostics = parser.parse_all()
+            elif args.jobs > 1:
+                program = parser.parse_program_parallel(args.jobs)
+            else:
+                program = parser.parse_program()
+        if args.all_errors and diagnostics:
+            for message, offset in diagnostics:
+                parser.log(f"[Syntax Error] {message}{parser.location(offset)}", "error")
+            print(f"[CR7 Compiler] {len(diagnostics)} syntax error{'s' if len(diagnostics) != 1 else ''}")
+            sys.exit(1)
+        phase.count("nodes", sum(1 for _ in walk(program)))
+    if isinstance(sink, EventSink):
+        sys.stdout.write("".join(json.dumps(event) + "\n" for event in sink.events))
+    script = CompiledScript(program)
+    with profile.phase("analyse") as phase:
+        functions = script.resolved()
+    phase.count("functions", len(functions))
+    if args.backend == "vm":
+        with profile.phase("codegen") as phase:
+            module = script.bytecode()
+        phase.count("instructions", count_instructions(module))
+    elif args.backend == "python":
+        with profile.phase("codegen") as phase:
+            module = script.python()
+            module.compiled()
+        phase.count("lines", module.source.count("\n"))
+    return script
+
+
+def report_profile(profile, args):
+    if args.profile:
+        print("\n".join(profile.table()))
+    if args.profile_json == "-":
+        print(profile.to_json())
+    elif args.profile_json:
+        with open(args.profile_json, "w", encoding="utf-8") as f:
+            f.write(profile.to_json() + "\n")
+
+
+# ----------------------------
+# BATCH MODE
+# ----------------------------
+# Many scripts checked in one interpreter: every file is parsed and built
+# for --backend, quietly, and a summary table is printed at the end.
+BUILDS = {
+    "ast": CompiledScript.resolved,
+    "vm": CompiledScript.bytecode,
+    # Compiling the generated source is part of the build: CPython's own
+    # limits (e.g. on nesting) reject some programs only at that point.
+    "python": lambda script: script.python().compiled(),
+}
+
 
+def is_glob(pattern):
+    return any(char in pattern for char in "*?[")
+
+
+def expand_paths(patterns):
+    """Files named by `patterns` (paths, globs or directories searched for
+    .cr7 files), in order and without repeats; also returns the patterns
+    that matched nothing."""
+    files, missing, seen = [], [], set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "**", "*.cr7"), recursive=True))
+        elif is_glob(pattern):
+            matches = sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        else:
+            matches = [pattern] if os.path.isfile(pattern) else []
+        if not matches:
+            missing.append(pattern)
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                files.append(path)
+    return files, missing
+
+
+def parse_quietly(code, all_errors=False):
+    """Parse `code` without printing; returns (program, error messages)."""
+    tokens = LEXER.iter_tokens(code)
+    parser = BatchParser(tokens, code, TraceSink())
     try:
-        tokens = tokenize(code)
-        parser = CR7Parser(tokens)
-        parser.parse_program()
-    except RuntimeError as e:
+        if all_errors:
+            program, diagnostics = parser.parse_all()
+            return program, [f"[Syntax Error] {message}{parser.location(offset)}"
+                             for message, offset in diagnostics]
+        return parser.parse_program(), []
+    except SystemExit:
+        return None, [parser.message]
+    finally:
+        tokens.close()
+
+
+def compile_file(file_path, args, cache=None):
+    """Parse and build one file without printing anything. Returns
+    (file_path, parse seconds, build seconds or None, error messages)."""
+    start = time.perf_counter()
+    parse_time = build_time = None
+    try:
+        key = cache.key_for_file(file_path) if cache is not None else None
+        script = CompiledScript.from_cache(cache, key) if cache is not None else None
+        if script is None:
+            with open_source(file_path, args.use_mmap, args.mmap_threshold) as code:
+                program, errors = parse_quietly(code, args.all_errors)
+            if errors:
+                return file_path, time.perf_counter() - start, None, errors
+            entry = cache.update(key, ast=node_to_data(program)) if cache is not None else None
+            script = CompiledScript(program, cache, key, entry)
+        parse_time = time.perf_counter() - start
+        start = time.perf_counter()
+        BUILDS[args.backend](script)
+        build_time = time.perf_counter() - start
+        errors = []
+    except CR7RuntimeError as e:
+        with open_source(file_path, use_mmap=False) as code:
+            errors = [f"[Compile Error] {e}{describe_offset(code, e.offset)}"]
+    except RecursionError:
+        errors = [NESTED_TOO_DEEPLY]
+    except LexError as e:
+        errors = [f"[Lexer Error] {e}"]
+    except (OSError, UnicodeDecodeError) as e:
+        errors = [f"[CR7 Compiler] {e}"]
+    if parse_time is None:
+        parse_time = time.perf_counter() - start
+    return file_path, parse_time, build_time, errors
+
+
+def print_summary(results, elapsed, jobs):
+    width = max([len("File")] + [len(result[0]) for result in results])
+    print(f"{'File':<{width}}  {'Status':<6}  {'Parse ms':>9}  {'Build ms':>9}  Error")
+    for file_path, parse_time, build_time, errors in results:
+        status = "FAILED" if errors else "ok"
+        build = "-" if build_time is None else f"{build_time * 1000:.1f}"
+        error = errors[0] + (f" (+{len(errors) - 1} more)" if len(errors) > 1 else "") if errors else ""
+        print(f"{file_path:<{width}}  {status:<6}  {parse_time * 1000:9.1f}  {build:>9}  {error}".rstrip())
+    failed = sum(1 for result in results if result[3])
+    print(f"[CR7 Compiler] {len(results)} files, {len(results) - failed} ok, {failed} failed "
+          f"in {elapsed:.2f}s ({jobs} job{'s' if jobs != 1 else ''})")
+    for file_path, _, _, errors in results:
+        if len(errors) > 1:
+            print(f"\n{file_path}:")
+            for error in errors:
+                print(f"  {error}")
+
+
+def run_batch(patterns, args):
+    """Compile every file named by `patterns`; returns 1 if any failed."""
+    files, missing = expand_paths(patterns)
+    for pattern in missing:
+        print(f"[CR7 Compiler] No .cr7 files match: {pattern}")
+    if not files:
+        return 1
+    cache = open_cache(args)
+    start = time.perf_counter()
+    if args.jobs > 1:
+        with ProcessPoolExecutor(args.jobs) as pool:
+            results = list(pool.map(compile_file, files, repeat(args), repeat(cache)))
+    else:
+        results = [compile_file(file_path, args, cache) for file_path in files]
+    print_summary(results, time.perf_counter() - start, args.jobs)
+    return 1 if missing or any(result[3] for result in results) else 0
+
+
+# ----------------------------
+# DAEMON
+# ----------------------------
+# `--serve` keeps one compiler process running behind a Unix socket so
+# clients skip interpreter start-up and imports, and scripts that have not
+# changed are not even re-read: the last WARM_SCRIPTS CompiledScripts stay
+# in memory with every artefact built for them. Requests are handled one
+# at a time, each with the client's cwd and its stdin/stdout/stderr
+# forwarded (see cr7_client for the protocol).
+WARM_SCRIPTS = 64
+STREAM_BUFFER = 8192
+
+
+class ClientStream:
+    """File-like stand-in for stdout/stderr that forwards to the client."""
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+        self.pending = []
+        self.size = 0
+
+    def write(self, text):
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= STREAM_BUFFER:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.pending:
+            text = "".join(self.pending)
+            self.pending, self.size = [], 0
+            send(self.connection, {self.name: text})
+
+
+class ClientInput:
+    """Stand-in for stdin that asks the client for each line, so `listen`
+    works in scripts run through the daemon."""
+
+    def __init__(self, connection, replies, streams):
+        self.connection = connection
+        self.replies = replies
+        self.streams = streams
+
+    def readline(self):
+        for stream in self.streams:
+            stream.flush()
+        send(self.connection, {"read": True})
+        return json.loads(self.replies.readline())["line"]
+
+    def close(self):
+        # multiprocessing closes stdin in every worker it forks (--jobs);
+        # the connection belongs to the request handler, so keep it open.
+        pass
+
+    def fileno(self):
+        raise io.UnsupportedOperation("the client's stdin has no file descriptor")
+
+
+class CompileRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        stdout = ClientStream(self.connection, "out")
+        stderr = ClientStream(self.connection, "err")
+        saved_stdin, saved_cwd, saved_env = sys.stdin, os.getcwd(), dict(os.environ)
+        sys.stdin = ClientInput(self.connection, self.rfile, (stdout, stderr))
+        try:
+            os.chdir(request["cwd"])
+            for name, value in request["env"].items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    status = main(request["argv"], self.server.scripts)
+                except SystemExit as e:
+                    if isinstance(e.code, str):
+                        print(e.code, file=sys.stderr)
+                    status = e.code if isinstance(e.code, int) else int(e.code is not None)
+                except Exception:
+                    traceback.print_exc()
+                    status = 1
+            stdout.flush()
+            stderr.flush()
+            send(self.connection, {"exit": status or 0})
+        except OSError:
+            pass  # the client went away
+        finally:
+            sys.stdin = saved_stdin
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+
+
+class CompileServer(socketserver.UnixStreamServer):
+    def __init__(self, path):
+        super().__init__(path, CompileRequestHandler)
+        self.scripts = {}  # (path, mtime, size) -> CompiledScript, oldest first
+
+    def server_bind(self):
+        # Created owner-only from the start: a connection runs code as us.
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+
+def stop_serving(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(path=None):
+    try:
+        path = path or socket_path(create=True)
+        if os.path.lexists(path):
+            check_owned(path)
+            os.unlink(path)  # left behind by a daemon that did not exit cleanly
+    except PermissionError as e:
+        print(f"[CR7 Compiler] Cannot serve: {e}")
+        return 1
+    with CompileServer(path) as server:
+        print(f"[CR7 Compiler] Serving on {path}")
+        sys.stdout.flush()
+        signal.signal(signal.SIGTERM, stop_serving)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+def warm_key(file_path, args, cache):
+    """The file as it is now, plus the request's flags that decide what its
+    CompiledScript builds and which compile cache it writes to."""
+    stat = os.stat(file_path)
+    cache_key = (os.path.abspath(cache.directory), cache.max_bytes) if cache is not None else None
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, args.backend, cache_key
+
+
+def main(argv=None, scripts=None):
+    """Compiler entry point. `scripts` is the daemon's in-memory cache of
+    CompiledScripts, reused across calls when given."""
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+
+    if args.serve:
+        if scripts is not None:
+            arg_parser.error("the daemon is already serving")
+        return serve(args.socket)
+    if not args.files:
+        arg_parser.error("the following arguments are required: filename.cr7")
+
+    if len(args.files) > 1 or os.path.isdir(args.files[0]) or is_glob(args.files[0]):
+        if args.run or args.dis or args.emit_python or args.profile or args.profile_json:
+            arg_parser.error("--run, --dis, --emit-python and --profile take a single file")
+        return run_batch(args.files, args)
+
+    file_path = args.files[0]
+    if not os.path.exists(file_path):
+        print(f"[CR7 Compiler] File not found: {file_path}")
+        return 1
+
+    profile = None
+    if args.profile or args.profile_json:
+        profile = Profile(args.profile_memory, file=file_path, backend=args.backend,
+                          compiler_version=COMPILER_VERSION)
+    try:
+        if profile is not None:
+            script = compile_profiled(file_path, args, profile)
+        else:
+            cache = open_cache(args)
+            key = None
+            warm = warm_key(file_path, args, cache) if scripts is not None else None
+            script = scripts.pop(warm, None) if scripts is not None else None
+            if script is None and cache is not None:
+                key = cache.key_for_file(file_path)
+                script = CompiledScript.from_cache(cache, key)
+            if script is not None:
+                # On stderr, so a run prints the same whether or not it was cached.
+                print(f"[CR7 Compiler] Using cached build of {file_path}", file=sys.stderr)
+            else:
+                script = parse_file(file_path, args, cache, key)
+            if scripts is not None:
+                scripts[warm] = script
+                if len(scripts) > WARM_SCRIPTS:
+                    del scripts[next(iter(scripts))]
+        if args.dis:
+            print(disassemble(script.bytecode()))
+        if args.emit_python:
+            script.python().save(args.emit_python)
+        if args.run:
+            if profile is not None:
+                with profile.phase("run"):
+                    BACKENDS[args.backend](script)
+            else:
+                BACKENDS[args.backend](script)
+    except CR7RuntimeError as e:
+        with open_source(file_path, use_mmap=False) as code:
+            print(f"[Runtime Error] {e}{describe_offset(code, e.offset)}")
+        return 1
+    except RecursionError:
+        # The parser takes any depth; later passes still walk the AST recursively.
+        print(NESTED_TOO_DEEPLY)
+        return 1
+    except LexError as e:
         print(f"[Lexer Error] {e}")
+        return 1
+    finally:
+        # Also after an error: the phases that ran are still worth seeing.
+        if profile is not None:
+            report_profile(profile, args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,386 +1,356 @@
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
-import re
-import sys
+import queue
+import threading
+import time
+from contextlib import contextmanager
 
 # -----------------------------
 # ⚽ CR7 SCRIPT LEXER
 # -----------------------------
-KEYWORDS = {
-    "FUNCTION": ["play", "kickoff", "whistle"],
-    "TYPE": ["goal", "player", "flag", "match"],
-    "CONTROL": ["referee", "bench", "practice", "drill"],
-    "OUTPUT": ["announce"],
-    "INPUT": ["listen"],
-    "META": ["#import", "stadium"]
-}
-
-token_specification = [
-    ("META",     r"#\w+"),
-    ("COMMENT",  r"//.*"),
-    ("NUMBER",   r"\d+(\.\d+)?"),
-    ("ASSIGN",   r"="),
-    ("COMMA",    r","),
-    ("END",      r";"),
-    ("LPAREN",   r"\("),
-    ("RPAREN",   r"\)"),
-    ("LBRACE",   r"\{"),
-    ("RBRACE",   r"\}"),
-    ("STRING",   r'"[^"]*"'),
-    ("ID",       r"[A-Za-z_]\w*"),
-    ("OP",       r"[+\-*/<>!=]+"),
-    ("NEWLINE",  r"\n"),
-    ("SKIP",     r"[ \t]+"),
-    ("MISMATCH", r"."),
-]
-
-token_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in token_specification)
-
-def tokenize(code):
-    tokens = []
-    for match in re.finditer(token_regex, code):
-        kind = match.lastgroup
-        value = match.group()
-
-        if kind == "COMMENT":
-            continue
-        elif kind == "META":
-            tokens.append(("META_KEYWORD", value))
-            continue
-        elif kind == "ID":
-            for group_name, words in KEYWORDS.items():
-                if value in words:
-                    kind = f"{group_name}_KEYWORD"
-                    break
-        elif kind in ("SKIP", "NEWLINE"):
-            continue
-        elif kind == "MISMATCH":
-            raise RuntimeError(f"Unexpected token: {value}")
-        tokens.append((kind, value))
-    tokens.append(("EOF", ""))
-    return tokens
+from cr7_compiler import (
+    COMPILER_VERSION, LEXER, BufferedSink, CR7Parser as BaseParser, FunctionCache, LexError,
+    LineIndex, TokenTable,
+)
+from cr7_ast import node_to_data, walk
+from cr7_cache import CompileCache
+from cr7_live import LiveSession
+from cr7_profile import Profile
+
+# Set $CR7_CACHE_DIR to reuse tokens and parse results across compiles.
+CACHE = CompileCache.from_env(COMPILER_VERSION)
+
+# Functions parsed by earlier runs; only edited ones are parsed again. The
+# lock keeps a superseded job and a new one from updating it at once.
+FUNCTION_CACHE = FunctionCache()
+FUNCTION_CACHE_LOCK = threading.Lock()
 
 
 # -----------------------------
 # ⚙️ PARSER
 # -----------------------------
-class CR7Parser:
-    def __init__(self, tokens, output_box=None):
-        self.tokens = tokens
-        self.pos = 0
-        self.output_box = output_box  # GUI output reference
+LOG_BATCH = 500  # parser lines per message to the main thread
+
+
+class CompileCancelled(Exception):
+    pass
+
+
+class CR7Parser(BaseParser):
+    """GUI variant of the core parser. It runs on the compile thread, so
+    instead of touching widgets it posts ("log", lines) messages."""
+
+    def __init__(self, tokens, post, source=None, cancelled=None, cache=None):
+        super().__init__(tokens, source, BufferedSink(lambda lines: post(("log", lines)), LOG_BATCH), cache)
+        self.post = post
+        self.cancelled = cancelled  # threading.Event checked while parsing
 
     def log(self, msg, color=None):
-        """Helper to print or send output to GUI with color"""
-        if self.output_box:
-            self.output_box.configure(state="normal")
-            if color:
-                self.output_box.insert(tk.END, msg + "\n", color)
-            else:
-                self.output_box.insert(tk.END, msg + "\n")
-            self.output_box.configure(state="disabled")
-            self.output_box.see(tk.END)
-        else:
-            print(msg)
-
-    def current_token(self):
-        return self.tokens[self.pos]
-
-    def lookahead(self, n=1):
-        """Safely look ahead to next token"""
-        if self.pos + n < len(self.tokens):
-            return self.tokens[self.pos + n]
-        return ("EOF", "")
-
-    def match(self, expected_type, expected_value=None):
-        kind, value = self.current_token()
-        if kind == expected_type and (expected_value is None or value == expected_value):
-            self.pos += 1
-            return value
-        else:
-            self.error(f"Expected {expected_type}" + (f"('{expected_value}')" if expected_value else ""), kind, value)
+        self.post(("log", [(msg, color)]))
+
+    def advance(self):
+        if not self.pos & 1023 and self.cancelled is not None and self.cancelled.is_set():
+            raise CompileCancelled()
+        return super().advance()
 
     def error(self, msg, actual_kind=None, actual_value=None):
         if actual_kind is None or actual_value is None:
-            actual_kind, actual_value = self.current_token()
-        self.log(f"[Syntax Error] {msg} at token '{actual_value}' (type {actual_kind})", "error")
+            actual_kind, actual_value, _ = self.current_token()
+        self.sink.flush()
+        self.log(f"[Syntax Error] {msg} at token '{actual_value}' (type {actual_kind}){self.location()}", "error")
         raise SystemExit(1)
 
-    # ----------------------------
-    # PROGRAM ENTRY
-    # ----------------------------
-    def parse_program(self):
-        self.log("[Parser] Starting CR7 Script Parsing...\n", "header")
-
-        while self.current_token()[0] != "EOF":
-            kind, value = self.current_token()
-            if kind == "META_KEYWORD":
-                self.parse_meta()
-            elif kind == "FUNCTION_KEYWORD":
-                self.parse_function()
-            else:
-                self.error(f"Unexpected statement start: {value}")
-
-        self.log("\n[Parser] Parsing completed successfully ✅", "success")
-        messagebox.showinfo("Parsing Success", "CR7 Script parsed successfully ✅")
-
-    # ----------------------------
-    # META (#import stadium)
-    # ----------------------------
-    def parse_meta(self):
-        self.match("META_KEYWORD", "#import")
-        if self.current_token()[1] == "stadium":
-            self.match("META_KEYWORD", "stadium")
-        else:
-            self.error("Expected 'stadium' after #import")
-        self.log("→ Meta statement parsed (#import stadium)", "info")
-
-    # ----------------------------
-    # FUNCTION
-    # ----------------------------
-    def parse_function(self):
-        self.match("FUNCTION_KEYWORD", "play")
-
-        # Function name can be ID or FUNCTION_KEYWORD (e.g., kickoff)
-        kind, value = self.current_token()
-        if kind in ("ID", "FUNCTION_KEYWORD"):
-            self.pos += 1
-        else:
-            self.error("Expected function name after 'play'")
-
-        self.match("LPAREN")
-        self.parse_param_list()
-        self.match("RPAREN")
-        self.match("LBRACE")
-        self.parse_statement_list()
-        self.match("RBRACE")
-        self.log("→ Function parsed", "info")
-
-    def parse_param_list(self):
-        if self.current_token()[0] == "TYPE_KEYWORD":
-            self.match("TYPE_KEYWORD")
-            self.match("ID")
-            while self.current_token()[0] == "COMMA":
-                self.match("COMMA")
-                self.match("TYPE_KEYWORD")
-                self.match("ID")
-
-    # ----------------------------
-    # STATEMENTS
-    # ----------------------------
-    def parse_statement_list(self):
-        while self.current_token()[0] not in ("EOF", "RBRACE"):
-            self.parse_statement()
-
-    def parse_statement(self):
-        kind, value = self.current_token()
-
-        if kind == "TYPE_KEYWORD":
-            self.parse_declaration()
-        elif kind == "ID":
-            self.parse_assignment()
-        elif kind == "CONTROL_KEYWORD":
-            if value == "referee":
-                self.parse_if()
-            elif value == "practice":
-                self.parse_while()
-            elif value == "drill":
-                self.parse_for()
-            elif value == "bench":
+
+# -----------------------------
+# 🧵 COMPILE THREAD
+# -----------------------------
+POLL_MS = 20        # how often the main thread drains the message queue
+POLL_BUDGET = 0.01  # seconds of widget work per poll
+
+
+class CompileJob:
+    """Lexes and parses one script on a worker thread.
+
+    Results come back as messages on `messages`, which the Tk main thread
+    drains from root.after(); the job ends with ("done", from_cache),
+    ("failed",) or ("cancelled",).
+    """
+
+    def __init__(self, code, profile=None):
+        self.code = code
+        self.profile = profile  # a Profile to record lex and parse in, or None
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        post = self.messages.put
+        code = self.code
+        profile = self.profile
+        try:
+            key = CACHE.key(code) if CACHE is not None else None
+            entry = CACHE.get(key) if CACHE is not None else {}
+
+            # Tokenization
+            try:
+                with phase(profile, "lex") as lex:
+                    if "tokens" in entry:
+                        tokens = TokenTable.from_data(entry["tokens"])
+                    else:
+                        tokens = LEXER.tokenize_table(code)
+            except LexError as e:
+                post(("lex_error", str(e)))
+                post_profile(post, profile)
+                post(("failed",))
                 return
-            else:
-                self.error(f"Unknown control keyword '{value}'", kind, value)
-        elif kind == "OUTPUT_KEYWORD":
-            self.parse_output()
-        elif kind == "INPUT_KEYWORD":
-            self.parse_input()
-        elif kind == "FUNCTION_KEYWORD" and value == "whistle":
-            self.parse_return()
-        else:
-            self.error(f"Unexpected statement start: {value}", kind, value)
-
-    def parse_declaration(self):
-        self.match("TYPE_KEYWORD")
-        self.match("ID")
-        if self.current_token()[0] == "ASSIGN":
-            self.match("ASSIGN")
-            self.parse_expr()
-        self.match("END")
-        self.log("→ Declaration parsed", "info")
-
-    def parse_assignment(self):
-        self.match("ID")
-        self.match("ASSIGN")
-        self.parse_expr()
-        self.match("END")
-        self.log("→ Assignment parsed", "info")
-
-    def parse_if(self):
-        self.match("CONTROL_KEYWORD", "referee")
-        self.match("LPAREN")
-        self.parse_condition()
-        self.match("RPAREN")
-        self.match("LBRACE")
-        self.parse_statement_list()
-        self.match("RBRACE")
-
-        if self.current_token()[1] == "bench":
-            self.match("CONTROL_KEYWORD", "bench")
-            self.match("LBRACE")
-            self.parse_statement_list()
-            self.match("RBRACE")
-        self.log("→ If statement parsed", "info")
-
-    def parse_while(self):
-        self.match("CONTROL_KEYWORD", "practice")
-        self.match("LPAREN")
-        self.parse_condition()
-        self.match("RPAREN")
-        self.match("LBRACE")
-        self.parse_statement_list()
-        self.match("RBRACE")
-        self.log("→ While parsed", "info")
-
-    def parse_for(self):
-        self.match("CONTROL_KEYWORD", "drill")
-        self.match("LPAREN")
-        if self.current_token()[0] == "TYPE_KEYWORD":
-            self.parse_declaration_in_for()
-        elif self.current_token()[0] == "ID":
-            self.parse_assignment_in_for()
-        self.match("END")
-        if self.current_token()[0] != "END":
-            self.parse_condition()
-        self.match("END")
-        if self.current_token()[0] == "ID":
-            self.parse_assignment_in_for()
-        self.match("RPAREN")
-        self.match("LBRACE")
-        self.parse_statement_list()
-        self.match("RBRACE")
-        self.log("→ For parsed", "info")
-
-    def parse_declaration_in_for(self):
-        self.match("TYPE_KEYWORD")
-        self.match("ID")
-        if self.current_token()[0] == "ASSIGN":
-            self.match("ASSIGN")
-            self.parse_expr()
-        self.log("→ For-init declaration parsed", "info")
-
-    def parse_assignment_in_for(self):
-        self.match("ID")
-        kind, value = self.current_token()
-        if kind == "ASSIGN":
-            self.match("ASSIGN")
-            self.parse_expr()
-            self.log("→ For-update parsed (assignment)", "info")
-        elif kind == "OP" and value in ("++", "--"):
-            self.match("OP")
-            self.log("→ For-update parsed (increment/decrement)", "info")
-        else:
-            self.error("Expected '=' or '++'/'--' in for update")
-
-    def parse_output(self):
-        self.match("OUTPUT_KEYWORD")
-        self.parse_expr()
-        self.match("END")
-        self.log("→ Output parsed", "info")
-
-    def parse_input(self):
-        self.match("INPUT_KEYWORD")
-        self.match("ID")
-        self.match("END")
-        self.log("→ Input parsed", "info")
-
-    def parse_return(self):
-        self.match("FUNCTION_KEYWORD", "whistle")
-        self.parse_expr()
-        self.match("END")
-        self.log("→ Return parsed", "info")
-
-    def parse_condition(self):
-        self.parse_expr()
-        if self.current_token()[0] == "OP":
-            self.match("OP")
-            self.parse_expr()
-        else:
-            self.error("Expected relational operator in condition")
-
-    def parse_expr(self):
-        self.parse_term()
-        while self.current_token()[0] == "OP" and self.current_token()[1] in ("+", "-"):
-            self.match("OP")
-            self.parse_term()
-
-    def parse_term(self):
-        self.parse_factor()
-        while self.current_token()[0] == "OP" and self.current_token()[1] in ("*", "/"):
-            self.match("OP")
-            self.parse_factor()
-
-    def parse_factor(self):
-        kind, value = self.current_token()
-
-        # Identifier or function call (ID or FUNCTION_KEYWORD)
-        if kind in ("ID", "FUNCTION_KEYWORD"):
-            next_kind, _ = self.lookahead(1)
-            if next_kind == "LPAREN":
-                ident = self.match(kind)
-                self.match("LPAREN")
-                if self.current_token()[0] != "RPAREN":
-                    self.parse_expr()
-                    while self.current_token()[0] == "COMMA":
-                        self.match("COMMA")
-                        self.parse_expr()
-                self.match("RPAREN")
-                self.log(f"→ Function call parsed ({ident})", "info")
-            else:
-                self.match(kind)
-
-        elif kind in ("NUMBER", "STRING"):
-            self.match(kind)
-
-        elif kind == "LPAREN":
-            self.match("LPAREN")
-            self.parse_expr()
-            self.match("RPAREN")
+            if lex is not None:
+                lex.count("tokens", len(tokens) - 1)
+                lex.count("cached", int("tokens" in entry))
+            post(("tokens", tokens))
+
+            # Parsing
+            if "ast" in entry:
+                post(("log", [("[Parser] Loaded parsed program from cache ✅", "success")]))
+                post_profile(post, profile)
+                post(("done", True))
+                return
+            parser = CR7Parser(tokens, post, code, self.cancelled, FUNCTION_CACHE)
+            with FUNCTION_CACHE_LOCK:
+                try:
+                    with phase(profile, "parse") as parse:
+                        program = parser.parse_program()
+                except SystemExit:
+                    post_profile(post, profile)
+                    post(("failed",))
+                    return
+                if CACHE is not None:
+                    CACHE.update(key, tokens=tokens.to_data(), ast=node_to_data(program))
+            if parse is not None:
+                parse.count("nodes", sum(1 for _ in walk(program)))
+            post_profile(post, profile)
+            post(("done", False))
+        except CompileCancelled:
+            post(("cancelled",))
+        except Exception as e:
+            # Anything else (e.g. the cache failing) must still end the job,
+            # or poll_compile() would wait for it forever.
+            post(("log", [(f"[CR7 Compiler] {type(e).__name__}: {e}", "error")]))
+            post_profile(post, profile)
+            post(("failed",))
+
+
+@contextmanager
+def phase(profile, name):
+    """profile.phase(name), or nothing (yielding None) without a profile."""
+    if profile is None:
+        yield None
+    else:
+        with profile.phase(name) as record:
+            yield record
+
+
+def post_profile(post, profile):
+    if profile is not None:
+        lines = profile.table()
+        post(("log", [("[Profile]", "header"), (lines[0], "header")] + [(line, "info") for line in lines[1:]]))
+
+
+# -----------------------------
+# 🧾 TOKEN VIEW
+# -----------------------------
+TOKEN_PAGE = 5000   # tokens shown per "Show more" click
+TOKEN_CHUNK = 500   # tokens per widget insert; one chunk per event-loop turn
+
+
+class TokenView:
+    """Renders a token table into a text widget without freezing the window.
 
+    Only a page of tokens is shown at a time, and each page is inserted in
+    chunks scheduled with after(), so the event loop runs between chunks.
+    """
+
+    def __init__(self, box, button):
+        self.box = box
+        self.button = button
+        self.tokens = ()
+        self.shown = 0
+        self.limit = 0
+        self.job = None
+
+    def show(self, tokens):
+        self.cancel()
+        self.tokens = tokens
+        self.shown = 0
+        self.box.insert(tk.END, f"[CR7 Compiler] Tokens Generated ({len(tokens):,}):\n\n", "header")
+        self.more()
+
+    def more(self):
+        self.limit = min(len(self.tokens), self.shown + TOKEN_PAGE)
+        self.button.configure(state="disabled")
+        self.render_chunk()
+
+    def render_chunk(self):
+        tokens = self.tokens
+        end = min(self.shown + TOKEN_CHUNK, self.limit)
+        lines = []
+        for i in range(self.shown, end):
+            kind, value, _ = tokens[i]
+            lines.append(f"{kind:18} → {value}\n")
+        self.box.insert(tk.END, "".join(lines))
+        self.shown = end
+        if end < self.limit:
+            self.job = root.after(1, self.render_chunk)
+            return
+        self.job = None
+        remaining = len(tokens) - end
+        if remaining:
+            self.box.insert(tk.END, f"... {remaining:,} more tokens\n", "info")
+            self.button.configure(state="normal", text=f"Show more tokens ({remaining:,} left)")
         else:
-            self.error("Invalid factor")
+            self.button.configure(text="Show more tokens")
+
+    def more_clicked(self):
+        # Replace the "... N more" footer with the next page.
+        self.box.delete("end-2l", tk.END)
+        self.box.insert(tk.END, "\n")
+        self.more()
+
+    def cancel(self):
+        if self.job is not None:
+            root.after_cancel(self.job)
+            self.job = None
+        self.button.configure(state="disabled", text="Show more tokens")
+
+
+# -----------------------------
+# ⚡ LIVE MODE
+# -----------------------------
+LIVE_DELAY_MS = 150  # debounce: check the code this long after the last keystroke
+
+
+def on_modified(event=None):
+    global live_job
+    input_box.edit_modified(False)
+    if not live_var.get():
+        return
+    if live_job is not None:
+        root.after_cancel(live_job)
+    live_job = root.after(LIVE_DELAY_MS, live_update)
+
+
+def live_update():
+    global live_job
+    live_job = None
+    if not live_var.get():
+        return
+    code = input_box.get("1.0", "end-1c")
+    started = time.perf_counter()
+    reparsed = live_session.update(code)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    lines = LineIndex(code)
+    report = [(f"[Live] {len(live_session.items)} items, reparsed {reparsed} in {elapsed:.1f} ms", "header")]
+    for msg, offset in live_session.problems():
+        where = ""
+        if offset is not None:
+            line, column = lines.position(offset)
+            where = f" at line {line}, column {column}"
+        report.append((f"[Syntax Error] {msg}{where}", "error"))
+    if len(report) == 1:
+        report.append(("No syntax errors ✅", "success"))
+    parser_output.configure(state="normal")
+    parser_output.delete("1.0", tk.END)
+    log_lines(report)
+
+
+def toggle_live():
+    if live_var.get():
+        live_update()
+
+
+live_session = LiveSession()
+live_job = None
 
 
 # -----------------------------
 # ⚽ GUI IMPLEMENTATION
 # -----------------------------
 def run_compiler():
-    code = input_box.get("1.0", tk.END).strip()
+    global current_job
+    profile = Profile(profile_memory_var.get(), source="editor", compiler_version=COMPILER_VERSION) \
+        if profile_var.get() else None
+    with phase(profile, "read") as read:
+        # Unstripped, so offsets in errors match the editor's lines and columns.
+        code = input_box.get("1.0", "end-1c")
+    if read is not None:
+        read.count("bytes", len(code.encode("utf-8")))
+    cancel_compile()
+    token_view.cancel()
     token_output.configure(state="normal")
     parser_output.configure(state="normal")
     token_output.delete("1.0", tk.END)
     parser_output.delete("1.0", tk.END)
 
-    if not code:
+    if not code.strip():
         messagebox.showwarning("Empty Code", "Please enter CR7 Script code to compile.")
         return
 
-    # Tokenization
-    try:
-        tokens = tokenize(code)
-        token_output.insert(tk.END, "[CR7 Compiler] Tokens Generated:\n\n", "header")
-        for kind, value in tokens:
-            token_output.insert(tk.END, f"{kind:18} → {value}\n")
-    except RuntimeError as e:
-        token_output.insert(tk.END, f"[Lexer Error] {e}\n", "error")
-        return
+    current_job = CompileJob(code, profile)
+    current_job.start()
+    cancel_button.configure(state="normal")
+    root.after(POLL_MS, poll_compile, current_job)
+
+
+def cancel_compile():
+    if current_job is not None:
+        current_job.cancel()
+
+
+def poll_compile(job):
+    """Apply the job's queued results to the widgets, a time slice at a time."""
+    if job is not current_job:
+        return  # superseded by a newer run
+    deadline = time.perf_counter() + POLL_BUDGET
+    while time.perf_counter() < deadline:
+        try:
+            message = job.messages.get_nowait()
+        except queue.Empty:
+            break
+        kind = message[0]
+        if kind == "tokens":
+            token_view.show(message[1])
+        elif kind == "log":
+            log_lines(message[1])
+        elif kind == "lex_error":
+            token_output.insert(tk.END, f"[Lexer Error] {message[1]}\n", "error")
+        else:
+            cancel_button.configure(state="disabled")
+            if kind == "cancelled":
+                log_lines([("[Parser] Compilation cancelled", "error")])
+            elif kind == "done" and not message[1]:
+                messagebox.showinfo("Parsing Success", "CR7 Script parsed successfully ✅")
+            return
+    root.after(POLL_MS, poll_compile, job)
+
+
+def log_lines(lines):
+    """Insert many (msg, color) lines into the parser output in one Tk call"""
+    chunks = []
+    for msg, color in lines:
+        chunks += [msg + "\n", color or ()]
+    parser_output.configure(state="normal")
+    parser_output.insert(tk.END, *chunks)
+    parser_output.configure(state="disabled")
+    parser_output.see(tk.END)
 
-    # Parsing
-    try:
-        parser = CR7Parser(tokens, parser_output)
-        parser.parse_program()
-    except SystemExit:
-        pass
 
+current_job = None
 
 # GUI SETUP
 root = tk.Tk()
@@ -400,10 +370,28 @@ input_box.pack(padx=15, pady=10)
 run_button = tk.Button(root, text="Run 🏁", command=run_compiler, font=("Arial", 14, "bold"), bg="#FFD369", fg="#222831", padx=20, pady=5)
 run_button.pack(pady=10)
 
+cancel_button = tk.Button(root, text="Cancel ✋", command=cancel_compile, font=("Arial", 10), bg="#393E46", fg="#EEEEEE", state="disabled")
+cancel_button.pack()
+
+live_var = tk.BooleanVar(value=False)
+live_toggle = tk.Checkbutton(root, text="Live check ⚡", variable=live_var, command=toggle_live, font=("Arial", 10), fg="#EEEEEE", bg="#222831", selectcolor="#393E46")
+live_toggle.pack()
+profile_var = tk.BooleanVar(value=False)
+profile_toggle = tk.Checkbutton(root, text="Profile phases 📊", variable=profile_var, font=("Arial", 10), fg="#EEEEEE", bg="#222831", selectcolor="#393E46")
+profile_toggle.pack()
+profile_memory_var = tk.BooleanVar(value=True)
+profile_memory_toggle = tk.Checkbutton(root, text="Trace memory (slower)", variable=profile_memory_var, font=("Arial", 10), fg="#EEEEEE", bg="#222831", selectcolor="#393E46")
+profile_memory_toggle.pack()
+input_box.bind("<<Modified>>", on_modified)
+
 token_label = tk.Label(root, text="Token Output:", font=("Arial", 12, "bold"), fg="#EEEEEE", bg="#222831")
 token_label.pack()
 token_output = scrolledtext.ScrolledText(root, width=115, height=10, font=("Consolas", 10), bg="#393E46", fg="#EEEEEE", insertbackground="white")
 token_output.pack(padx=15, pady=10)
+show_more_button = tk.Button(root, text="Show more tokens", font=("Arial", 10), bg="#393E46", fg="#EEEEEE", state="disabled")
+show_more_button.pack()
+token_view = TokenView(token_output, show_more_button)
+show_more_button.configure(command=token_view.more_clicked)
 
 parser_label = tk.Label(root, text="Parser Output:", font=("Arial", 12, "bold"), fg="#EEEEEE", bg="#222831")
 parser_label.pack()
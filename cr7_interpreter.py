@@ -0,0 +1,356 @@
+import operator
+
+from cr7_ast import (
+    Assignment, BinOp, Call, Declaration, For, If, Input, LogicalOp, Name,
+    Number, Output, Return, String, UnaryOp, While,
+)
+
+# Value a declaration without an initialiser starts with, per type keyword.
+TYPE_DEFAULTS = {"goal": 0, "player": 0.0, "flag": False, "match": ""}
+
+ENTRY_POINT = "kickoff"
+
+
+class CR7RuntimeError(Exception):
+    def __init__(self, message, offset=None):
+        super().__init__(message)
+        self.offset = offset
+
+
+# ----------------------------
+# OPERATORS
+# ----------------------------
+def cr7_add(left, right):
+    # `+` concatenates as soon as either side is text.
+    if isinstance(left, str) or isinstance(right, str):
+        return format_value(left) + format_value(right)
+    return left + right
+
+
+def cr7_div(left, right):
+    # Whole-number division truncates toward zero, as in C.
+    if isinstance(left, int) and isinstance(right, int):
+        quotient = abs(left) // abs(right)
+        return quotient if (left >= 0) == (right >= 0) else -quotient
+    return left / right
+
+
+OPERATORS = {
+    "+": cr7_add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": cr7_div,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+UNARY_OPERATORS = {
+    "-": operator.neg,
+    "!": operator.not_,
+}
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def operand_error(op, offset, *operands):
+    """The error every backend raises when `op` gets values it cannot apply to."""
+    shown = " and ".join(repr(format_value(value)) for value in operands)
+    return CR7RuntimeError(f"Cannot apply '{op}' to {shown}", offset)
+
+
+def parse_input(text):
+    """Turn a line read by `listen` into a number when it looks like one."""
+    text = text.strip()
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+# ----------------------------
+# RESOLVER
+# ----------------------------
+class Resolver:
+    """Static pass run once before execution: gives every variable a slot
+    index in its function's frame, binds calls to their Function node and
+    operators to their implementation, so the interpreter never looks a
+    name up at run time."""
+
+    def __init__(self, program):
+        self.program = program
+        self.functions = {}
+        self.scopes = []
+        self.frame_size = 0
+
+    def resolve(self):
+        for function in self.program.functions:
+            if function.name in self.functions:
+                raise CR7RuntimeError(f"Function '{function.name}' is defined twice", function.offset)
+            self.functions[function.name] = function
+        for function in self.program.functions:
+            self.resolve_function(function)
+        return self.functions
+
+    def resolve_function(self, function):
+        self.scopes = [{}]
+        self.frame_size = 0
+        for _, name in function.params:
+            self.declare(name, function.offset)
+        self.resolve_block(function.body)
+        function.frame_size = self.frame_size
+
+    def declare(self, name, offset):
+        scope = self.scopes[-1]
+        if name in scope:
+            raise CR7RuntimeError(f"Variable '{name}' is already declared in this block", offset)
+        scope[name] = slot = self.frame_size
+        self.frame_size += 1
+        return slot
+
+    def lookup(self, name, offset):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise CR7RuntimeError(f"Undeclared variable '{name}'", offset)
+
+    def resolve_block(self, statements):
+        self.scopes.append({})
+        for statement in statements:
+            self.resolve_statement(statement)
+        self.scopes.pop()
+
+    def resolve_statement(self, node):
+        kind = type(node)
+        if kind is Declaration:
+            if node.value is not None:
+                self.resolve_expr(node.value)
+            node.slot = self.declare(node.name, node.offset)
+        elif kind is Assignment:
+            self.resolve_expr(node.value)
+            node.slot = self.lookup(node.name, node.offset)
+        elif kind is If:
+            self.resolve_expr(node.condition)
+            self.resolve_block(node.body)
+            if node.orelse is not None:
+                self.resolve_block(node.orelse)
+        elif kind is While:
+            self.resolve_expr(node.condition)
+            self.resolve_block(node.body)
+        elif kind is For:
+            # The init declaration is scoped to the loop.
+            self.scopes.append({})
+            if node.init is not None:
+                self.resolve_statement(node.init)
+            if node.condition is not None:
+                self.resolve_expr(node.condition)
+            if node.update is not None:
+                self.resolve_statement(node.update)
+            self.resolve_block(node.body)
+            self.scopes.pop()
+        elif kind is Input:
+            node.slot = self.lookup(node.name, node.offset)
+        elif kind in (Output, Return):
+            self.resolve_expr(node.value)
+
+    def resolve_expr(self, node):
+        kind = type(node)
+        if kind is Name:
+            node.slot = self.lookup(node.id, node.offset)
+        elif kind is BinOp:
+            if node.op not in OPERATORS:
+                raise CR7RuntimeError(f"Unknown operator '{node.op}'", node.offset)
+            node.fn = OPERATORS[node.op]
+            self.resolve_expr(node.left)
+            self.resolve_expr(node.right)
+        elif kind is UnaryOp:
+            if node.op not in UNARY_OPERATORS:
+                raise CR7RuntimeError(f"Unknown operator '{node.op}'", node.offset)
+            node.fn = UNARY_OPERATORS[node.op]
+            self.resolve_expr(node.operand)
+        elif kind is LogicalOp:
+            self.resolve_expr(node.left)
+            self.resolve_expr(node.right)
+        elif kind is Call:
+            target = self.functions.get(node.name)
+            if target is None:
+                raise CR7RuntimeError(f"Call to undefined function '{node.name}'", node.offset)
+            if len(node.args) != len(target.params):
+                raise CR7RuntimeError(
+                    f"'{node.name}' takes {len(target.params)} argument(s), got {len(node.args)}", node.offset
+                )
+            node.target = target
+            for arg in node.args:
+                self.resolve_expr(arg)
+
+
+def resolve(program):
+    """Annotate `program` in place and return its functions by name."""
+    return Resolver(program).resolve()
+
+
+# ----------------------------
+# INTERPRETER
+# ----------------------------
+class Interpreter:
+    """Tree-walking interpreter over a resolved AST.
+
+    Each call gets a flat list frame indexed by the resolver's slots.
+    Statements dispatch through a type -> method table; executing a
+    statement returns None to fall through, or a 1-tuple holding the value
+    of a `whistle`, so that whistling None still returns.
+    """
+
+    def __init__(self, program, announce=None, listen=None, functions=None):
+        self.functions = resolve(program) if functions is None else functions
+        self.announce = announce or (lambda text: print(text))
+        self.listen = listen or input
+        self.statements = {
+            Declaration: self.exec_declaration,
+            Assignment: self.exec_assignment,
+            If: self.exec_if,
+            While: self.exec_while,
+            For: self.exec_for,
+            Output: self.exec_output,
+            Input: self.exec_input,
+            Return: self.exec_return,
+        }
+        self.expressions = {
+            Number: self.eval_literal,
+            String: self.eval_literal,
+            Name: self.eval_name,
+            BinOp: self.eval_binop,
+            UnaryOp: self.eval_unary,
+            LogicalOp: self.eval_logical,
+            Call: self.eval_call,
+        }
+
+    def run(self, entry=ENTRY_POINT):
+        function = self.functions.get(entry)
+        if function is None:
+            raise CR7RuntimeError(f"No '{entry}' function to start from")
+        if function.params:
+            raise CR7RuntimeError(f"'{entry}' must not take parameters", function.offset)
+        try:
+            return self.call(function, [])
+        except RecursionError:
+            raise CR7RuntimeError("Maximum call depth exceeded") from None
+
+    def call(self, function, args):
+        frame = [None] * function.frame_size
+        frame[:len(args)] = args
+        result = self.exec_block(function.body, frame)
+        return None if result is None else result[0]
+
+    # ----------------------------
+    # STATEMENTS
+    # ----------------------------
+    def exec_block(self, statements, frame):
+        handlers = self.statements
+        for statement in statements:
+            result = handlers[type(statement)](statement, frame)
+            if result is not None:
+                return result
+        return None
+
+    def exec_declaration(self, node, frame):
+        if node.value is None:
+            frame[node.slot] = TYPE_DEFAULTS[node.type_name]
+        else:
+            frame[node.slot] = self.evaluate(node.value, frame)
+
+    def exec_assignment(self, node, frame):
+        frame[node.slot] = self.evaluate(node.value, frame)
+
+    def exec_if(self, node, frame):
+        if self.evaluate(node.condition, frame):
+            return self.exec_block(node.body, frame)
+        if node.orelse is not None:
+            return self.exec_block(node.orelse, frame)
+
+    def exec_while(self, node, frame):
+        evaluate = self.evaluate
+        exec_block = self.exec_block
+        condition, body = node.condition, node.body
+        while evaluate(condition, frame):
+            result = exec_block(body, frame)
+            if result is not None:
+                return result
+
+    def exec_for(self, node, frame):
+        evaluate = self.evaluate
+        exec_block = self.exec_block
+        statements = self.statements
+        if node.init is not None:
+            statements[type(node.init)](node.init, frame)
+        condition, update, body = node.condition, node.update, node.body
+        while condition is None or evaluate(condition, frame):
+            result = exec_block(body, frame)
+            if result is not None:
+                return result
+            if update is not None:
+                self.exec_assignment(update, frame)
+
+    def exec_output(self, node, frame):
+        self.announce(format_value(self.evaluate(node.value, frame)))
+
+    def exec_input(self, node, frame):
+        frame[node.slot] = parse_input(self.listen())
+
+    def exec_return(self, node, frame):
+        return (self.evaluate(node.value, frame),)
+
+    # ----------------------------
+    # EXPRESSIONS
+    # ----------------------------
+    def evaluate(self, node, frame):
+        return self.expressions[type(node)](node, frame)
+
+    def eval_literal(self, node, frame):
+        return node.value
+
+    def eval_name(self, node, frame):
+        return frame[node.slot]
+
+    def eval_binop(self, node, frame):
+        left = self.evaluate(node.left, frame)
+        right = self.evaluate(node.right, frame)
+        try:
+            return node.fn(left, right)
+        except ZeroDivisionError:
+            raise CR7RuntimeError("Division by zero", node.offset) from None
+        except TypeError:
+            raise operand_error(node.op, node.offset, left, right) from None
+
+    def eval_unary(self, node, frame):
+        operand = self.evaluate(node.operand, frame)
+        try:
+            return node.fn(operand)
+        except TypeError:
+            raise operand_error(node.op, node.offset, operand) from None
+
+    def eval_logical(self, node, frame):
+        # `&&` and `||` short-circuit and always yield a flag.
+        left = bool(self.evaluate(node.left, frame))
+        if left is (node.op == "||"):
+            return left
+        return bool(self.evaluate(node.right, frame))
+
+    def eval_call(self, node, frame):
+        evaluate = self.evaluate
+        return self.call(node.target, [evaluate(arg, frame) for arg in node.args])
+
+
+def run_program(program, announce=None, listen=None, functions=None):
+    """Run `program` from its kickoff. `functions` is resolve(program), for
+    a caller that has already resolved it."""
+    return Interpreter(program, announce, listen, functions).run()
@@ -0,0 +1,157 @@
+from cr7_ast import Program
+from cr7_compiler import KIND_CODES, LEXER, CR7Parser, TokenCursor, TraceSink, top_level_spans
+
+# ----------------------------
+# LIVE SYNTAX CHECK
+# ----------------------------
+# What the GUI's live mode runs after each pause in typing: the editor text
+# is kept split into top-level items, each with its first problem, so an
+# edit only relexes the text around it and parses the items it touched.
+
+
+class LiveParser(CR7Parser):
+    """Silent parser for live mode that records the first syntax error."""
+
+    def __init__(self, tokens, source):
+        super().__init__(tokens, source, TraceSink())
+        self.problem = None
+
+    def error(self, msg, actual_kind=None, actual_value=None):
+        if actual_kind is None or actual_value is None:
+            actual_kind, actual_value, _ = self.current_token()
+        self.problem = (f"{msg} at token '{actual_value}' (type {actual_kind})", self.offset())
+        raise SystemExit(1)
+
+
+def parse_problem(tokens, source, start=0, stop=None):
+    """First syntax error in the items starting in tokens[start:stop] as
+    (message, offset), or None. An unclosed item reads on past `stop`, so
+    the error is the one the compiler would report."""
+    parser = LiveParser(TokenCursor(tokens, start), source)
+    try:
+        parser.parse_items(Program([], []), stop)
+    except SystemExit:
+        return parser.problem
+    return None
+
+
+def edit_span(old, new):
+    """(start, old_stop, new_stop) of the region where `old` and `new` differ,
+    found by bisecting on slice comparisons so the scan runs in C."""
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+    lo, hi = 0, limit - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return prefix, len(old) - lo, len(new) - lo
+
+
+def lex_problem(code, offset):
+    return (f"Unexpected token: {code[offset]}", offset)
+
+
+def self_contained(tokens, first, stop):
+    """Whether the item in tokens[first:stop] ends without looking at what
+    follows it: an `#import stadium` line, or a function whose braces
+    balance at its last token. Its problem then depends on its text alone."""
+    kinds = tokens.kinds
+    meta = KIND_CODES["META_KEYWORD"]
+    if kinds[first] == meta:
+        return stop - first == 2 and kinds[first + 1] == meta
+    body = kinds[first:stop]
+    return (tokens.value(first) == "play" and body[-1] == KIND_CODES["RBRACE"]
+            and body.count(KIND_CODES["LBRACE"]) == body.count(KIND_CODES["RBRACE"]))
+
+
+class LiveSession:
+    """Syntax state of the editor text, kept per top-level item.
+
+    Each item is a [start, stop, problem] list. After an edit the token
+    table is relexed around it (Lexer.relex) and split into items again;
+    an item whose text the edit left alone keeps its problem, so only the
+    items around the edit are parsed again. Items that are not
+    self-contained may read on into what follows, so they are always
+    reparsed. Unexpected characters are reported without stopping the
+    lexer, so a stray one doesn't force every later keystroke to relex.
+    """
+
+    def __init__(self):
+        self.code = ""
+        self.tokens = None
+        self.errors = []  # offsets of every unexpected character
+        self.items = []
+        self.stray = []  # offsets of unexpected characters between items
+        self.known = {}  # (start, stop) -> problem of each self-contained item
+
+    def update(self, code):
+        """Catch up with `code`; returns how many items were reparsed."""
+        if self.tokens is None:
+            return self.rebuild(code)
+        start, old_stop, new_stop = edit_span(self.code, code)
+        if start == old_stop == new_stop:
+            return 0
+        LEXER.relex(self.tokens, code, start, old_stop - start, code[start:new_stop], self.errors)
+        delta = new_stop - old_stop
+        known = {}
+        for (item_start, item_stop), problem in self.known.items():
+            if item_stop <= start:
+                known[item_start, item_stop] = problem
+            elif item_start >= old_stop:
+                if problem is not None:
+                    problem = (problem[0], problem[1] + delta)
+                known[item_start + delta, item_stop + delta] = problem
+        self.code = code
+        return self.split(known)
+
+    def rebuild(self, code):
+        self.code = code
+        self.errors = []
+        self.tokens = LEXER.tokenize_table(code, errors=self.errors)
+        return self.split({})
+
+    def split(self, known):
+        """Split the token table into items and stray characters, taking the
+        problem of an item from `known` by its (start, stop) when there;
+        returns how many items were parsed. Entries of `known` that match
+        no item are kept, for when an edit is undone."""
+        code, tokens, errors = self.code, self.tokens, self.errors
+        self.items = []
+        self.stray = []
+        self.known = known
+        parsed = 0
+        e = 0
+        for first, stop in top_level_spans(tokens):
+            start, end = tokens.starts[first], tokens.span(stop - 1)[1]
+            while e < len(errors) and errors[e] < start:
+                self.stray.append(errors[e])
+                e += 1
+            if e < len(errors) and errors[e] < end:
+                problem = lex_problem(code, errors[e])
+                while e < len(errors) and errors[e] < end:
+                    e += 1
+            elif (start, end) in known:
+                problem = known[start, end]
+            else:
+                problem = parse_problem(tokens, code, first, stop)
+                parsed += 1
+            if self_contained(tokens, first, stop):
+                self.known[start, end] = problem
+            self.items.append([start, end, problem])
+        self.stray.extend(errors[e:])
+        return parsed
+
+    def problems(self):
+        found = [item[2] for item in self.items if item[2] is not None]
+        found += [lex_problem(self.code, offset) for offset in self.stray]
+        return sorted(found, key=lambda problem: problem[1])
@@ -0,0 +1,541 @@
+import hashlib
+import importlib
+import os
+import tempfile
+
+from cr7_ast import (
+    Assignment, BinOp, Call, Declaration, For, Function, If, Import, Input,
+    LogicalOp, Name, Number, Output, Program, Return, String, UnaryOp, While,
+)
+from cr7_compiler import BINARY_OPERATORS, KIND_NAMES, LOGICAL_OPERATORS, CR7Parser, TokenTable
+
+# ----------------------------
+# GRAMMAR
+# ----------------------------
+# CR7 Script in LL(1) form, building the same AST as CR7Parser. Quoted
+# symbols are literal token values, UPPER names token kinds (TYPE is any
+# type keyword, OP any operator not quoted elsewhere), lower names
+# nonterminals and @names semantic actions, which run when the driver pops
+# them. Matched tokens other than punctuation are pushed on the value stack
+# as (value, offset); actions pop them and push nodes. @mark records the
+# value stack height and @list gathers everything above it into a list.
+#
+# Binary operators are not split into one nonterminal per precedence level:
+# an expression is read as a flat operand (operator operand)* run and
+# @shift/@expr fold it by CR7Parser's BINARY_OPERATORS table, which keeps
+# the symbol stack shallow.
+GRAMMAR = """
+program     : items EOF @program
+items       : item items
+            |
+item        : '#import' 'stadium' @import
+            | 'play' fname '(' @mark params ')' '{' @mark stmts '}' @function
+fname       : ID | 'kickoff' | 'whistle' | 'play'
+params      : param more_params
+            |
+more_params : ',' param more_params
+            |
+param       : TYPE ID @param
+
+stmts       : stmt stmts
+            |
+stmt        : TYPE ID decl_value ';' @declaration
+            | ID '=' expr ';' @assignment
+            | 'referee' '(' expr ')' block orelse @if
+            | 'practice' '(' expr ')' block @while
+            | 'drill' '(' for_init ';' for_cond ';' for_update ')' block @for
+            | 'announce' expr ';' @output
+            | 'listen' ID ';' @input
+            | 'whistle' expr ';' @return
+decl_value  : '=' expr
+            | @none
+block       : '{' @mark stmts '}' @list
+orelse      : 'bench' block
+            | @none
+for_init    : TYPE ID decl_value @declaration
+            | ID update @update
+            | @none
+for_cond    : expr
+            | @none
+for_update  : ID update @update
+            | @none
+update      : '=' expr
+            | '++'
+            | '--'
+
+expr        : @mark unary expr_tail @expr
+expr_tail   : OP @shift unary expr_tail
+            | '-' @shift unary expr_tail
+            |
+unary       : '-' unary @unary
+            | '!' unary @unary
+            | factor
+factor      : ID call_tail
+            | 'kickoff' call
+            | 'whistle' call
+            | 'play' call
+            | NUMBER @number
+            | STRING @string
+            | '(' expr ')'
+call_tail   : call
+            | @name
+call        : '(' @mark args ')' @call
+args        : expr more_args
+            |
+more_args   : ',' expr more_args
+            |
+"""
+
+# Token kinds that stand for themselves as terminals; any other kind only
+# matches through a quoted literal.
+KIND_TERMINALS = {"ID": "ID", "NUMBER": "NUMBER", "STRING": "STRING", "TYPE_KEYWORD": "TYPE",
+                  "OP": "OP", "EOF": "EOF"}
+# Punctuation is checked but not pushed on the value stack.
+DROPPED = ("'('", "')'", "'{'", "'}'", "';'", "','", "'='", "'bench'", "EOF")
+
+TABLES_MODULE = "cr7_ll1_tables"
+TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), TABLES_MODULE + ".py")
+
+
+def read_grammar(text):
+    """[(nonterminal, [alternative symbols, ...]), ...] in grammar order."""
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("|"):
+            body = line[1:]
+        else:
+            name, _, body = line.partition(":")
+            rules.append((name.strip(), []))
+        # Split on bare `|` symbols only, so a quoted '||' stays one literal.
+        alternatives = [[]]
+        for symbol in body.split():
+            if symbol == "|":
+                alternatives.append([])
+            else:
+                alternatives[-1].append(symbol)
+        rules[-1][1].extend(alternatives)
+    return rules
+
+
+def grammar_hash(text=GRAMMAR):
+    """Digest of everything the generated tables depend on."""
+    return hashlib.sha256(f"{text}\0{KIND_TERMINALS!r}\0{DROPPED!r}".encode("utf-8")).hexdigest()
+
+
+# ----------------------------
+# TABLE GENERATION
+# ----------------------------
+def first_sets(rules, terminals):
+    """FIRST of every nonterminal; None stands for the empty string."""
+    first = {name: set() for name, _ in rules}
+    changed = True
+    while changed:
+        changed = False
+        for name, alternatives in rules:
+            for symbols in alternatives:
+                found = sequence_first(symbols, first, terminals)
+                if not found <= first[name]:
+                    first[name] |= found
+                    changed = True
+    return first
+
+
+def sequence_first(symbols, first, terminals):
+    found = set()
+    for symbol in symbols:
+        if symbol.startswith("@"):
+            continue
+        if symbol in terminals:
+            found.add(symbol)
+            return found
+        found |= first[symbol] - {None}
+        if None not in first[symbol]:
+            return found
+    found.add(None)
+    return found
+
+
+def follow_sets(rules, first, terminals, start):
+    follow = {name: set() for name, _ in rules}
+    follow[start].add("EOF")
+    changed = True
+    while changed:
+        changed = False
+        for name, alternatives in rules:
+            for symbols in alternatives:
+                for i, symbol in enumerate(symbols):
+                    if symbol.startswith("@") or symbol in terminals:
+                        continue
+                    found = sequence_first(symbols[i + 1:], first, terminals)
+                    if None in found:
+                        found = (found - {None}) | follow[name]
+                    if not found <= follow[symbol]:
+                        follow[symbol] |= found
+                        changed = True
+    return follow
+
+
+def build_tables(text=GRAMMAR):
+    """Generate the parse tables for `text` as the source of a Python
+    module. Raises ValueError when the grammar is not LL(1)."""
+    rules = read_grammar(text)
+    nonterminals = [name for name, _ in rules]
+    symbols = [symbol for _, alternatives in rules for symbols in alternatives for symbol in symbols]
+    terminals = []
+    actions = ["@mark"]
+    for symbol in symbols:
+        if symbol.startswith("@"):
+            if symbol not in actions:
+                actions.append(symbol)
+        elif symbol not in nonterminals and symbol not in terminals:
+            terminals.append(symbol)
+    unknown = [symbol for symbol in terminals if not symbol.startswith("'") and symbol not in KIND_TERMINALS.values()]
+    if unknown:
+        raise ValueError(f"Undefined grammar symbols: {', '.join(unknown)}")
+    terminal_set = set(terminals)
+    first = first_sets(rules, terminal_set)
+    follow = follow_sets(rules, first, terminal_set, nonterminals[0])
+
+    # Symbol codes: terminals first, then nonterminals, then actions, so the
+    # driver tells them apart with two comparisons. The last terminal code
+    # is for tokens the grammar never mentions.
+    codes = {symbol: code for code, symbol in enumerate(terminals + ["?"] + nonterminals + actions)}
+    width = len(terminals) + 1
+    rows = [None] * width
+    for name, alternatives in rules:
+        row = [None] * width
+        for symbols in alternatives:
+            found = sequence_first(symbols, first, terminal_set)
+            if None in found:
+                found = (found - {None}) | follow[name]
+            production = tuple(codes[symbol] for symbol in reversed(symbols))
+            for terminal in found:
+                if row[codes[terminal]] is not None:
+                    raise ValueError(f"Grammar is not LL(1): {name} has two productions on {terminal}")
+                row[codes[terminal]] = production
+        rows.append(tuple(row))
+
+    names = terminals + ["?"] + nonterminals + actions
+    lines = [
+        f"# Generated by cr7_ll1 from its GRAMMAR. Do not edit; run cr7_ll1.py to regenerate.",
+        f"GRAMMAR_HASH = {grammar_hash(text)!r}",
+        f"NAMES = {tuple(names)!r}",
+        f"TERMINALS = {width}",
+        f"START = {codes[nonterminals[0]]}",
+        f"FIRST_ACTION = {width + len(nonterminals)}",
+        f"KEEP = {tuple(symbol not in DROPPED for symbol in terminals + ['?'])!r}",
+        f"LITERALS = {dict((symbol[1:-1], codes[symbol]) for symbol in terminals if symbol.startswith(chr(39)))!r}",
+        f"KINDS = {dict((kind, codes[name]) for kind, name in KIND_TERMINALS.items() if name in codes)!r}",
+        "TABLE = (",
+    ]
+    lines.extend(f"    {row!r}," for row in rows)
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def load_tables():
+    """The generated tables as a dict: the committed tables module when it
+    was generated from the current GRAMMAR, otherwise tables built in
+    memory. Nothing is written at run time; run this file to regenerate
+    the module after editing GRAMMAR."""
+    try:
+        module = importlib.import_module(TABLES_MODULE)
+    except ImportError:
+        module = None
+    if getattr(module, "GRAMMAR_HASH", None) == grammar_hash():
+        return vars(module)
+    namespace = {}
+    exec(compile(build_tables(), TABLES_MODULE + ".py", "exec"), namespace)
+    return namespace
+
+
+def write_tables(path=TABLES_PATH):
+    """Regenerate the tables module at `path`. It is written to a temporary
+    file and renamed into place, so an import never sees half a module."""
+    source = build_tables()
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(source)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# ----------------------------
+# SEMANTIC ACTIONS
+# ----------------------------
+# Each takes the value stack and the mark stack.
+def act_list(values, marks):
+    start = marks.pop()
+    items = values[start:]
+    del values[start:]
+    values.append(items)
+
+
+def act_none(values, marks):
+    values.append(None)
+
+
+def act_program(values, marks):
+    items = values[1:]
+    imports = [node for node in items if type(node) is Import]
+    functions = [node for node in items if type(node) is Function]
+    values[:] = [Program(imports, functions, values[0])]
+
+
+def act_import(values, marks):
+    module = values.pop()
+    values.append(Import(module[0], values.pop()[1]))
+
+
+def act_function(values, marks):
+    start = marks.pop()
+    body = values[start:]
+    del values[start:]
+    start = marks.pop()
+    params = values[start:]
+    del values[start:]
+    name = values.pop()
+    values.append(Function(name[0], params, body, values.pop()[1]))
+
+
+def act_param(values, marks):
+    name = values.pop()
+    values.append((values.pop()[0], name[0]))
+
+
+def act_declaration(values, marks):
+    value = values.pop()
+    name = values.pop()
+    type_name, offset = values.pop()
+    values.append(Declaration(type_name, name[0], value, offset))
+
+
+def act_assignment(values, marks):
+    value = values.pop()
+    name, offset = values.pop()
+    values.append(Assignment(name, value, offset))
+
+
+def act_update(values, marks):
+    # `i = expr` leaves a node; `i++`/`i--` leave the operator token.
+    value = values.pop()
+    name, offset = values.pop()
+    if type(value) is tuple:
+        op, op_offset = value
+        value = BinOp(op[0], Name(name, offset), Number(1, op_offset), op_offset)
+    values.append(Assignment(name, value, offset))
+
+
+def act_if(values, marks):
+    orelse = values.pop()
+    body = values.pop()
+    condition = values.pop()
+    values.append(If(condition, body, orelse, values.pop()[1]))
+
+
+def act_while(values, marks):
+    body = values.pop()
+    condition = values.pop()
+    values.append(While(condition, body, values.pop()[1]))
+
+
+def act_for(values, marks):
+    body = values.pop()
+    update = values.pop()
+    condition = values.pop()
+    init = values.pop()
+    values.append(For(init, condition, update, body, values.pop()[1]))
+
+
+def act_output(values, marks):
+    value = values.pop()
+    values.append(Output(value, values.pop()[1]))
+
+
+def act_input(values, marks):
+    name = values.pop()
+    values.append(Input(name[0], values.pop()[1]))
+
+
+def act_return(values, marks):
+    value = values.pop()
+    values.append(Return(value, values.pop()[1]))
+
+
+def reduce_operator(values):
+    right = values.pop()
+    op, offset = values.pop()
+    node = LogicalOp if op in LOGICAL_OPERATORS else BinOp
+    values[-1] = node(op, values[-1], right, offset)
+
+
+def act_shift(values, marks):
+    # Above the expression's mark the values alternate operand, operator,
+    # operand, ..., with binding power rising left to right, and the
+    # operator just matched on top. Fold everything binding at least as
+    # tightly as it first: all operators are left-associative.
+    op = values.pop()
+    power = BINARY_OPERATORS[op[0]]
+    start = marks[-1]
+    while len(values) - start > 1 and BINARY_OPERATORS[values[-2][0]] >= power:
+        reduce_operator(values)
+    values.append(op)
+
+
+def act_expr(values, marks):
+    start = marks.pop()
+    while len(values) - start > 1:
+        reduce_operator(values)
+
+
+def act_unary(values, marks):
+    operand = values.pop()
+    op, offset = values.pop()
+    values.append(UnaryOp(op, operand, offset))
+
+
+def act_number(values, marks):
+    value, offset = values[-1]
+    values[-1] = Number(float(value) if "." in value else int(value), offset)
+
+
+def act_string(values, marks):
+    value, offset = values[-1]
+    values[-1] = String(value[1:-1], offset)
+
+
+def act_name(values, marks):
+    value, offset = values[-1]
+    values[-1] = Name(value, offset)
+
+
+def act_call(values, marks):
+    start = marks.pop()
+    args = values[start:]
+    del values[start:]
+    name, offset = values[-1]
+    values[-1] = Call(name, args, offset)
+
+
+ACTIONS = {
+    name[4:]: function for name, function in list(globals().items()) if name.startswith("act_")
+}
+
+
+# ----------------------------
+# DRIVER
+# ----------------------------
+class TableParser(CR7Parser):
+    """Table-driven LL(1) parser for the same language and AST as
+    CR7Parser. One loop pops grammar symbols off an explicit stack:
+    terminals are matched, nonterminals replaced by the production the
+    table picks for the current token, and actions build nodes, so no
+    Python call is made per production. On a syntax error the input is
+    parsed again by CR7Parser, which reports it; progress is not traced
+    node by node."""
+
+    tables = None
+
+    def __init__(self, tokens, source=None, sink=None):
+        if not isinstance(tokens, (list, tuple, TokenTable)):
+            tokens = list(tokens)
+        super().__init__(tokens, source, sink)
+        if TableParser.tables is None:
+            TableParser.tables = load_tables()
+        tables = self.tables
+        self.names = tables["NAMES"]
+        self.actions = [ACTIONS.get(name[1:]) for name in self.names[tables["FIRST_ACTION"]:]]
+        unknown = [name for name, action in zip(self.names[tables["FIRST_ACTION"]:], self.actions)
+                   if action is None and name != "@mark"]
+        if unknown:
+            raise ValueError(f"No semantic action for {', '.join(unknown)}")
+
+    def parse_program(self):
+        tables = self.tables
+        table = tables["TABLE"]
+        keep = tables["KEEP"]
+        n_terminals = tables["TERMINALS"]
+        first_action = tables["FIRST_ACTION"]
+        mark = first_action  # @mark is always the first action
+        actions = self.actions
+        literals = tables["LITERALS"]
+        unknown = n_terminals - 1
+        kind_codes = [tables["KINDS"].get(name, unknown) for name in KIND_NAMES]
+
+        cursor = self.tokens
+        tokens = cursor.tokens
+        if isinstance(tokens, TokenTable):
+            kinds, value_ids, texts, starts = tokens.kinds, tokens.value_ids, tokens.values, tokens.starts
+        else:
+            kinds = [KIND_NAMES.index(kind) for kind, _, _ in tokens]
+            value_ids = range(len(tokens))
+            texts = [value for _, value, _ in tokens]
+            starts = [offset for _, _, offset in tokens]
+        value_codes = [literals.get(text, -1) for text in texts]
+        eof = kind_codes[KIND_NAMES.index("EOF")]
+
+        i = start = cursor.index
+        size = cursor.size
+        if self.tracing:
+            self.sink.start()
+        values = [self.offset()]
+        marks = []
+        stack = [tables["START"]]
+        pop = stack.pop
+        push = stack.extend
+        if i < size:
+            t = value_codes[value_ids[i]]
+            if t < 0:
+                t = kind_codes[kinds[i]]
+        else:
+            t = eof
+        while stack:
+            symbol = pop()
+            if symbol < n_terminals:
+                if symbol != t:
+                    return self.reparse(start)
+                if keep[symbol]:
+                    values.append((texts[value_ids[i]], starts[i]))
+                i += 1
+                if i < size:
+                    t = value_codes[value_ids[i]]
+                    if t < 0:
+                        t = kind_codes[kinds[i]]
+                else:
+                    t = eof
+            elif symbol < first_action:
+                production = table[symbol][t]
+                if production is None:
+                    return self.reparse(start)
+                push(production)
+            elif symbol == mark:
+                marks.append(len(values))
+            else:
+                actions[symbol - first_action](values, marks)
+        cursor.index = size - 1  # at EOF
+        if self.tracing:
+            self.sink.finish()
+            self.sink.flush()
+        return values[0]
+
+    def reparse(self, start):
+        """Parse from token `start` again with CR7Parser, so a syntax error
+        reads the same whichever parser met it: the table only knows which
+        tokens it expected, not what the error means."""
+        self.tokens.index = start
+        self.tracing = False  # the sink has started already
+        return CR7Parser.parse_program(self)
+
+if __name__ == "__main__":
+    # Regenerate the tables module, e.g. after editing GRAMMAR.
+    write_tables()
+    print(f"[CR7 LL(1)] Wrote {TABLES_PATH}")
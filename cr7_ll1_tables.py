@@ -0,0 +1,64 @@
+# Generated by cr7_ll1 from its GRAMMAR. Do not edit; run cr7_ll1.py to regenerate.
+GRAMMAR_HASH = '95bad087064f3406a5e86a4161ee37889be3eb697997d487d99deff1dc65e510'
+NAMES = ('EOF', "'#import'", "'stadium'", "'play'", "'('", "')'", "'{'", "'}'", 'ID', "'kickoff'", "'whistle'", "','", 'TYPE', "';'", "'='", "'referee'", "'practice'", "'drill'", "'announce'", "'listen'", "'bench'", "'++'", "'--'", 'OP', "'-'", "'!'", 'NUMBER', 'STRING', '?', 'program', 'items', 'item', 'fname', 'params', 'more_params', 'param', 'stmts', 'stmt', 'decl_value', 'block', 'orelse', 'for_init', 'for_cond', 'for_update', 'update', 'expr', 'expr_tail', 'unary', 'factor', 'call_tail', 'call', 'args', 'more_args', '@mark', '@program', '@import', '@function', '@param', '@declaration', '@assignment', '@if', '@while', '@for', '@output', '@input', '@return', '@none', '@list', '@update', '@expr', '@shift', '@unary', '@number', '@string', '@name', '@call')
+TERMINALS = 29
+START = 29
+FIRST_ACTION = 53
+KEEP = (False, True, True, True, False, False, False, False, True, True, True, False, True, False, False, True, True, True, True, True, False, True, True, True, True, True, True, True, True)
+LITERALS = {'#import': 1, 'stadium': 2, 'play': 3, '(': 4, ')': 5, '{': 6, '}': 7, 'kickoff': 9, 'whistle': 10, ',': 11, ';': 13, '=': 14, 'referee': 15, 'practice': 16, 'drill': 17, 'announce': 18, 'listen': 19, 'bench': 20, '++': 21, '--': 22, '-': 24, '!': 25}
+KINDS = {'ID': 8, 'NUMBER': 26, 'STRING': 27, 'TYPE_KEYWORD': 12, 'OP': 23, 'EOF': 0}
+TABLE = (
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    ((54, 0, 30), (54, 0, 30), None, (54, 0, 30), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    ((), (30, 31), None, (30, 31), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, (55, 2, 1), None, (56, 7, 36, 53, 6, 5, 33, 53, 4, 32, 3), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, (3,), None, None, None, None, (8,), (9,), (10,), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, (), None, None, None, None, None, None, (34, 35), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, (), None, None, None, None, None, (34, 35, 11), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, None, None, None, None, None, None, (57, 8, 12), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, None, (), (36, 37), None, (36, 37), None, (36, 37), None, None, (36, 37), (36, 37), (36, 37), (36, 37), (36, 37), None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, None, None, (59, 13, 45, 14, 8), None, (65, 13, 45, 10), None, (58, 13, 38, 8, 12), None, None, (60, 40, 39, 5, 45, 4, 15), (61, 39, 5, 45, 4, 16), (62, 39, 5, 43, 13, 42, 13, 41, 4, 17), (63, 13, 45, 18), (64, 13, 8, 19), None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, None, None, None, None, None, None, None, (66,), (45, 14), None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, (67, 7, 36, 53, 6), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, None, (66,), (66,), None, (66,), None, (66,), None, None, (66,), (66,), (66,), (66,), (66,), (39, 20), None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, None, None, (68, 44, 8), None, None, None, (58, 38, 8, 12), (66,), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, (45,), (45,), None, None, None, (45,), (45,), (45,), None, None, (66,), None, None, None, None, None, None, None, None, None, None, (45,), (45,), (45,), (45,), None),
+    (None, None, None, None, None, (66,), None, None, (68, 44, 8), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, None, None, None, None, None, None, None, None, None, None, None, (45, 14), None, None, None, None, None, None, (21,), (22,), None, None, None, None, None, None),
+    (None, None, None, (69, 46, 47, 53), (69, 46, 47, 53), None, None, None, (69, 46, 47, 53), (69, 46, 47, 53), (69, 46, 47, 53), None, None, None, None, None, None, None, None, None, None, None, None, None, (69, 46, 47, 53), (69, 46, 47, 53), (69, 46, 47, 53), (69, 46, 47, 53), None),
+    (None, None, None, None, None, (), None, None, None, None, None, (), None, (), None, None, None, None, None, None, None, None, None, (46, 47, 70, 23), (46, 47, 70, 24), None, None, None, None),
+    (None, None, None, (48,), (48,), None, None, None, (48,), (48,), (48,), None, None, None, None, None, None, None, None, None, None, None, None, None, (71, 47, 24), (71, 47, 25), (48,), (48,), None),
+    (None, None, None, (50, 3), (5, 45, 4), None, None, None, (49, 8), (50, 9), (50, 10), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, (72, 26), (73, 27), None),
+    (None, None, None, None, (50,), (74,), None, None, None, None, None, (74,), None, (74,), None, None, None, None, None, None, None, None, None, (74,), (74,), None, None, None, None),
+    (None, None, None, None, (75, 5, 51, 53, 4), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+    (None, None, None, (52, 45), (52, 45), (), None, None, (52, 45), (52, 45), (52, 45), None, None, None, None, None, None, None, None, None, None, None, None, None, (52, 45), (52, 45), (52, 45), (52, 45), None),
+    (None, None, None, None, None, (), None, None, None, None, None, (52, 45, 11), None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None),
+)
@@ -0,0 +1,120 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# ----------------------------
+# PHASE PROFILE
+# ----------------------------
+# Wall time, CPU time and peak memory for each phase of one compile (read,
+# lex, parse, analyse, codegen, run), plus whatever counts the phase
+# reports: tokens, nodes, instructions... Memory is the peak tracemalloc
+# saw above what was already allocated when the phase began. Tracing slows
+# Python code down several times over, so compare profiles with profiles,
+# never with unprofiled timings; pass memory=False to time without it.
+#
+# CPU time is the whole process's plus that of any worker processes that
+# finished during the phase, so --jobs runs are not undercounted.
+
+
+class Phase:
+    __slots__ = ("name", "wall", "cpu", "peak", "counts")
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = None  # bytes; None when memory was not traced
+        self.counts = {}
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def to_dict(self):
+        return {
+            "phase": self.name,
+            "wall_ms": round(self.wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "peak_bytes": self.peak,
+            "counts": dict(self.counts),
+        }
+
+
+def cpu_time():
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+class Profile:
+    """Phases recorded in the order they ran. `info` (file, backend,
+    compiler version...) is carried into the JSON report as is."""
+
+    def __init__(self, memory=True, **info):
+        self.memory = memory
+        self.info = info
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        """Record the enclosed code as phase `name`. Yields the Phase so the
+        code can count(); counts set after the block are not timed. A phase
+        that raises is still recorded."""
+        phase = Phase(name)
+        started = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), cpu_time()
+        try:
+            yield phase
+        finally:
+            phase.wall = time.perf_counter() - wall
+            phase.cpu = cpu_time() - cpu
+            if self.memory:
+                phase.peak = max(tracemalloc.get_traced_memory()[1] - base, 0)
+                if started:
+                    tracemalloc.stop()
+            self.phases.append(phase)
+
+    # ----------------------------
+    # REPORTS
+    # ----------------------------
+    def total(self):
+        peaks = [phase.peak for phase in self.phases if phase.peak is not None]
+        return {
+            "wall_ms": round(sum(phase.wall for phase in self.phases) * 1000, 3),
+            "cpu_ms": round(sum(phase.cpu for phase in self.phases) * 1000, 3),
+            "peak_bytes": max(peaks) if peaks else None,
+        }
+
+    def to_dict(self):
+        return {
+            **self.info,
+            "python": platform.python_version(),
+            "phases": [phase.to_dict() for phase in self.phases],
+            "total": self.total(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def table(self):
+        """The profile as aligned text lines, header first."""
+        lines = [f"{'Phase':<8}  {'Wall ms':>9}  {'CPU ms':>9}  {'Peak KiB':>9}  Counts"]
+        for phase in self.phases:
+            counts = ", ".join(f"{name} {value:,}" for name, value in phase.counts.items())
+            lines.append(f"{phase.name:<8}  {phase.wall * 1000:9.1f}  {phase.cpu * 1000:9.1f}  "
+                         f"{format_peak(phase.peak):>9}  {counts}".rstrip())
+        total = self.total()
+        lines.append(f"{'total':<8}  {total['wall_ms']:9.1f}  {total['cpu_ms']:9.1f}  "
+                     f"{format_peak(total['peak_bytes']):>9}")
+        return lines
+
+
+def format_peak(peak):
+    return "-" if peak is None else f"{peak / 1024:,.0f}"
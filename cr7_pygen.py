@@ -0,0 +1,400 @@
+import marshal
+import sys
+import traceback
+from bisect import bisect_right
+
+from cr7_ast import (
+    Assignment, Call, Declaration, For, If, Input, LogicalOp, Name,
+    Number, Output, Return, String, UnaryOp, While,
+)
+from cr7_interpreter import (
+    ENTRY_POINT, OPERATORS, TYPE_DEFAULTS, CR7RuntimeError,
+    format_value, operand_error, parse_input, resolve,
+)
+
+# ----------------------------
+# STATIC KINDS
+# ----------------------------
+# A flow-insensitive guess at what each variable, parameter and function
+# result can hold, so arithmetic and comparisons compile to native Python
+# operators when both sides are provably numeric. Anything uncertain is
+# "any", which falls back to the interpreter's operators via HELPERS.
+TYPE_KINDS = {"goal": "int", "player": "float", "flag": "bool", "match": "str"}
+NUMERIC = ("int", "float", "num")
+COMPARISONS = ("<", ">", "<=", ">=", "==", "!=")
+
+
+def completes(statements):
+    """Whether running `statements` can reach their end, which for a function
+    body means returning None. Loops are assumed to exit."""
+    for node in statements:
+        kind = type(node)
+        if kind is Return:
+            return False
+        if kind is If and node.orelse is not None and not completes(node.body) and not completes(node.orelse):
+            return False
+    return True
+
+
+def join(a, b):
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    if a in NUMERIC and b in NUMERIC:
+        return "num"
+    return "any"
+
+
+class KindInference:
+    def __init__(self, functions):
+        self.functions = functions
+        self.slots = {name: {} for name in functions}
+        # A function that can end without a `whistle` may return None.
+        self.results = {name: "any" if completes(function.body) else None for name, function in functions.items()}
+        self.function = None
+        self.changed = True
+
+    def run(self):
+        while self.changed:
+            self.changed = False
+            for function in self.functions.values():
+                self.function = function
+                self.block(function.body)
+        return self
+
+    def widen(self, table, key, kind):
+        joined = join(table.get(key), kind)
+        if joined != table.get(key):
+            table[key] = joined
+            self.changed = True
+
+    def slot_kind(self, function, slot):
+        return self.slots[function.name].get(slot)
+
+    def block(self, statements):
+        for node in statements:
+            self.statement(node)
+
+    def statement(self, node):
+        kind = type(node)
+        slots = self.slots[self.function.name]
+        if kind is Declaration:
+            value_kind = TYPE_KINDS[node.type_name] if node.value is None else self.expr(node.value)
+            self.widen(slots, node.slot, value_kind)
+        elif kind is Assignment:
+            self.widen(slots, node.slot, self.expr(node.value))
+        elif kind is Input:
+            self.widen(slots, node.slot, "any")
+        elif kind is If:
+            self.expr(node.condition)
+            self.block(node.body)
+            if node.orelse is not None:
+                self.block(node.orelse)
+        elif kind is While:
+            self.expr(node.condition)
+            self.block(node.body)
+        elif kind is For:
+            if node.init is not None:
+                self.statement(node.init)
+            if node.condition is not None:
+                self.expr(node.condition)
+            if node.update is not None:
+                self.statement(node.update)
+            self.block(node.body)
+        elif kind is Output:
+            self.expr(node.value)
+        elif kind is Return:
+            self.widen(self.results, self.function.name, self.expr(node.value))
+
+    def expr(self, node):
+        kind = type(node)
+        if kind is Number:
+            return "float" if isinstance(node.value, float) else "int"
+        if kind is String:
+            return "str"
+        if kind is Name:
+            return self.slot_kind(self.function, node.slot)
+        if kind is Call:
+            target = node.target
+            callee_slots = self.slots[target.name]
+            for slot, arg in enumerate(node.args):
+                self.widen(callee_slots, slot, self.expr(arg))
+            return self.results[target.name]
+        if kind is UnaryOp:
+            operand = self.expr(node.operand)
+            if node.op == "!":
+                return "bool"
+            return operand if operand is None or operand in NUMERIC else "any"
+        if kind is LogicalOp:
+            self.expr(node.left)
+            self.expr(node.right)
+            return "bool"
+        # BinOp
+        left = self.expr(node.left)
+        right = self.expr(node.right)
+        if node.op in COMPARISONS:
+            return "bool"
+        if left is None or right is None:
+            return None
+        if left in NUMERIC and right in NUMERIC:
+            if left == right == "int":
+                return "int"
+            return "float" if "float" in (left, right) else "num"
+        if node.op == "+" and "str" in (left, right):
+            return "str"
+        return "any"
+
+
+# ----------------------------
+# CODE GENERATION
+# ----------------------------
+class PythonModule:
+    """Generated Python source for a CR7 program plus the map from generated
+    line numbers back to CR7 source offsets, used to locate runtime errors."""
+
+    def __init__(self, source, line_offsets):
+        self.source = source
+        self.line_offsets = line_offsets  # sorted (line, offset) pairs
+        self.code = None
+
+    def compiled(self):
+        if self.code is None:
+            try:
+                self.code = compile(self.source, FILENAME, "exec")
+            except SyntaxError as e:
+                # CPython caps static nesting (20 loops deep, ~100 indents);
+                # deeper CR7 blocks are valid but have no Python translation.
+                offset = self.offset_for_line(e.lineno) if e.lineno else None
+                raise CR7RuntimeError(f"Too deeply nested for the python backend: {e.msg}", offset) from None
+        return self.code
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.source)
+            f.write(f"\n# cr7-line-offsets: {self.line_offsets!r}\n")
+
+    def to_data(self):
+        return (self.source, self.line_offsets, marshal.dumps(self.compiled()))
+
+    @classmethod
+    def from_data(cls, data):
+        source, line_offsets, code = data
+        module = cls(source, [tuple(entry) for entry in line_offsets])
+        module.code = marshal.loads(code)
+        return module
+
+    def offset_for_line(self, line):
+        lines = [entry[0] for entry in self.line_offsets]
+        i = bisect_right(lines, line) - 1
+        return self.line_offsets[i][1] if i >= 0 else None
+
+
+FILENAME = "<cr7-generated>"
+
+HEADER = """\
+# Generated from CR7 Script by cr7_pygen. Do not edit.
+"""
+
+
+class PythonGenerator:
+    def __init__(self, program, functions=None):
+        self.functions = resolve(program) if functions is None else functions
+        self.kinds = KindInference(self.functions).run()
+        self.lines = HEADER.splitlines()
+        self.line_offsets = []
+        self.indent = 0
+        self.function = None
+
+    def generate(self):
+        for function in self.functions.values():
+            self.function_def(function)
+        return PythonModule("\n".join(self.lines) + "\n", self.line_offsets)
+
+    def emit(self, text, offset=None):
+        self.lines.append("    " * self.indent + text)
+        if offset is not None:
+            self.line_offsets.append((len(self.lines), offset))
+
+    def var(self, name, slot):
+        # The "v_" prefix keeps CR7 names clear of Python keywords, the
+        # cr7_ function names and the _ helpers; the slot makes shadowed
+        # declarations distinct variables.
+        return f"v_{slot}_{name}"
+
+    def function_def(self, function):
+        self.function = self.kinds.function = function
+        params = ", ".join(self.var(name, slot) for slot, (_, name) in enumerate(function.params))
+        self.emit("")
+        self.emit(f"def cr7_{function.name}({params}):", function.offset)
+        self.indent += 1
+        self.block(function.body)
+        self.indent -= 1
+
+    def block(self, statements):
+        if not statements:
+            self.emit("pass")
+        for node in statements:
+            self.statement(node)
+
+    def statement(self, node):
+        kind = type(node)
+        if kind is Declaration:
+            value = repr(TYPE_DEFAULTS[node.type_name]) if node.value is None else self.expr(node.value)
+            self.emit(f"{self.var(node.name, node.slot)} = {value}", node.offset)
+        elif kind is Assignment:
+            self.emit(f"{self.var(node.name, node.slot)} = {self.expr(node.value)}", node.offset)
+        elif kind is If:
+            self.emit(f"if {self.expr(node.condition)}:", node.offset)
+            self.indented(node.body)
+            if node.orelse is not None:
+                self.emit("else:")
+                self.indented(node.orelse)
+        elif kind is While:
+            self.emit(f"while {self.expr(node.condition)}:", node.offset)
+            self.indented(node.body)
+        elif kind is For:
+            # CR7 has no `continue`, so the update can simply trail the body.
+            if node.init is not None:
+                self.statement(node.init)
+            condition = "True" if node.condition is None else self.expr(node.condition)
+            self.emit(f"while {condition}:", node.offset)
+            self.indent += 1
+            self.block(node.body)
+            if node.update is not None:
+                self.statement(node.update)
+            self.indent -= 1
+        elif kind is Output:
+            value = self.expr(node.value)
+            value_kind = self.kinds.expr(node.value)
+            if value_kind == "str":
+                text = value
+            elif value_kind in NUMERIC:
+                text = f"str({value})"
+            else:
+                text = f"_format({value})"
+            self.emit(f"_announce({text})", node.offset)
+        elif kind is Input:
+            self.emit(f"{self.var(node.name, node.slot)} = _listen()", node.offset)
+        elif kind is Return:
+            self.emit(f"return {self.expr(node.value)}", node.offset)
+
+    def indented(self, statements):
+        self.indent += 1
+        self.block(statements)
+        self.indent -= 1
+
+    def expr(self, node):
+        kind = type(node)
+        if kind is Number or kind is String:
+            return repr(node.value)
+        if kind is Name:
+            return self.var(node.id, node.slot)
+        if kind is Call:
+            return f"cr7_{node.name}({', '.join(self.expr(arg) for arg in node.args)})"
+        if kind is UnaryOp:
+            operand = self.expr(node.operand)
+            if node.op == "!":
+                return f"(not {operand})"
+            if self.kinds.expr(node.operand) in NUMERIC:
+                return f"(-{operand})"
+            return f"_neg({operand}, {node.offset})"
+        if kind is LogicalOp:
+            # Python's `and`/`or` return an operand; CR7 yields a flag.
+            left, right = self.expr(node.left), self.expr(node.right)
+            if self.kinds.expr(node.left) != "bool":
+                left = f"bool({left})"
+            if self.kinds.expr(node.right) != "bool":
+                right = f"bool({right})"
+            return f"({left} {'and' if node.op == '&&' else 'or'} {right})"
+        left, right = self.expr(node.left), self.expr(node.right)
+        left_kind, right_kind = self.kinds.expr(node.left), self.kinds.expr(node.right)
+        numeric = left_kind in NUMERIC and right_kind in NUMERIC
+        if node.op in ("==", "!=") or (numeric and (node.op != "/" or "float" in (left_kind, right_kind))):
+            return f"({left} {node.op} {right})"
+        return f"{HELPERS[node.op]}({left}, {right}, {node.offset})"
+
+
+def generate(program, functions=None):
+    """The Python module for `program`. `functions` saves resolving the
+    program a second time when the caller already has its functions."""
+    return PythonGenerator(program, functions).generate()
+
+
+# ----------------------------
+# EXECUTION
+# ----------------------------
+# Operators whose operands are not provably numeric are called through
+# these helpers with the operator's CR7 offset as a last argument, so a
+# runtime error names the operator and its values as the interpreter does.
+HELPERS = {"+": "_add", "-": "_sub", "*": "_mul", "/": "_div", "<": "_lt", ">": "_gt", "<=": "_le", ">=": "_ge"}
+
+
+def checked(op, fn):
+    def apply(left, right, offset):
+        try:
+            return fn(left, right)
+        except ZeroDivisionError:
+            raise CR7RuntimeError("Division by zero", offset) from None
+        except TypeError:
+            raise operand_error(op, offset, left, right) from None
+    return apply
+
+
+def checked_neg(operand, offset):
+    try:
+        return -operand
+    except TypeError:
+        raise operand_error("-", offset, operand) from None
+
+
+def run_python(module, announce=None, listen=None, entry=ENTRY_POINT):
+    """exec() the generated module and call its entry point. Announcements
+    are buffered and flushed in one write at the end, or before a `listen`
+    so prompts still appear first."""
+    listen = listen or input
+    buffer = []
+
+    def flush():
+        if buffer:
+            if announce is None:
+                sys.stdout.write("\n".join(buffer) + "\n")
+            else:
+                for text in buffer:
+                    announce(text)
+            buffer.clear()
+
+    def read_line():
+        flush()
+        return parse_input(listen())
+
+    namespace = {
+        "__name__": "cr7_generated",
+        "_neg": checked_neg,
+        "_format": format_value,
+        "_announce": buffer.append,
+        "_listen": read_line,
+    }
+    namespace.update((name, checked(op, OPERATORS[op])) for op, name in HELPERS.items())
+    exec(module.compiled(), namespace)
+    function = namespace.get(f"cr7_{entry}")
+    if function is None:
+        raise CR7RuntimeError(f"No '{entry}' function to start from")
+    code = function.__code__
+    if code.co_argcount:
+        raise CR7RuntimeError(f"'{entry}' must not take parameters", module.offset_for_line(code.co_firstlineno))
+    try:
+        return function()
+    except ZeroDivisionError:
+        # Only native float division gets here; helpers carry their offset.
+        raise CR7RuntimeError("Division by zero", error_offset(module)) from None
+    except RecursionError:
+        raise CR7RuntimeError("Maximum call depth exceeded") from None
+    finally:
+        flush()
+
+
+def error_offset(module):
+    """CR7 offset of the innermost generated line in the active traceback."""
+    frames = [frame for frame in traceback.extract_tb(sys.exc_info()[2]) if frame.filename == FILENAME]
+    return module.offset_for_line(frames[-1].lineno) if frames else None
@@ -0,0 +1,510 @@
+from array import array
+
+from cr7_ast import (
+    Assignment, BinOp, Call, Declaration, For, If, Input, LogicalOp, Name,
+    Number, Output, Return, String, UnaryOp, While,
+)
+from cr7_interpreter import (
+    ENTRY_POINT, TYPE_DEFAULTS, CR7RuntimeError, cr7_add, cr7_div,
+    format_value, operand_error, parse_input, resolve,
+)
+
+# ----------------------------
+# INSTRUCTION SET
+# ----------------------------
+# Instructions are an opcode followed by its operands, all ints in one flat
+# array. Operands name registers: slots of the call frame, which holds the
+# parameters, then locals, then expression temporaries, then the constant
+# pool. Reading a constant is therefore the same as reading a variable, and
+# `x = x + 1` is a single ADD instead of four stack operations.
+(
+    ADD, SUB, MUL, DIV,
+    LT, GT, LE, GE, EQ, NE,   # dst a b
+    MOVE,           # dst src
+    JUMP,           # target
+    JUMP_IF_FALSE,  # reg target
+    JUMP_UNLESS_LT, JUMP_UNLESS_GT, JUMP_UNLESS_LE,
+    JUMP_UNLESS_GE, JUMP_UNLESS_EQ, JUMP_UNLESS_NE,  # a b target
+    CALL,           # dst function arg...
+    RETURN,         # reg
+    RETURN_NONE,
+    PRINT,          # reg
+    INPUT,          # dst
+    NEG, NOT, BOOL,  # dst src
+    JUMP_IF_TRUE,   # reg target
+) = range(28)
+
+OPCODES = (
+    "ADD", "SUB", "MUL", "DIV", "LT", "GT", "LE", "GE", "EQ", "NE", "MOVE",
+    "JUMP", "JUMP_IF_FALSE",
+    "JUMP_UNLESS_LT", "JUMP_UNLESS_GT", "JUMP_UNLESS_LE",
+    "JUMP_UNLESS_GE", "JUMP_UNLESS_EQ", "JUMP_UNLESS_NE",
+    "CALL", "RETURN", "RETURN_NONE", "PRINT", "INPUT",
+    "NEG", "NOT", "BOOL", "JUMP_IF_TRUE",
+)
+
+# Operand layout per opcode: r = register, t = jump target, f = function.
+# CALL is followed by one extra register per argument of the callee.
+OPERANDS = {
+    MOVE: "rr", JUMP: "t", JUMP_IF_FALSE: "rt", CALL: "rf",
+    RETURN: "r", RETURN_NONE: "", PRINT: "r", INPUT: "r",
+    NEG: "rr", NOT: "rr", BOOL: "rr", JUMP_IF_TRUE: "rt",
+}
+for _opcode in (ADD, SUB, MUL, DIV, LT, GT, LE, GE, EQ, NE):
+    OPERANDS[_opcode] = "rrr"
+for _opcode in range(JUMP_UNLESS_LT, JUMP_UNLESS_NE + 1):
+    OPERANDS[_opcode] = "rrt"
+
+BINARY_OPCODES = {
+    "+": ADD, "-": SUB, "*": MUL, "/": DIV,
+    "<": LT, ">": GT, "<=": LE, ">=": GE, "==": EQ, "!=": NE,
+}
+UNARY_OPCODES = {"-": NEG, "!": NOT}
+BRANCH_OPCODES = {
+    "<": JUMP_UNLESS_LT, ">": JUMP_UNLESS_GT, "<=": JUMP_UNLESS_LE,
+    ">=": JUMP_UNLESS_GE, "==": JUMP_UNLESS_EQ, "!=": JUMP_UNLESS_NE,
+}
+
+# The CR7 operator behind each opcode that can fail, for runtime errors.
+OPERATOR_SYMBOLS = {
+    opcode: symbol
+    for table in (BINARY_OPCODES, UNARY_OPCODES, BRANCH_OPCODES)
+    for symbol, opcode in table.items()
+}
+
+
+class CodeObject:
+    """Bytecode for one `play` function: a flat int array of instructions,
+    its constant pool, and the source offset of each instruction (-1 for
+    operand positions and instructions that cannot fail)."""
+
+    __slots__ = ("name", "offset", "code", "consts", "offsets", "param_count", "register_count")
+
+    def __init__(self, name, param_count, offset=None):
+        self.name = name
+        self.offset = offset  # of the `play` that defines the function
+        self.code = array("i")
+        self.consts = []
+        self.offsets = array("i")
+        self.param_count = param_count
+        self.register_count = 0  # parameters + locals + temporaries
+
+    def frame_template(self):
+        """Initial frame: empty registers followed by the constant pool."""
+        return [None] * self.register_count + self.consts
+
+    def to_data(self):
+        return (self.name, self.offset, self.code.tobytes(), self.consts, self.offsets.tobytes(),
+                self.param_count, self.register_count)
+
+    @classmethod
+    def from_data(cls, data):
+        name, offset, code, consts, offsets, param_count, register_count = data
+        function = cls(name, param_count, offset)
+        function.code.frombytes(code)
+        function.consts = list(consts)
+        function.offsets.frombytes(offsets)
+        function.register_count = register_count
+        return function
+
+
+class Module:
+    """A compiled program: code objects indexed by CALL's function operand."""
+
+    __slots__ = ("functions", "index")
+
+    def __init__(self, functions):
+        self.functions = functions
+        self.index = {function.name: i for i, function in enumerate(functions)}
+
+    def to_data(self):
+        return [function.to_data() for function in self.functions]
+
+    @classmethod
+    def from_data(cls, data):
+        return cls([CodeObject.from_data(item) for item in data])
+
+
+# ----------------------------
+# COMPILER
+# ----------------------------
+class BytecodeCompiler:
+    def __init__(self, program, functions=None):
+        self.functions = resolve(program) if functions is None else functions
+        self.function_index = {name: i for i, name in enumerate(self.functions)}
+        self.code = None
+        self.const_index = None
+        self.next_temp = 0
+        self.locals_end = 0
+
+    def compile(self):
+        return Module([self.compile_function(function) for function in self.functions.values()])
+
+    def compile_function(self, function):
+        self.code = CodeObject(function.name, len(function.params), function.offset)
+        self.const_index = {}
+        self.locals_end = self.next_temp = function.frame_size
+        self.code.register_count = function.frame_size
+        self.compile_block(function.body)
+        self.emit(RETURN_NONE)
+        # Constant registers sit after every local and temporary.
+        base = self.code.register_count
+        code = self.code.code
+        for at in self.const_index.values():
+            for position in at[1]:
+                code[position] += base
+        return self.code
+
+    def emit(self, opcode, *operands, offset=None):
+        at = len(self.code.code)
+        self.code.code.append(opcode)
+        self.code.code.extend(operands)
+        self.code.offsets.append(-1 if offset is None else offset)
+        self.code.offsets.extend([-1] * len(operands))
+        return at
+
+    def patch(self, at):
+        """Point the jump emitted at `at` (target is its last operand) here."""
+        last = at + len(OPERANDS[self.code.code[at]])
+        self.code.code[last] = len(self.code.code)
+
+    def here(self):
+        return len(self.code.code)
+
+    def temp(self):
+        register = self.next_temp
+        self.next_temp += 1
+        self.code.register_count = max(self.code.register_count, self.next_temp)
+        return register
+
+    def constant(self, value):
+        # Key on the type too, so 1, 1.0 and True get separate entries.
+        # Constant registers are numbered from 0 here and rebased once the
+        # final register count is known; remember where each one is used.
+        key = (type(value), value)
+        entry = self.const_index.get(key)
+        if entry is None:
+            entry = self.const_index[key] = (len(self.code.consts), [])
+            self.code.consts.append(value)
+        return entry
+
+    def operand(self, node, target=None):
+        """Return the register holding `node`'s value, emitting code as needed.
+        Constants are returned as their const_index entry, to be rebased."""
+        kind = type(node)
+        if kind is Name:
+            return node.slot
+        if kind is Number or kind is String:
+            return self.constant(node.value)
+        if kind is LogicalOp:
+            # Never built in place: the right side may still read the
+            # variable being assigned after the left side is stored.
+            return self.logical(node)
+        if target is None:
+            target = self.temp()
+        if kind is BinOp:
+            left = self.operand(node.left)
+            right = self.operand(node.right)
+            self.emit_operands(BINARY_OPCODES[node.op], (target, left, right), node.offset)
+        elif kind is UnaryOp:
+            self.emit_operands(UNARY_OPCODES[node.op], (target, self.operand(node.operand)), node.offset)
+        elif kind is Call:
+            args = [self.operand(arg) for arg in node.args]
+            self.emit_operands(CALL, (target, self.function_index[node.name], *args), node.offset)
+        return target
+
+    def logical(self, node):
+        # t = bool(left); skip the right side if that already decides it.
+        target = self.temp()
+        self.emit_operands(BOOL, (target, self.operand(node.left)))
+        done = self.emit(JUMP_IF_TRUE if node.op == "||" else JUMP_IF_FALSE, target, 0)
+        self.emit_operands(BOOL, (target, self.operand(node.right)))
+        self.patch(done)
+        return target
+
+    def emit_operands(self, opcode, operands, offset=None):
+        """emit() that also records where constant operands were placed."""
+        at = self.emit(opcode, *(op if isinstance(op, int) else op[0] for op in operands), offset=offset)
+        for position, op in enumerate(operands, start=at + 1):
+            if not isinstance(op, int):
+                op[1].append(position)
+        return at
+
+    # ----------------------------
+    # STATEMENTS
+    # ----------------------------
+    def compile_block(self, statements):
+        for statement in statements:
+            self.compile_statement(statement)
+            self.next_temp = self.locals_end
+
+    def store(self, slot, value):
+        if value is None:
+            return
+        register = self.operand(value, slot)
+        if register != slot:
+            self.emit_operands(MOVE, (slot, register))
+
+    def branch_unless(self, condition):
+        """Emit the jumps taken when `condition` is false; returns them for
+        patch(). Each side of an `&&` gets its own exit jump."""
+        if type(condition) is LogicalOp and condition.op == "&&":
+            return self.branch_unless(condition.left) + self.branch_unless(condition.right)
+        if type(condition) is BinOp and condition.op in BRANCH_OPCODES:
+            left = self.operand(condition.left)
+            right = self.operand(condition.right)
+            return [self.emit_operands(BRANCH_OPCODES[condition.op], (left, right, 0), condition.offset)]
+        return [self.emit_operands(JUMP_IF_FALSE, (self.operand(condition), 0))]
+
+    def patch_all(self, jumps):
+        for at in jumps:
+            self.patch(at)
+
+    def compile_statement(self, node):
+        kind = type(node)
+        if kind is Declaration:
+            if node.value is None:
+                self.emit_operands(MOVE, (node.slot, self.constant(TYPE_DEFAULTS[node.type_name])))
+            else:
+                self.store(node.slot, node.value)
+        elif kind is Assignment:
+            self.store(node.slot, node.value)
+        elif kind is If:
+            skip_body = self.branch_unless(node.condition)
+            self.compile_block(node.body)
+            if node.orelse is None:
+                self.patch_all(skip_body)
+            else:
+                skip_orelse = self.emit(JUMP, 0)
+                self.patch_all(skip_body)
+                self.compile_block(node.orelse)
+                self.patch(skip_orelse)
+        elif kind is While:
+            top = self.here()
+            exit_jumps = self.branch_unless(node.condition)
+            self.compile_block(node.body)
+            self.emit(JUMP, top)
+            self.patch_all(exit_jumps)
+        elif kind is For:
+            if node.init is not None:
+                self.compile_statement(node.init)
+            top = self.here()
+            exit_jumps = []
+            if node.condition is not None:
+                exit_jumps = self.branch_unless(node.condition)
+            self.compile_block(node.body)
+            if node.update is not None:
+                self.compile_statement(node.update)
+            self.emit(JUMP, top)
+            self.patch_all(exit_jumps)
+        elif kind is Output:
+            self.emit_operands(PRINT, (self.operand(node.value),))
+        elif kind is Input:
+            self.emit(INPUT, node.slot)
+        elif kind is Return:
+            self.emit_operands(RETURN, (self.operand(node.value),))
+
+
+def compile_program(program, functions=None):
+    """Compile `program` to a Module; give `functions` when resolve() has
+    run on it already, and it is not run again."""
+    return BytecodeCompiler(program, functions).compile()
+
+
+# ----------------------------
+# VIRTUAL MACHINE
+# ----------------------------
+class VM:
+    """Executes a Module with one dispatch loop per call.
+
+    Instruction arrays are copied into lists once at load time; indexing a
+    list of small ints is cheaper than unboxing from an array on every fetch.
+    Opcodes are tested roughly in order of how often loops execute them.
+    """
+
+    def __init__(self, module, announce=None, listen=None):
+        self.module = module
+        self.announce = announce or (lambda text: print(text))
+        self.listen = listen or input
+        self.loaded = [
+            (function.code.tolist(), function.frame_template(), function.param_count)
+            for function in module.functions
+        ]
+
+    def run(self, entry=ENTRY_POINT):
+        index = self.module.index.get(entry)
+        if index is None:
+            raise CR7RuntimeError(f"No '{entry}' function to start from")
+        function = self.module.functions[index]
+        if function.param_count:
+            raise CR7RuntimeError(f"'{entry}' must not take parameters", function.offset)
+        try:
+            return self.execute(index, [])
+        except RecursionError:
+            raise CR7RuntimeError("Maximum call depth exceeded") from None
+
+    def execute(self, index, args):
+        code, template, param_count = self.loaded[index]
+        frame = args + template[param_count:]
+        pc = 0
+        try:
+            while True:
+                op = code[pc]
+                if op < MOVE:
+                    a = frame[code[pc + 2]]
+                    b = frame[code[pc + 3]]
+                    if op == ADD:
+                        if type(a) is int and type(b) is int:
+                            frame[code[pc + 1]] = a + b
+                        else:
+                            frame[code[pc + 1]] = cr7_add(a, b)
+                    elif op == SUB:
+                        frame[code[pc + 1]] = a - b
+                    elif op == MUL:
+                        frame[code[pc + 1]] = a * b
+                    elif op == DIV:
+                        if type(a) is int and type(b) is int and a >= 0 and b > 0:
+                            frame[code[pc + 1]] = a // b
+                        else:
+                            frame[code[pc + 1]] = cr7_div(a, b)
+                    elif op == LT:
+                        frame[code[pc + 1]] = a < b
+                    elif op == GT:
+                        frame[code[pc + 1]] = a > b
+                    elif op == LE:
+                        frame[code[pc + 1]] = a <= b
+                    elif op == GE:
+                        frame[code[pc + 1]] = a >= b
+                    elif op == EQ:
+                        frame[code[pc + 1]] = a == b
+                    else:
+                        frame[code[pc + 1]] = a != b
+                    pc += 4
+                elif op == MOVE:
+                    frame[code[pc + 1]] = frame[code[pc + 2]]
+                    pc += 3
+                elif op <= JUMP_UNLESS_NE:
+                    if op == JUMP:
+                        pc = code[pc + 1]
+                        continue
+                    if op == JUMP_IF_FALSE:
+                        pc = pc + 3 if frame[code[pc + 1]] else code[pc + 2]
+                        continue
+                    a = frame[code[pc + 1]]
+                    b = frame[code[pc + 2]]
+                    if op == JUMP_UNLESS_LT:
+                        taken = a < b
+                    elif op == JUMP_UNLESS_GT:
+                        taken = a > b
+                    elif op == JUMP_UNLESS_LE:
+                        taken = a <= b
+                    elif op == JUMP_UNLESS_GE:
+                        taken = a >= b
+                    elif op == JUMP_UNLESS_EQ:
+                        taken = a == b
+                    else:
+                        taken = a != b
+                    pc = pc + 4 if taken else code[pc + 3]
+                elif op == CALL:
+                    callee = code[pc + 2]
+                    count = self.loaded[callee][2]
+                    start = pc + 3
+                    frame[code[pc + 1]] = self.execute(callee, [frame[r] for r in code[start:start + count]])
+                    pc = start + count
+                elif op == RETURN:
+                    return frame[code[pc + 1]]
+                elif op == RETURN_NONE:
+                    return None
+                elif op == PRINT:
+                    self.announce(format_value(frame[code[pc + 1]]))
+                    pc += 2
+                elif op == INPUT:
+                    frame[code[pc + 1]] = parse_input(self.listen())
+                    pc += 2
+                elif op == JUMP_IF_TRUE:
+                    pc = code[pc + 2] if frame[code[pc + 1]] else pc + 3
+                elif op == BOOL:
+                    frame[code[pc + 1]] = bool(frame[code[pc + 2]])
+                    pc += 3
+                elif op == NOT:
+                    frame[code[pc + 1]] = not frame[code[pc + 2]]
+                    pc += 3
+                elif op == NEG:
+                    frame[code[pc + 1]] = -frame[code[pc + 2]]
+                    pc += 3
+                else:
+                    raise CR7RuntimeError(f"Bad opcode {op} at {pc}")
+        except ZeroDivisionError:
+            raise CR7RuntimeError("Division by zero", self.offset_at(index, pc)) from None
+        except TypeError:
+            raise self.operand_error(index, frame, pc) from None
+
+    def operand_error(self, index, frame, pc):
+        """The interpreter's error for the operator at `pc`, with the values
+        it was given."""
+        code = self.loaded[index][0]
+        op = code[pc]
+        if op < MOVE:
+            operands = (frame[code[pc + 2]], frame[code[pc + 3]])
+        elif op == NEG:
+            operands = (frame[code[pc + 2]],)
+        else:  # a JUMP_UNLESS_* comparison
+            operands = (frame[code[pc + 1]], frame[code[pc + 2]])
+        return operand_error(OPERATOR_SYMBOLS[op], self.offset_at(index, pc), *operands)
+
+    def offset_at(self, index, pc):
+        offset = self.module.functions[index].offsets[pc]
+        return None if offset < 0 else offset
+
+
+def run_module(module, announce=None, listen=None):
+    return VM(module, announce, listen).run()
+
+
+# ----------------------------
+# DISASSEMBLER
+# ----------------------------
+def instruction_width(module, code, pc):
+    op = code[pc]
+    width = 1 + len(OPERANDS[op])
+    if op == CALL:
+        width += module.functions[code[pc + 2]].param_count
+    return width
+
+
+def disassemble(module):
+    lines = []
+    for function in module.functions:
+        code = function.code
+        lines.append(
+            f"play {function.name} (params={function.param_count}, "
+            f"registers={function.register_count}, consts={len(function.consts)})"
+        )
+
+        def register(r):
+            if r >= function.register_count:
+                return repr(function.consts[r - function.register_count])
+            return f"r{r}"
+
+        instructions = []
+        pc = 0
+        while pc < len(code):
+            width = instruction_width(module, code, pc)
+            instructions.append((pc, code[pc], list(code[pc + 1:pc + width])))
+            pc += width
+        targets = {operands[-1] for _, op, operands in instructions if OPERANDS[op].endswith("t")}
+
+        for pc, op, operands in instructions:
+            layout = OPERANDS[op] + "r" * (len(operands) - len(OPERANDS[op]))
+            shown = []
+            for kind, value in zip(layout, operands):
+                if kind == "r":
+                    shown.append(register(value))
+                elif kind == "f":
+                    shown.append(module.functions[value].name)
+                else:
+                    shown.append(f"-> {value}")
+            marker = ">>" if pc in targets else "  "
+            lines.append(f"  {marker} {pc:5} {OPCODES[op]:15} {', '.join(shown)}".rstrip())
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,166 @@
+import pytest
+
+from cr7_compiler import CR7Parser, LEXER, TraceSink
+from cr7_interpreter import CR7RuntimeError, run_program
+from cr7_pygen import generate, run_python
+from cr7_vm import compile_program, run_module
+
+RUNNERS = {
+    "ast": lambda program, announce, listen: run_program(program, announce, listen),
+    "vm": lambda program, announce, listen: run_module(compile_program(program), announce, listen),
+    "python": lambda program, announce, listen: run_python(generate(program), announce, listen),
+}
+
+
+def run(code, backend, inputs=()):
+    """(announced lines, kickoff's result, or (message, offset) of the
+    runtime error if there was one)."""
+    program = CR7Parser(LEXER.iter_tokens(code), code, TraceSink()).parse_program()
+    lines = []
+    listen = iter(inputs).__next__
+    try:
+        result = RUNNERS[backend](program, lines.append, listen)
+    except CR7RuntimeError as e:
+        return lines, (str(e), e.offset)
+    return lines, result
+
+
+PROGRAMS = {
+    "recursion": """
+play fact(goal n) {
+  referee (n < 2) { whistle 1; }
+  whistle n * fact(n - 1);
+}
+play fib(goal n) {
+  referee (n < 2) { whistle n; } bench { whistle fib(n - 1) + fib(n - 2); }
+}
+play kickoff() {
+  announce fact(10);
+  announce fib(15);
+  whistle fact(5);
+}
+""",
+    "loops and scopes": """
+play kickoff() {
+  goal total = 0;
+  drill (goal i = 0; i < 5; i++) {
+    goal j = i;
+    practice (j > 0) {
+      total = total + j;
+      j = j - 1;
+    }
+    referee (i == 3) { goal total = 100; announce total; }
+  }
+  drill (; total > 10; total = total - 7) { }
+  announce total;
+}
+""",
+    "numbers and strings": """
+play kickoff() {
+  announce 7 / 2;
+  announce 7.0 / 2;
+  announce 1 / 3 * 3;
+  announce -(2 - 5) * 1.5;
+  announce "a" + 1 + 2;
+  announce 1 + 2 + "a";
+  announce "b" < "a";
+  announce 1 == 1.0;
+  announce "1" == 1;
+  player p;
+  match m;
+  flag f;
+  goal g;
+  announce p;
+  announce m + "!";
+  announce f;
+  announce g;
+}
+""",
+    "logic": """
+play loud(goal n) {
+  announce n;
+  whistle n;
+}
+play kickoff() {
+  announce loud(0) && loud(1);
+  announce loud(2) || loud(3);
+  announce !(1 < 2) || 2 >= 2 && 3 != 3;
+  flag t = 1 <= 1;
+  referee (t) { announce "t"; } bench { announce "f"; }
+  whistle !t;
+}
+""",
+    "falling off the end": """
+play g(goal n) {
+  referee (n > 0) { whistle n; }
+}
+play h(goal n) {
+  referee (n > 0) { whistle n; } bench { whistle 0 - n; }
+}
+play kickoff() {
+  announce g(2) + h(-3);
+  announce g(0);
+  announce g(0) + 1;
+}
+""",
+    "whistling nothing": """
+play g() {
+  announce "g";
+}
+play f() {
+  drill (goal i = 0; i < 3; i++) {
+    whistle g();
+  }
+}
+play kickoff() {
+  announce f();
+  whistle g();
+  announce "after";
+}
+""",
+    "listen": """
+play kickoff() {
+  goal a = 0;
+  listen a;
+  announce a + 1;
+  listen a;
+  announce a * 2;
+  listen a;
+  announce a + "!";
+}
+""",
+}
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_backends_match_the_interpreter(name):
+    expected = run(PROGRAMS[name], "ast", ["41", "2.5", "hi"])
+    assert expected[0]
+    for backend in ("vm", "python"):
+        assert run(PROGRAMS[name], backend, ["41", "2.5", "hi"]) == expected, backend
+
+
+@pytest.mark.parametrize("statement", [
+    "announce x + (q - 1);",
+    "referee (q < 2) { announce 1; }",
+    "announce -q;",
+    "announce q * q;",
+    "announce x / (x - 1);",
+    "announce -nothing();",
+    "announce nothing() < 1;",
+    "announce x / nothing();",
+])
+def test_runtime_errors_match_the_interpreter(statement):
+    code = f'play nothing() {{\n  announce 0;\n}}\nplay kickoff() {{\n  match q = "q";\n  goal x = 1;\n  announce x;\n  {statement}\n}}\n'
+    expected = run(code, "ast")
+    assert expected[1] is not None
+    for backend in ("vm", "python"):
+        assert run(code, backend) == expected, backend
+
+
+@pytest.mark.parametrize("backend", ["vm", "python"])
+def test_entry_point_with_parameters_is_rejected_alike(backend):
+    code = "play helper() {\n  whistle 1;\n}\nplay kickoff(goal x) {\n  announce x;\n}\n"
+    expected = run(code, "ast")
+    assert expected == ([], ("'kickoff' must not take parameters", code.index("play kickoff")))
+    assert run(code, backend) == expected
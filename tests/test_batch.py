@@ -0,0 +1,100 @@
+import os
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from cr7_compiler import MMAP_THRESHOLD, compile_file, expand_paths, main, print_summary
+
+GOOD = "play kickoff() {\n  announce 1;\n}\n"
+BROKEN = "play kickoff() {\n  announce 1\n}\n"
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """a.cr7, notes.txt, sub/b.cr7 and sub/deeper/c.cr7, with tmp_path as cwd."""
+    for name in ["a.cr7", "notes.txt", "sub/b.cr7", "sub/deeper/c.cr7"]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(GOOD, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_directories_are_searched_recursively_for_cr7_files(tree):
+    files, missing = expand_paths(["sub", "."])
+    assert files == [os.path.join("sub", "b.cr7"), os.path.join("sub", "deeper", "c.cr7"),
+                     os.path.join(".", "a.cr7"), os.path.join(".", "sub", "b.cr7"),
+                     os.path.join(".", "sub", "deeper", "c.cr7")]
+    assert missing == []
+
+
+def test_double_star_globs_match_at_any_depth(tree):
+    files, _ = expand_paths(["sub/**/*.cr7", "**/*.txt"])
+    assert files == ["sub/b.cr7", "sub/deeper/c.cr7", "notes.txt"]
+
+
+def test_repeated_paths_are_compiled_once(tree):
+    files, missing = expand_paths(["a.cr7", "*.cr7", "a.cr7", "sub/b.cr7", "sub/*.cr7"])
+    assert files == ["a.cr7", "sub/b.cr7"]
+    assert missing == []
+
+
+def test_patterns_that_match_nothing_are_reported(tree):
+    files, missing = expand_paths(["nope.cr7", "*.py", "a.cr7", "sub/deeper/*.txt"])
+    assert files == ["a.cr7"]
+    assert missing == ["nope.cr7", "*.py", "sub/deeper/*.txt"]
+
+
+def test_summary_has_a_row_per_file_and_lists_every_error(capsys):
+    results = [
+        ("a.cr7", 0.0012, 0.0005, []),
+        ("sub/broken.cr7", 0.0021, None, ["[Syntax Error] first", "[Syntax Error] second"]),
+    ]
+    print_summary(results, 0.5, 1)
+    assert capsys.readouterr().out.splitlines() == [
+        "File            Status   Parse ms   Build ms  Error",
+        "a.cr7           ok            1.2        0.5",
+        "sub/broken.cr7  FAILED        2.1          -  [Syntax Error] first (+1 more)",
+        "[CR7 Compiler] 2 files, 1 ok, 1 failed in 0.50s (1 job)",
+        "",
+        "sub/broken.cr7:",
+        "  [Syntax Error] first",
+        "  [Syntax Error] second",
+    ]
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_a_batch_with_a_failure_exits_with_status_1(tree, capsys, jobs):
+    (tree / "sub" / "b.cr7").write_text(BROKEN, encoding="utf-8")
+    assert main([".", "--jobs", jobs, "--no-cache", "--trace", "off"]) == 1
+    out = capsys.readouterr().out
+    rows = {line.split()[0]: line.split()[1] for line in out.splitlines() if line.startswith(".")}
+    assert rows == {os.path.join(".", "a.cr7"): "ok", os.path.join(".", "sub", "b.cr7"): "FAILED",
+                    os.path.join(".", "sub", "deeper", "c.cr7"): "ok"}
+    assert re.search(rf"3 files, 2 ok, 1 failed in [\d.]+s \({jobs} jobs?\)", out)
+
+
+def test_a_batch_with_a_missing_pattern_exits_with_status_1(tree, capsys):
+    assert main(["a.cr7", "missing/*.cr7", "--no-cache", "--trace", "off"]) == 1
+    out = capsys.readouterr().out
+    assert "No .cr7 files match: missing/*.cr7" in out
+    assert "1 files, 1 ok, 0 failed" in out
+
+
+def test_a_clean_batch_exits_with_status_0(tree, capsys):
+    assert main(["*.cr7", "sub", "--no-cache", "--trace", "off"]) == 0
+    assert "3 files, 3 ok, 0 failed" in capsys.readouterr().out
+
+
+def test_python_codegen_failure_is_a_per_file_error(tmp_path):
+    body = "announce 1;"
+    for _ in range(25):
+        body = f"practice (1 < 2) {{ {body} }}"
+    path = tmp_path / "deep.cr7"
+    path.write_text(f"play kickoff() {{\n  {body}\n}}\n", encoding="utf-8")
+    args = SimpleNamespace(backend="python", use_mmap=False, mmap_threshold=MMAP_THRESHOLD, all_errors=False)
+    _, _, build_time, errors = compile_file(str(path), args)
+    assert build_time is None
+    assert errors == ["[Compile Error] Too deeply nested for the python backend: "
+                      "too many statically nested blocks at line 2, column 383"]
@@ -0,0 +1,33 @@
+from cr7_ast import node_from_data, node_to_data, walk
+from cr7_cache import CompileCache
+from cr7_compiler import COMPILER_VERSION, CR7Parser, LEXER, CompiledScript, TraceSink
+
+CODE = "play kickoff() {\n  announce 1 + 2;\n}\n"
+
+
+def test_unreadable_artefact_is_rebuilt(tmp_path):
+    cache = CompileCache(str(tmp_path), COMPILER_VERSION)
+    key = cache.key(CODE)
+    program = CR7Parser(LEXER.iter_tokens(CODE), CODE, TraceSink()).parse_program()
+    # Code marshalled by another Python fails to load much like this.
+    unreadable = b"\x00not marshal"
+    cache.update(key, ast=node_to_data(program), python=(CODE, [], unreadable))
+    module = CompiledScript.from_cache(cache, key).python()
+    assert module.compiled().co_filename == "<cr7-generated>"
+    assert cache.get(key)["python"][2] != unreadable
+
+
+def test_deeply_nested_program_round_trips_and_skips_the_cache(tmp_path):
+    # Deeper than both the recursion limit and marshal's nesting limit.
+    depth = 3000
+    code = ("play kickoff() {\n" + "referee (1 < 2) {\n" * depth + "announce " + "(" * depth + " + ".join(["1"] * depth)
+            + ")" * depth + ";\n" + "}\n" * depth + "}\n")
+    program = CR7Parser(LEXER.tokenize_table(code), code, TraceSink()).parse_program()
+    data = node_to_data(program)
+    # == on the trees or tuples would recurse, so compare node by node.
+    shape = [(type(node), node.offset) for node in walk(program)]
+    assert [(type(node), node.offset) for node in walk(node_from_data(data))] == shape
+    cache = CompileCache(str(tmp_path), COMPILER_VERSION)
+    key = cache.key(code)
+    assert cache.update(key, ast=data)["ast"] is data
+    assert cache.get(key) == {}
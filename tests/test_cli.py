@@ -0,0 +1,155 @@
+import io
+import os
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+import cr7_client
+from cr7_client import request, socket_path
+from cr7_compiler import ClientInput, main
+from cr7_interpreter import Resolver
+
+
+@pytest.mark.parametrize("text, label", [
+    ("play kickoff() { goal x = 1 @; }\n", "[Lexer Error]"),
+    ("play kickoff() { announce 1 / 0; }\n", "[Runtime Error]"),
+])
+def test_errors_exit_with_status_1(tmp_path, capsys, text, label):
+    path = tmp_path / "script.cr7"
+    path.write_text(text, encoding="utf-8")
+    assert main([str(path), "--run", "--no-cache", "--trace", "off"]) == 1
+    assert label in capsys.readouterr().out
+
+
+def test_client_input_survives_a_forked_worker():
+    # multiprocessing calls sys.stdin.close() in each worker it forks.
+    stdin = ClientInput(None, None, ())
+    stdin.close()
+    with pytest.raises(io.UnsupportedOperation):
+        stdin.fileno()
+
+
+@pytest.mark.parametrize("backend", ["ast", "vm", "python"])
+def test_profiled_run_resolves_once(tmp_path, capsys, monkeypatch, backend):
+    path = tmp_path / "script.cr7"
+    path.write_text("play kickoff() { announce 1 + 2; }\n", encoding="utf-8")
+    calls = []
+    resolve = Resolver.resolve
+    monkeypatch.setattr(Resolver, "resolve", lambda self: calls.append(self) or resolve(self))
+    main([str(path), "--run", "--backend", backend, "--profile", "--no-cache", "--trace", "off"])
+    assert "3" in capsys.readouterr().out
+    assert len(calls) == 1
+
+
+def test_default_socket_is_in_a_private_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("CR7_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert socket_path() == str(tmp_path / "cr7.sock")
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    path = socket_path(create=True)
+    directory = os.path.dirname(path)
+    assert os.path.dirname(directory) == str(tmp_path)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    os.chmod(directory, 0o777)
+    with pytest.raises(PermissionError):
+        socket_path()
+
+
+def test_client_refuses_a_socket_owned_by_another_user(tmp_path, monkeypatch):
+    path = str(tmp_path / "cr7.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen()
+        monkeypatch.setattr(os, "getuid", lambda: os.stat(path).st_uid + 1)
+        with pytest.raises(PermissionError):
+            request(["script.cr7"], path)
+
+
+SCRIPT = """\
+play kickoff() {
+  goal a = 0;
+  listen a;
+  announce a + 1;
+  announce 10 / (a - 4);
+}
+"""
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    path = str(tmp_path / "cr7.sock")
+    compiler = os.path.join(os.path.dirname(cr7_client.__file__), "cr7_compiler.py")
+    process = subprocess.Popen([sys.executable, compiler, "--serve", "--socket", path],
+                               stdout=subprocess.PIPE, text=True)
+    try:
+        assert "Serving on" in process.stdout.readline()
+        yield path
+    finally:
+        process.terminate()
+        process.wait()
+        process.stdout.close()
+
+
+@pytest.mark.parametrize("backend", ["ast", "vm", "python"])
+def test_daemon_runs_match_in_process_runs(tmp_path, capsys, monkeypatch, daemon, backend):
+    path = tmp_path / "script.cr7"
+    path.write_text(SCRIPT, encoding="utf-8")
+    argv = [str(path), "--run", "--backend", backend, "--no-cache", "--trace", "off"]
+    # The second and third runs reuse the daemon's warm build.
+    for line in ["1\n", "4\n", "7\n"]:
+        monkeypatch.setattr(sys, "stdin", io.StringIO(line))
+        status = main(argv) or 0
+        expected = capsys.readouterr().out
+        stdout = io.StringIO()
+        assert request(argv, daemon, io.StringIO(line), stdout, io.StringIO()) == status
+        assert stdout.getvalue() == expected
+
+
+class LostReplies:
+    """makefile() result that gives `count` of the daemon's lines, then fails."""
+
+    def __init__(self, replies, count):
+        self.replies = replies
+        self.count = count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.replies.close()
+
+    def __iter__(self):
+        for line in self.replies:
+            if not self.count:
+                break
+            self.count -= 1
+            yield line
+        raise ConnectionResetError(104, "Connection reset by peer")
+
+
+@pytest.mark.parametrize("count", [0, 1])
+def test_client_survives_losing_the_daemon(tmp_path, capsys, monkeypatch, daemon, count):
+    path = tmp_path / "script.cr7"
+    path.write_text("play kickoff() { announce 1; announce 2; }\n", encoding="utf-8")
+    argv = [str(path), "--run", "--no-cache", "--trace", "off"]
+    main(argv)
+    expected = capsys.readouterr().out
+    makefile = socket.socket.makefile
+    monkeypatch.setattr(socket.socket, "makefile", lambda self, mode: LostReplies(makefile(self, mode), count))
+    monkeypatch.setenv("CR7_SOCKET", daemon)
+    status = cr7_client.main(argv)
+    out, err = capsys.readouterr()
+    if count:
+        # Part of the output came back: report it rather than run again.
+        assert status == 1
+        assert expected.startswith(out)
+        assert "Lost the daemon" in err
+    else:
+        assert not status
+        assert out == expected
+        assert "Not using the daemon" in err
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from cr7_ast import BinOp, Call, LogicalOp, Name, Number, UnaryOp
+from cr7_compiler import CR7Parser, LEXER, TraceSink
+from cr7_ll1 import TableParser
+
+# Loosest first; every level is left-associative.
+LEVELS = [["||"], ["&&"], ["==", "!="], ["<", ">", "<=", ">="], ["+", "-"], ["*", "/"]]
+PREFIX = ["!", "-"]
+
+
+class ReferenceParser:
+    """One function per precedence level, the textbook way: the shape of
+    the grammar the precedence-climbing parser has to agree with. Renders
+    the expression fully parenthesised."""
+
+    def __init__(self, text):
+        self.tokens = [value for _, value, _ in LEXER.iter_tokens(text)]
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def take(self):
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def parse(self):
+        expr = self.binary(0)
+        assert self.peek() == ""
+        return expr
+
+    def binary(self, level):
+        if level == len(LEVELS):
+            return self.unary()
+        left = self.binary(level + 1)
+        while self.peek() in LEVELS[level]:
+            op = self.take()
+            left = f"({left} {op} {self.binary(level + 1)})"
+        return left
+
+    def unary(self):
+        if self.peek() in PREFIX:
+            op = self.take()
+            return f"({op}{self.unary()})"
+        value = self.take()
+        if value == "(":
+            inner = self.binary(0)
+            assert self.take() == ")"
+            return inner
+        if self.peek() == "(":
+            self.take()
+            args = []
+            while self.peek() != ")":
+                args.append(self.binary(0))
+                if self.peek() == ",":
+                    self.take()
+            self.take()
+            return f"{value}({', '.join(args)})"
+        return value
+
+
+def render(node):
+    kind = type(node)
+    if kind is BinOp or kind is LogicalOp:
+        return f"({render(node.left)} {node.op} {render(node.right)})"
+    if kind is UnaryOp:
+        return f"({node.op}{render(node.operand)})"
+    if kind is Call:
+        return f"{node.name}({', '.join(render(arg) for arg in node.args)})"
+    if kind is Number:
+        return str(node.value)
+    assert kind is Name
+    return node.id
+
+
+def random_expr(rng, depth=0):
+    roll = rng.random()
+    if depth > 4 or roll < 0.3:
+        return rng.choice(["x", "y", "1", "2"])
+    if roll < 0.4:
+        return f"{rng.choice(PREFIX)} {random_expr(rng, depth + 1)}"
+    if roll < 0.5:
+        return f"( {random_expr(rng, depth + 1)} )"
+    if roll < 0.55:
+        args = [random_expr(rng, depth + 1) for _ in range(rng.randrange(3))]
+        return f"f( {' , '.join(args)} )"
+    op = rng.choice([op for level in LEVELS for op in level])
+    return f"{random_expr(rng, depth + 1)} {op} {random_expr(rng, depth + 1)}"
+
+
+def parsed(parser_class, text):
+    code = f"play kickoff() {{\n  announce {text};\n}}\n"
+    program = parser_class(LEXER.tokenize_table(code), code, TraceSink()).parse_program()
+    return render(program.functions[0].body[0].value)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 - 2 - 3", "((1 - 2) - 3)"),
+    ("1 / 2 * 3", "((1 / 2) * 3)"),
+    ("1 + 2 * 3 < 4 == x && y || 2", "(((((1 + (2 * 3)) < 4) == x) && y) || 2)"),
+    ("- x * y", "((-x) * y)"),
+    ("! x == y", "((!x) == y)"),
+    ("x < y < 2", "((x < y) < 2)"),
+])
+def test_precedence_and_associativity(text, expected):
+    assert parsed(CR7Parser, text) == expected == ReferenceParser(text).parse()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_expressions_match_the_reference_grammar(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        text = random_expr(rng)
+        expected = ReferenceParser(text).parse()
+        assert parsed(CR7Parser, text) == expected, text
+        assert parsed(TableParser, text) == expected, text
@@ -0,0 +1,30 @@
+from cr7_ast import walk
+from cr7_compiler import CR7Parser, LEXER, FunctionCache, TraceSink
+
+CODE = """\
+play helper(goal n) {
+  whistle n + 1;
+}
+play kickoff() {
+  announce helper(1);
+}
+"""
+
+
+def parse(code, cache):
+    tokens = LEXER.tokenize_table(code)
+    return CR7Parser(tokens, code, TraceSink(), cache).parse_program()
+
+
+def offsets(program):
+    return [node.offset for node in walk(program)]
+
+
+def test_moved_function_does_not_shift_earlier_program():
+    cache = FunctionCache()
+    first = parse(CODE, cache)
+    before = offsets(first)
+    second = parse("// moved\n" + CODE, cache)
+    assert cache.hits == 2
+    assert offsets(first) == before
+    assert offsets(second)[1:] == [offset + len("// moved\n") for offset in before[1:]]
@@ -0,0 +1,36 @@
+import pytest
+
+from cr7_compiler import LEXER, open_source
+
+
+def lex_file(path, use_mmap):
+    with open_source(str(path), use_mmap) as code:
+        table = LEXER.tokenize_table(code)
+        return [table[i] for i in range(len(table))]
+
+
+@pytest.mark.parametrize("text", [
+    "play kickoff() {\n  goal x = 1;\n  announce x;\n}\n",
+    "play kickoff() {\n  goal café = 1;\n  announce \"olé\" + café;\n}\n",
+])
+def test_mmap_and_read_lex_alike(tmp_path, text):
+    path = tmp_path / "script.cr7"
+    path.write_text(text, encoding="utf-8")
+    assert lex_file(path, True) == lex_file(path, False)
+
+
+def test_mmap_error_column_counts_characters(tmp_path):
+    path = tmp_path / "script.cr7"
+    path.write_text("play kickoff() {\n  goal café = 1 @;\n}\n", encoding="utf-8")
+    with open_source(str(path), True) as code:
+        with pytest.raises(RuntimeError, match="line 2, column 17"):
+            LEXER.tokenize_table(code)
+
+
+@pytest.mark.parametrize("tail", ["   ", "\n\n\t ", " // last comment", "\n// last comment"])
+def test_trailing_skip_text_ends_the_scan(tail):
+    # The skip prefix must not backtrack into a MISMATCH or stray tokens at
+    # the end of the input.
+    code = "play kickoff() { goal x = 1; }"
+    assert [token[:2] for token in LEXER.tokenize(code + tail)] == [token[:2] for token in LEXER.tokenize(code)]
+    assert list(LEXER.tokenize_table(code + tail))[:-1] == list(LEXER.tokenize_table(code))[:-1]
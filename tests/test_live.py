@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from cr7_bench import generate_corpus
+from cr7_live import LiveSession
+
+SOURCE = """\
+#import stadium
+play helper(goal n) {
+  referee (n > 1) { whistle n * helper(n - 1); }
+  whistle 1;
+}
+play play() {
+  whistle 2;
+}
+play kickoff() {
+  goal x = helper(3);
+  announce x + play();
+}
+"""
+
+# Edits that unbalance braces, break keywords, open strings and comments,
+# or add stray characters.
+SNIPPETS = ["{", "}", "(", ")", ";", "x", " ", "\n", "play ", "p", '"', "//", "@", "#import stadium\n", "="]
+
+
+def rebuilt(code):
+    session = LiveSession()
+    session.rebuild(code)
+    return session
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_incremental_update_matches_rebuild(seed):
+    rng = random.Random(seed)
+    code = SOURCE
+    session = rebuilt(code)
+    for _ in range(100):
+        offset = rng.randrange(len(code) + 1)
+        removed = min(rng.choice([0, 0, 1, 2, 4]), len(code) - offset)
+        inserted = rng.choice(SNIPPETS) if rng.random() < 0.8 else ""
+        code = code[:offset] + inserted + code[offset + removed:]
+        session.update(code)
+        expected = rebuilt(code)
+        assert (session.items, session.stray) == (expected.items, expected.stray), (offset, removed, inserted)
+
+
+@pytest.mark.parametrize("inserted", ["{", "}", "x", '"', "/*", "@", "play "])
+def test_edit_in_a_large_file_reparses_only_nearby_items(inserted):
+    code = generate_corpus(200)
+    session = rebuilt(code)
+    offset = code.index("{", code.index("play", len(code) // 2)) + 1
+    edited = code[:offset] + inserted + code[offset:]
+    assert session.update(edited) <= 3
+    expected = rebuilt(edited)
+    assert (session.items, session.stray) == (expected.items, expected.stray)
+    # Undoing the edit finds the untouched items' problems again.
+    assert session.update(code) <= 3
+    assert (session.items, session.stray) == (rebuilt(code).items, rebuilt(code).stray)
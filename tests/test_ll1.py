@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import cr7_ll1_tables
+from cr7_ast import node_to_data
+from cr7_bench import generate_corpus
+from cr7_compiler import LEXER, CR7Parser, LexError, TraceSink
+from cr7_ll1 import TableParser, build_tables, grammar_hash
+from test_backends import PROGRAMS
+from test_recovery import BROKEN
+
+
+def test_committed_tables_are_current():
+    # Regenerate with `python cr7_ll1.py` after editing the grammar.
+    assert cr7_ll1_tables.GRAMMAR_HASH == grammar_hash()
+    with open(cr7_ll1_tables.__file__, encoding="utf-8") as f:
+        assert f.read() == build_tables()
+
+
+def parsed(parser_class, code):
+    """node_to_data of the program, or the error message (with its line and
+    column) when `code` does not parse."""
+    messages = []
+    parser = parser_class(LEXER.tokenize_table(code), code, TraceSink())
+    parser.log = lambda msg, color=None: messages.append(msg)
+    try:
+        return node_to_data(parser.parse_program())
+    except SystemExit:
+        return messages[-1]
+
+
+CORPUS = {"generated": generate_corpus(20), **PROGRAMS}
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_table_parser_builds_the_same_tree(monkeypatch, name):
+    code = CORPUS[name]
+    monkeypatch.setattr(TableParser, "reparse", lambda self, start: pytest.fail("fell back to CR7Parser"))
+    expected = parsed(CR7Parser, code)
+    assert not isinstance(expected, str), expected
+    assert parsed(TableParser, code) == expected
+
+
+@pytest.mark.parametrize("broken", BROKEN)
+def test_table_parser_reports_the_same_error(broken):
+    code = CORPUS["recursion"] + broken
+    assert parsed(TableParser, code) == parsed(CR7Parser, code)
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_table_parser_agrees_on_mangled_programs(name):
+    # Drop, repeat or swap tokens: most results no longer parse.
+    rng = random.Random(name)
+    code = CORPUS[name]
+    spans = [(start, start + len(value)) for _, value, start in LEXER.iter_tokens(code) if value]
+    for _ in range(40):
+        start, stop = rng.choice(spans)
+        other = code[slice(*rng.choice(spans))]
+        mangled = code[:start] + rng.choice(["", code[start:stop] * 2, other]) + code[stop:]
+        try:
+            LEXER.tokenize_table(mangled)
+        except LexError:
+            continue
+        assert parsed(TableParser, mangled) == parsed(CR7Parser, mangled), mangled
@@ -0,0 +1,58 @@
+import pytest
+
+from cr7_ast import node_to_data
+from cr7_bench import generate_corpus
+from cr7_compiler import LEXER, BatchParser, CR7Parser, FunctionCache, TraceSink
+
+FUNCTIONS = "".join(f"play f{i}(goal n) {{\n  whistle n * {i};\n}}\n" for i in range(6))
+
+
+def first_error(code, parse, cache=None):
+    parser = BatchParser(LEXER.tokenize_table(code), code, TraceSink(), cache)
+    with pytest.raises(SystemExit):
+        parse(parser)
+    return parser.message
+
+
+@pytest.mark.parametrize("broken", [
+    "play broken() {\n  announce 1;\n",  # unclosed; the next play is a statement
+    "play broken() {\n  announce 1\n}\n",
+    "play broken() {\n  referee (1 < 2) {\n    announce 1;\n}\n",
+    "play broken() {\n  announce (1 + 2;\n}\n",
+    "goal stray = 1;\n",
+])
+def test_parallel_and_cached_errors_match_sequential(broken):
+    code = FUNCTIONS + broken + FUNCTIONS
+    expected = first_error(code, lambda parser: parser.parse_program())
+    assert expected.startswith("[Syntax Error]")
+    assert first_error(code, lambda parser: parser.parse_program_parallel(2)) == expected
+    assert first_error(code, lambda parser: parser.parse_program(), FunctionCache()) == expected
+
+
+# Strings that span lines and hold comment markers, comments that hold
+# quotes, non-ASCII text and unexpected characters, repeated so that every
+# chunk boundary lands somewhere awkward.
+TRICKY = (
+    'play f() {\n  match s = "first line\n// not a comment\n\"";\n'
+    '  // a "quote" in a comment\n  announce "é" + s; @\n  whistle 1.5 / 2;\n}\n'
+) * 40
+
+
+@pytest.mark.parametrize("code", [TRICKY, TRICKY.encode("utf-8")], ids=["str", "bytes"])
+def test_parallel_lexing_matches_sequential(code):
+    expected_errors, errors = [], []
+    expected = LEXER.tokenize_table(code, errors=expected_errors)
+    assert expected_errors
+    table = LEXER.tokenize_table_parallel(code, 3, errors)
+    assert list(table) == list(expected)
+    assert errors == expected_errors
+
+
+def test_parallel_and_cached_parses_match_sequential():
+    code = generate_corpus(60)
+    tokens = LEXER.tokenize_table(code)
+    expected = node_to_data(CR7Parser(tokens, code, TraceSink()).parse_program())
+    assert node_to_data(CR7Parser(tokens, code, TraceSink()).parse_program_parallel(3)) == expected
+    cache = FunctionCache()
+    for _ in range(2):  # filling the cache, then reading from it
+        assert node_to_data(CR7Parser(tokens, code, TraceSink(), cache).parse_program()) == expected
@@ -0,0 +1,30 @@
+import pytest
+
+from cr7_compiler import CR7Parser, LEXER, TraceSink
+from cr7_interpreter import CR7RuntimeError
+from cr7_pygen import generate, run_python
+
+
+def nested(depth, block):
+    body = "announce 1;"
+    for _ in range(depth):
+        body = f"{block} (1 < 2) {{ {body} }}"
+    return f"play kickoff() {{\n  {body}\n}}\n"
+
+
+@pytest.mark.parametrize("block, depth", [("practice", 25), ("referee", 120)])
+def test_too_deep_for_python_is_a_runtime_error(block, depth):
+    code = nested(depth, block)
+    program = CR7Parser(LEXER.iter_tokens(code), code, TraceSink()).parse_program()
+    with pytest.raises(CR7RuntimeError, match="Too deeply nested") as error:
+        generate(program).compiled()
+    assert code[error.value.offset:].startswith(block)
+
+
+def test_variable_names_cannot_shadow_functions():
+    # `cr7_foo` in slot 0 once became cr7_foo_0, the name of play foo_0.
+    code = "play foo_0() {\n  whistle 5;\n}\nplay kickoff() {\n  goal cr7_foo = 1;\n  announce cr7_foo + foo_0();\n}\n"
+    program = CR7Parser(LEXER.iter_tokens(code), code, TraceSink()).parse_program()
+    lines = []
+    run_python(generate(program), lines.append)
+    assert lines == ["6"]
@@ -0,0 +1,48 @@
+import pytest
+
+from cr7_compiler import LEXER, BatchParser, CR7Parser, TraceSink
+
+FUNCTIONS = "".join(f"play f{i}(goal n) {{\n  whistle n * {i};\n}}\n" for i in range(3))
+
+BROKEN = [
+    "play broken() {\n  announce 1\n}\n",
+    "play broken() {\n  announce (1 + 2;\n  goal = 3;\n  announce 4;\n}\n",
+    "goal stray = 1;\n",
+    "play broken() {\n  referee (1 < ) { announce 1; }\n  whistle 2\n}\n",
+    "}\n",
+]
+
+
+def parse_all(code):
+    parser = CR7Parser(LEXER.tokenize_table(code), code, TraceSink())
+    program, diagnostics = parser.parse_all()
+    return parser, program, diagnostics
+
+
+@pytest.mark.parametrize("broken", BROKEN)
+def test_first_diagnostic_is_the_sequential_error(broken):
+    code = FUNCTIONS + broken + FUNCTIONS
+    parser = BatchParser(LEXER.tokenize_table(code), code, TraceSink())
+    with pytest.raises(SystemExit):
+        parser.parse_program()
+    recovering, _, diagnostics = parse_all(code)
+    message, offset = diagnostics[0]
+    assert f"[Syntax Error] {message}{recovering.location(offset)}" == parser.message
+
+
+def test_recovery_reports_every_broken_item_and_keeps_the_rest():
+    code = FUNCTIONS + "".join(broken + FUNCTIONS for broken in BROKEN)
+    _, program, diagnostics = parse_all(code)
+    # Each broken item reports what it reports on its own, and no more.
+    expected = []
+    base = len(FUNCTIONS)
+    for broken in BROKEN:
+        expected += [(message, offset + base) for message, offset in parse_all(broken)[2]]
+        base += len(broken) + len(FUNCTIONS)
+    assert len(expected) > len(BROKEN)
+    assert diagnostics == expected
+    good = [function for function in program.functions if function.name != "broken"]
+    clean = CR7Parser(LEXER.tokenize_table(FUNCTIONS), FUNCTIONS, TraceSink()).parse_program().functions
+    assert good == clean * (len(BROKEN) + 1)
+    starts = [code.find(f"play {function.name}(", function.offset) for function in good]
+    assert [function.offset for function in good] == starts
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from cr7_compiler import LEXER
+
+SOURCE = """\
+// header
+#import stadium
+play kickoff() {
+  goal x = 1; // one
+  player y = 2.5;
+  match m = "a // b";
+  referee (x < 2 && !(y >= 3)) { announce m + x; }
+}
+"""
+
+# Small pieces that make and break tokens: comments, strings, numbers,
+# operators, stray characters.
+SNIPPETS = ["x", " ", "\n", "/", "//", '"', "#", "1", ".", "=", "&", "|", "@", "play", "#import stadium\n"]
+
+
+def relexed(code, offset, removed, inserted):
+    table = LEXER.tokenize_table(code, errors=[])
+    edited = code[:offset] + inserted + code[offset + removed:]
+    LEXER.relex(table, edited, offset, removed, inserted, [])
+    return list(table), edited
+
+
+def test_insert_before_first_token():
+    # The first token moves, so relexing cannot resume at its old start.
+    tokens, edited = relexed("// header\nplay kickoff() { }\n", 0, 0, "#import stadium\n")
+    assert tokens == list(LEXER.tokenize_table(edited))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_relex_matches_full_lex(seed):
+    rng = random.Random(seed)
+    code = SOURCE
+    errors = []
+    table = LEXER.tokenize_table(code, errors=errors)
+    for _ in range(50):
+        offset = rng.randrange(len(code) + 1)
+        removed = rng.choice([0, 0, 1, 2, 5]) if offset < len(code) else 0
+        removed = min(removed, len(code) - offset)
+        inserted = rng.choice(SNIPPETS) if rng.random() < 0.7 else ""
+        code = code[:offset] + inserted + code[offset + removed:]
+        LEXER.relex(table, code, offset, removed, inserted, errors)
+        expected_errors = []
+        assert list(table) == list(LEXER.tokenize_table(code, errors=expected_errors)), (offset, removed, inserted)
+        assert errors == expected_errors, (offset, removed, inserted)
@@ -0,0 +1,29 @@
+from cr7_compiler import CR7Parser, LEXER, FunctionCache, TraceSink, top_level_spans
+
+# `play` as a function name and as a callee.
+CODE = """\
+play play() {
+  whistle 1;
+}
+play kickoff() {
+  announce play() + 1;
+}
+"""
+
+
+def parse(code, cache=None):
+    return CR7Parser(LEXER.tokenize_table(code), code, TraceSink(), cache).parse_program()
+
+
+def test_play_as_name_or_callee_starts_no_item():
+    tokens = LEXER.tokenize_table(CODE)
+    assert top_level_spans(tokens) == [(0, 9), (9, len(tokens) - 1)]
+    assert top_level_spans(list(tokens)) == top_level_spans(tokens)
+
+
+def test_play_as_name_or_callee_parses_alike_on_every_path():
+    expected = parse(CODE)
+    assert [function.name for function in expected.functions] == ["play", "kickoff"]
+    assert parse(CODE, FunctionCache()) == expected
+    program = CR7Parser(LEXER.tokenize_table(CODE), CODE, TraceSink()).parse_program_parallel(2)
+    assert program == expected